@@ -8,12 +8,15 @@ Designed for visually impaired users with voice-first UX and safety warnings.
 
 import os
 import sys
+import hashlib
 import logging
 import json
 import time
+import threading
 import argparse
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import numpy as np
 
 # Add src to path
@@ -21,10 +24,16 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from quantity_estimator import QuantityEstimator, QuantityEstimate
 from recipe_validator import RecipeValidator, Deviation
-from vision_vlm import VisionVLM
-from stt_whisper import WhisperSTT
-from tts_piper import PiperTTS
+from vision_vlm import VisionVLM, detect_spoons_opencv
+from stt_whisper import WhisperSTT, KeywordSpotter
+from vad import create_vad
+from duplex_audio import DuplexAudioController
+from tts_piper import PiperTTS, PhraseCache, SpeechPriority, SpeechScheduler
 from ocr_tesseract import TesseractOCR
+from camera_service import get_camera_service
+from frame_hash import FrameResultCache
+from scene_gate import SceneGate
+from roi import ROICrop, ROISelector
 
 # Setup logging
 logging.basicConfig(
@@ -37,6 +46,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SHOW_INGREDIENT_PROMPT = "Show me the ingredient when you're ready to add it."
+
+# Intent table, checked in order: (intent, trigger keywords, phrases users say)
+# The phrases also constrain speech recognition for short utterances.
+INTENTS = [
+    ('next', ['next', 'continue', 'proceed'], ['next step', 'next', 'continue']),
+    ('identify', ['what', 'identify', 'recognize', 'see'], ['what is this', 'identify this']),
+    ('quantity', ['how much', 'quantity', 'measure'], ['how much', 'check quantity']),
+    ('repeat', ['repeat', 'again', 'say again'], ['repeat', 'say again']),
+    ('help', ['help', 'what can'], ['help']),
+    ('stop', ['stop', 'exit', 'quit', 'end'], ['stop', 'exit']),
+]
+
+COMMAND_PHRASES = [phrase for _, _, phrases in INTENTS for phrase in phrases]
+
+
+def match_intent(command: str) -> Optional[str]:
+    """Return the first intent whose keywords occur in the command, or None."""
+    command = command.lower()
+    for intent, keywords, _ in INTENTS:
+        if any(kw in command for kw in keywords):
+            return intent
+    return None
+
 
 class ChefAssistant:
     """
@@ -65,8 +98,10 @@ class ChefAssistant:
             'current_frame': None,
             'last_recognition': None,
             'voice_mode': False,
-            'processing_command': False
+            'processing_command': False,
+            'dropped_commands': 0
         }
+        self._command_lock = threading.Lock()
         
         logger.info("Chef Assistant initialized successfully")
     
@@ -74,22 +109,65 @@ class ChefAssistant:
         """Initialize all component modules."""
         # Vision VLM
         vision_model = self.config.get('VISION_MODEL', './models/vision/moondream2-q4.gguf')
-        self.vision = VisionVLM(vision_model)
+        self.vision = VisionVLM(
+            vision_model,
+            backend=self.config.get('VISION_BACKEND', 'subprocess'),
+            server_url=self.config.get('VISION_SERVER_URL'),
+            result_cache=FrameResultCache(
+                ttl=self.config.get('VLM_CACHE_TTL', 30.0),
+                max_distance=self.config.get('VLM_CACHE_DISTANCE', 6)
+            )
+        )
         logger.info("Vision module initialized")
         
-        # STT (Whisper)
+        # STT (Whisper), with keyword spotting for fixed commands when templates exist
         whisper_model = self.config.get('WHISPER_MODEL', './models/stt/ggml-base.en.bin')
-        self.stt = WhisperSTT(whisper_model)
+        spotter = KeywordSpotter(threshold=self.config.get('KWS_THRESHOLD', 2.0))
+        if not spotter.load_templates(self.config.get('KWS_TEMPLATES_DIR', './models/kws')):
+            spotter = None
+        self.stt = WhisperSTT(
+            whisper_model,
+            backend=self.config.get('WHISPER_BACKEND', 'subprocess'),
+            server_url=self.config.get('WHISPER_SERVER_URL'),
+            keyword_spotter=spotter,
+            streaming=self.config.get('STT_STREAMING', False),
+            queue_size=self.config.get('STT_QUEUE_SIZE', 4),
+            max_queue_age=self.config.get('STT_MAX_QUEUE_AGE', 6.0),
+            vad=create_vad(self.config.get('VAD_ENGINE', 'spectral'),
+                           threshold=self.config.get('VAD_THRESHOLD', 0.02))
+        )
+        self.stt.set_command_vocabulary(
+            COMMAND_PHRASES,
+            matcher=lambda text: match_intent(text) is not None
+        )
         logger.info("STT module initialized")
         
         # TTS (Piper)
         piper_voice = self.config.get('PIPER_VOICE', './models/tts/en_US-amy-low.onnx')
-        self.tts = PiperTTS(piper_voice)
+        phrase_cache = PhraseCache(cache_dir=self.config.get('TTS_CACHE_DIR'))
+        self.tts = PiperTTS(
+            piper_voice,
+            streaming=self.config.get('TTS_STREAMING', False),
+            phrase_cache=phrase_cache
+        )
         logger.info("TTS module initialized")
         
+        # Handlers queue speech and return; safety warnings preempt steps and chatter
+        self.speech = SpeechScheduler(self.tts)
+        
+        # Barge-in: the user can talk over the assistant; its own voice is gated out
+        self.duplex = None
+        if self.config.get('BARGE_IN', True):
+            self.duplex = DuplexAudioController(self.tts, self.stt)
+        
         # OCR (Tesseract)
         ocr_langs = self.config.get('OCR_LANGS', 'eng+deva')
-        self.ocr = TesseractOCR(ocr_langs)
+        self.ocr = TesseractOCR(
+            ocr_langs,
+            confidence_threshold=self.config.get('OCR_CONFIDENCE', 0.7),
+            latency_budget=self.config.get('OCR_LATENCY_BUDGET', 1.5),
+            backend=self.config.get('OCR_BACKEND', 'auto')
+        )
         logger.info("OCR module initialized")
         
         # Quantity Estimator
@@ -98,8 +176,22 @@ class ChefAssistant:
         self.quantity_estimator = QuantityEstimator(calib_data)
         logger.info("Quantity estimator initialized")
         
-        # Camera (placeholder - will be initialized when needed)
-        self.camera = None
+        # Worker pool for running perception stages (VLM, OCR, spoon detector) in parallel
+        self.perception_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="perception")
+        
+        # Camera: shared background grabber (also used by the GUI)
+        self.camera = get_camera_service(self.config.get('CAMERA_INDEX', 0))
+        self.camera.start()
+        
+        # Scene gate: wait for stable, sharp frames and skip unchanged scenes
+        self.scene_gate = SceneGate()
+        self.last_analysis = None
+        # Guards scene_gate/last_analysis: an abandoned VLM stage may still be
+        # finishing while the next request analyzes a new frame
+        self.analysis_lock = threading.Lock()
+        
+        # Region of interest: crop to the spoon/jar before VLM and OCR
+        self.roi = ROISelector()
     
     def _load_calibration(self, calib_file: str) -> Optional[Dict]:
         """Load calibration data from YAML file."""
@@ -126,9 +218,15 @@ class ChefAssistant:
                 recipe = json.load(f)
         except Exception as e:
             logger.error(f"Failed to load recipe: {e}")
-            self.tts.speak("Sorry, I couldn't load the recipe. Please check the file.")
+            self.speech.say("Sorry, I couldn't load the recipe. Please check the file.", SpeechPriority.STEP)
             return
         
+        # Bias short-utterance recognition towards this recipe's ingredients
+        self.stt.set_command_vocabulary(
+            COMMAND_PHRASES,
+            [item.get('ingredient', '') for item in recipe.get('ingredients', [])]
+        )
+        
         # Initialize recipe validator
         self.session['recipe'] = recipe
         self.session['validator'] = RecipeValidator(recipe)
@@ -144,9 +242,39 @@ class ChefAssistant:
                    f"I'll guide you through each step with safety reminders. "
                    f"Say 'next step' when you're ready to begin.")
         
-        self.tts.speak(greeting)
+        self.speech.say(greeting, SpeechPriority.STEP)
+        
+        # Render all of the recipe's speech in the background once the greeting
+        # (and any other live speech) is done
+        self.tts.presynthesize_async(
+            self._recipe_utterances(recipe),
+            bundle_id=self._file_hash(recipe_path),
+            busy=self.speech.is_busy
+        )
         logger.info(f"Session started: {recipe_name}")
     
+    def _recipe_utterances(self, recipe: Dict[str, Any]) -> List[str]:
+        """List every utterance the step handlers will speak for a recipe."""
+        steps = recipe.get('steps', [])
+        utterances = []
+        for index, step in enumerate(steps):
+            instruction = step.get('instruction', '')
+            utterances.extend(step.get('safety', []))
+            utterances.append(self.tts.format_step(instruction, index + 1, len(steps)))
+            if step.get('check'):
+                utterances.append(SHOW_INGREDIENT_PROMPT)
+            utterances.append(instruction)  # spoken by 'repeat' and the voice callback
+        return utterances
+    
+    @staticmethod
+    def _file_hash(path: str) -> Optional[str]:
+        """Content hash of a file, used to key per-recipe speech bundles."""
+        try:
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            return None
+    
     def process_voice_command(self, command: str) -> str:
         """
         Process a voice command and return response.
@@ -157,34 +285,29 @@ class ChefAssistant:
         Returns:
             Response text
         """
-        # Prevent concurrent command processing
-        if self.session.get('processing_command', False):
-            logger.debug("Already processing a command, ignoring")
-            return ""
+        # Serialize commands: wait for the one in progress rather than dropping silently
+        if not self._command_lock.acquire(timeout=self.config.get('COMMAND_WAIT', 5.0)):
+            self.session['dropped_commands'] += 1
+            logger.warning(f"Still busy with the previous command, dropped '{command}'")
+            return "I'm still working on your last request."
 
         self.session['processing_command'] = True
         try:
             command = command.lower().strip()
             logger.info(f"Processing command: '{command}'")
 
-            # Intent recognition (simple keyword matching)
-            if any(kw in command for kw in ['next', 'continue', 'proceed']):
-                response = self._handle_next_step()
-
-            elif any(kw in command for kw in ['what', 'identify', 'recognize', 'see']):
-                response = self._handle_identify_request(command)
-
-            elif any(kw in command for kw in ['how much', 'quantity', 'measure']):
-                response = self._handle_quantity_check()
-
-            elif any(kw in command for kw in ['repeat', 'again', 'say again']):
-                response = self._handle_repeat()
-
-            elif any(kw in command for kw in ['help', 'what can']):
-                response = self._handle_help()
-
-            elif any(kw in command for kw in ['stop', 'exit', 'quit', 'end']):
-                response = self._handle_stop()
+            # Intent recognition (keyword matching against the intent table)
+            handlers = {
+                'next': self._handle_next_step,
+                'identify': lambda: self._handle_identify_request(command),
+                'quantity': self._handle_quantity_check,
+                'repeat': self._handle_repeat,
+                'help': self._handle_help,
+                'stop': self._handle_stop,
+            }
+            intent = match_intent(command)
+            if intent is not None:
+                response = handlers[intent]()
             else:
                 response = "I didn't understand that. Say 'help' for available commands."
             
@@ -192,6 +315,7 @@ class ChefAssistant:
 
         finally:
             self.session['processing_command'] = False
+            self._command_lock.release()
 
     def _handle_voice_callback(self, transcription: str):
         """
@@ -205,9 +329,9 @@ class ChefAssistant:
         # Process the command
         response = self.process_voice_command(transcription)
 
-        # Speak the response
+        # Speak the response (queued; the STT thread goes back to listening)
         if response:
-            self.tts.speak(response)
+            self.speech.say(response, SpeechPriority.STEP)
 
     def _handle_next_step(self) -> str:
         """Handle 'next step' command."""
@@ -225,19 +349,18 @@ class ChefAssistant:
         safety_warnings = current_step.get('safety', [])
         check_ingredient = current_step.get('check')
         
-        # Speak safety warnings first
+        # Safety warnings are spoken first (they outrank anything else queued)
         for warning in safety_warnings:
-            self.tts.speak(warning)
-            time.sleep(0.5)
+            self.speech.say(warning, SpeechPriority.SAFETY)
         
         # Speak the instruction
         step_num = validator.session_state['current_step'] + 1
         total_steps = len(self.session['recipe'].get('steps', []))
-        self.tts.speak_step(instruction, step_num, total_steps)
+        self.speech.say(self.tts.format_step(instruction, step_num, total_steps), SpeechPriority.STEP)
         
         # If this step requires checking an ingredient, prepare for validation
         if check_ingredient:
-            self.tts.speak("Show me the ingredient when you're ready to add it.")
+            self.speech.say(SHOW_INGREDIENT_PROMPT, SpeechPriority.STEP)
         
         # Advance step counter
         validator.advance_step()
@@ -246,14 +369,15 @@ class ChefAssistant:
     
     def _handle_identify_request(self, command: str) -> str:
         """Handle 'what is this' type requests."""
-        self.tts.speak("Hold the item steady in front of the camera. Analyzing...")
+        # Capture and analysis run while the prompt is being spoken
+        self.speech.say("Hold the item steady in front of the camera. Analyzing...")
         # Capture frame
         frame = self._capture_frame()
         if frame is None:
             return "Sorry, I couldn't access the camera."
         
-        # Analyze with VLM
-        vlm_result = self.vision.analyze_frame(frame)
+        # Analyze with VLM (skipped if the scene is unchanged)
+        vlm_result = self._analyze_scene(frame)
         
         # Extract recognized items
         items = vlm_result.get('recognized_items', [])
@@ -287,21 +411,15 @@ class ChefAssistant:
     
     def _handle_quantity_check(self) -> str:
         """Handle quantity checking requests."""
-        self.tts.speak("Hold the measuring spoon or cup steady. Checking quantity...")
+        self.speech.say("Hold the measuring spoon or cup steady. Checking quantity...")
         
         # Capture frame
         frame = self._capture_frame()
         if frame is None:
             return "Sorry, I couldn't access the camera."
         
-        # Analyze with VLM
-        vlm_result = self.vision.analyze_frame(frame)
-        
-        # Run OCR on the frame
-        ocr_text = self.ocr.read_text(frame)
-        
-        # Estimate quantity
-        qty_estimate = self.quantity_estimator.estimate_quantity(vlm_result, ocr_text)
+        # Run VLM, OCR and spoon detection in parallel; fuse results as they arrive
+        qty_estimate = self._estimate_quantity_parallel(frame)
         
         if qty_estimate:
             response = f"I see approximately {qty_estimate.amount} {qty_estimate.unit}."
@@ -337,6 +455,66 @@ class ChefAssistant:
         else:
             return "I couldn't determine the quantity. Make sure the measuring tool is clearly visible."
     
+    def _estimate_quantity_parallel(self, frame: np.ndarray) -> Optional[QuantityEstimate]:
+        """
+        Fan out the perception stages on the same frame and fuse their results.
+        Returns as soon as the estimate is conclusive and no stage that could
+        outrank it is still running (spoon readings from the VLM or the spoon
+        detector beat OCR marks); slower stages are abandoned.
+        
+        Abandoned stages that have not started are skipped, but a VLM or OCR
+        call already running cannot be interrupted: it finishes in the
+        background (without updating the scene state) and keeps its pool
+        worker busy until then.
+        """
+        # One ROI selection for both crops, before any stage can update it
+        vlm_crop, ocr_crop = self.roi.crops(frame)
+        cancel = threading.Event()
+        stages = {
+            self.perception_pool.submit(self._timed, cancel, self._analyze_scene, frame, vlm_crop, cancel): 'vlm',
+            self.perception_pool.submit(self._timed, cancel, self.ocr.read_text, ocr_crop): 'ocr',
+            self.perception_pool.submit(self._timed, cancel, detect_spoons_opencv, frame): 'spoon'
+        }
+        inputs = {'vlm': {}, 'ocr': "", 'spoon': []}
+        timings = {}
+        start = time.time()
+        qty_estimate = None
+        pending = set(stages.values())
+        
+        for future in as_completed(stages):
+            stage = stages[future]
+            pending.discard(stage)
+            try:
+                inputs[stage], timings[stage] = future.result()
+            except Exception as e:
+                logger.error(f"Perception stage '{stage}' failed: {e}")
+                continue
+            
+            qty_estimate = self.quantity_estimator.estimate_quantity(
+                inputs['vlm'], inputs['ocr'], spoon_detections=inputs['spoon']
+            )
+            outranked = qty_estimate.method != "spoon_fill_ratio" and pending & {'vlm', 'spoon'}
+            if self.quantity_estimator.is_conclusive(qty_estimate) and not outranked:
+                logger.info(f"Quantity estimate conclusive after '{stage}' stage")
+                break
+        
+        cancel.set()
+        for future in stages:
+            future.cancel()
+        
+        timing_text = ", ".join(f"{name}={secs * 1000:.0f}ms" for name, secs in timings.items())
+        logger.info(f"Quantity check stages: {timing_text} (total {(time.time() - start) * 1000:.0f}ms)")
+        return qty_estimate
+    
+    @staticmethod
+    def _timed(cancel: threading.Event, func: Callable, *args) -> Tuple[Any, float]:
+        """Run func(*args) unless already abandoned; return (result, elapsed seconds)."""
+        if cancel.is_set():
+            raise CancelledError()
+        start = time.time()
+        result = func(*args)
+        return result, time.time() - start
+    
     def _handle_repeat(self) -> str:
         """Handle repeat request."""
         if self.session['active']:
@@ -345,7 +523,7 @@ class ChefAssistant:
             if current_idx > 0:
                 prev_step = self.session['recipe']['steps'][current_idx - 1]
                 instruction = prev_step.get('instruction', 'No previous step')
-                self.tts.speak(instruction)
+                self.speech.say(instruction, SpeechPriority.STEP)
                 return instruction
         
         return "There's no previous step to repeat."
@@ -360,7 +538,7 @@ class ChefAssistant:
             "Say 'repeat' to hear the last step again. "
             "Say 'stop' to end the session."
         )
-        self.tts.speak(help_text)
+        self.speech.say(help_text, SpeechPriority.STEP)
         return help_text
     
     def _handle_stop(self) -> str:
@@ -369,7 +547,7 @@ class ChefAssistant:
             summary = self.session['validator'].get_session_summary()
             response = (f"Ending session. You completed {summary['current_step']} of {summary['total_steps']} steps. "
                        f"Goodbye!")
-            self.tts.speak(response)
+            self.speech.say(response, SpeechPriority.STEP)
             self.session['active'] = False
 
             # Stop voice listening if active
@@ -381,28 +559,60 @@ class ChefAssistant:
             return "No active session to stop."
     
     def _capture_frame(self) -> Optional[np.ndarray]:
-        """Capture a frame from the camera."""
-        try:
-            import cv2
-            
-            # Initialize camera if needed
-            if self.camera is None:
-                self.camera = cv2.VideoCapture(0)
-                time.sleep(1)  # Camera warm-up
-            
-            # Capture frame
-            ret, frame = self.camera.read()
-            if ret:
-                self.session['current_frame'] = frame
-                return frame
-            else:
-                logger.error("Failed to capture frame")
-                return None
-                
-        except ImportError:
+        """
+        Wait (briefly) for a stable, sharp frame from the camera service.
+        The frame is an owned copy, safe to hold across VLM/OCR/ROI stages.
+        """
+        if not self.camera.available:
             logger.error("OpenCV not available")
             # Return mock frame for testing
             return np.zeros((480, 640, 3), dtype=np.uint8)
+        
+        if not self.camera.wait_until_ready(timeout=2.0):
+            logger.error("Failed to capture frame")
+            return None
+        
+        frame = self.scene_gate.wait_for_stable(
+            self.camera, deadline=self.config.get('SCENE_STABLE_DEADLINE', 1.5)
+        )
+        self.session['current_frame'] = frame
+        return frame
+    
+    def _analyze_scene(
+        self,
+        frame: np.ndarray,
+        crop: Optional[ROICrop] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the VLM on a frame unless the scene is unchanged since the last analysis.
+        
+        Args:
+            frame: Frame to analyze
+            crop: Precomputed VLM crop of the frame (selected from the ROI if None)
+            cancel: Set when the caller abandoned this analysis; its result is
+                then not recorded as the latest scene state
+        """
+        with self.analysis_lock:
+            if self.last_analysis is not None and not self.scene_gate.has_changed(frame):
+                logger.info("Scene unchanged since last analysis - skipping VLM")
+                return self.last_analysis
+        
+        if crop is None:
+            crop = self.roi.crop_for_vlm(frame)
+        vlm_result = self.vision.analyze_frame(crop.image)
+        if cancel is not None and cancel.is_set():
+            return vlm_result
+        
+        with self.analysis_lock:
+            self.roi.update_from_vlm(vlm_result, crop, frame)
+            if any(vlm_result.get(key) for key in ("recognized_items", "containers", "tools")):
+                self.scene_gate.mark_analyzed(frame)
+                self.last_analysis = vlm_result
+            else:
+                # Empty or failed analysis: retry on the next request even if the scene is unchanged
+                self.last_analysis = None
+        return vlm_result
     
     def run_interactive(self):
         """Run in interactive CLI mode (for testing without voice)."""
@@ -456,8 +666,10 @@ class ChefAssistant:
         logger.info("Starting voice mode...")
         self.session['voice_mode'] = True
 
-        # Optional: Calibrate VAD
-        calibrate = input("Calibrate voice detection? (y/n): ").lower().strip()
+        # Optional: Calibrate VAD (adaptive engines track the noise floor themselves)
+        calibrate = 'n'
+        if not self.stt.vad.adaptive:
+            calibrate = input("Calibrate voice detection? (y/n): ").lower().strip()
         if calibrate == 'y':
             print("Calibrating... please remain silent for 3 seconds...")
             threshold = self.stt.calibrate_vad(duration=3.0)
@@ -465,7 +677,7 @@ class ChefAssistant:
             print(f"VAD threshold set to: {threshold:.4f}")
 
         # Start listening with callback
-        self.tts.speak("Voice mode activated. I'm listening for your commands.")
+        self.speech.say("Voice mode activated. I'm listening for your commands.")
         self.stt.start_listening(callback=self._handle_voice_callback)
 
         print("\n" + "="*60)
@@ -498,17 +710,50 @@ class ChefAssistant:
         logger.info("Stopping voice mode...")
         self.stt.stop_listening()
         self.session['voice_mode'] = False
-        self.tts.speak("Voice mode deactivated.")
+        self.speech.say("Voice mode deactivated.")
         print("Voice mode stopped.")
 
     def cleanup(self):
         """Cleanup resources."""
-        if self.camera is not None:
-            self.camera.release()
+        self.camera.stop()
+        self.perception_pool.shutdown(wait=False)
 
         if self.session.get('voice_mode', False):
             self.stop_voice_mode()
 
+        self.vision.close()
+        self.stt.close()
+        self.speech.close()
+        self.tts.close()
+        self.ocr.close()
+
+        speech_stats = self.speech.stats()
+        logger.info(f"Speech: {speech_stats['spoken']} spoken, {speech_stats['preemptions']} preempted, "
+                    f"{speech_stats['dropped']} dropped")
+
+        cache_stats = self.tts.cache_stats()
+        logger.info(f"TTS cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"(hit rate {cache_stats['hit_rate']:.0%})")
+
+        logger.info(f"STT: {self.stt.kws_hits} commands by keyword spotting, "
+                    f"{self.stt.whisper_runs} Whisper transcriptions, "
+                    f"{self.stt.grammar_rejections} low-confidence command decodes redone")
+
+        queue_stats = self.stt.audio_queue.stats()
+        logger.info(f"STT queue: {queue_stats['dropped_full']} dropped (full), "
+                    f"{queue_stats['dropped_stale']} dropped (stale), {queue_stats['coalesced']} coalesced, "
+                    f"{self.stt.dropped_overrun} overwritten, {self.stt.skipped_claimed} already dispatched; "
+                    f"{self.session['dropped_commands']} commands dropped while busy")
+
+        if self.duplex is not None:
+            duplex_stats = self.duplex.stats()
+            logger.info(f"Barge-in: {duplex_stats['barge_ins']} interruptions, "
+                        f"{duplex_stats['gated_chunks']} echo chunks gated")
+
+        vad_stats = self.stt.vad.metrics.summary()
+        logger.info(f"VAD: {vad_stats['triggers']} triggers ({vad_stats['triggers_per_minute']:.1f}/min), "
+                    f"{vad_stats['pass_rate']:.0%} passed to Whisper")
+
         logger.info("Chef Assistant shutdown")
 
 
@@ -516,9 +761,31 @@ def load_config() -> Dict[str, Any]:
     """Load configuration from environment variables."""
     config = {
         'VISION_MODEL': os.getenv('VISION_MODEL', './models/vision/moondream2-q4.gguf'),
+        'VISION_BACKEND': os.getenv('VISION_BACKEND', 'subprocess'),
+        'VISION_SERVER_URL': os.getenv('VISION_SERVER_URL'),
+        'VLM_CACHE_TTL': float(os.getenv('VLM_CACHE_TTL', '30')),
+        'VLM_CACHE_DISTANCE': int(os.getenv('VLM_CACHE_DISTANCE', '6')),
         'WHISPER_MODEL': os.getenv('WHISPER_MODEL', './models/stt/ggml-base.en.bin'),
+        'WHISPER_BACKEND': os.getenv('WHISPER_BACKEND', 'subprocess'),
+        'WHISPER_SERVER_URL': os.getenv('WHISPER_SERVER_URL'),
+        'KWS_TEMPLATES_DIR': os.getenv('KWS_TEMPLATES_DIR', './models/kws'),
+        'KWS_THRESHOLD': float(os.getenv('KWS_THRESHOLD', '2.0')),
+        'STT_STREAMING': os.getenv('STT_STREAMING', '0') == '1',
+        'STT_QUEUE_SIZE': int(os.getenv('STT_QUEUE_SIZE', '4')),
+        'STT_MAX_QUEUE_AGE': float(os.getenv('STT_MAX_QUEUE_AGE', '6')),
+        'COMMAND_WAIT': float(os.getenv('COMMAND_WAIT', '5')),
+        'BARGE_IN': os.getenv('BARGE_IN', '1') == '1',
+        'VAD_ENGINE': os.getenv('VAD_ENGINE', 'spectral'),
+        'VAD_THRESHOLD': float(os.getenv('VAD_THRESHOLD', '0.02')),
         'PIPER_VOICE': os.getenv('PIPER_VOICE', './models/tts/en_US-amy-low.onnx'),
+        'TTS_STREAMING': os.getenv('TTS_STREAMING', '0') == '1',
+        'TTS_CACHE_DIR': os.getenv('TTS_CACHE_DIR', './cache/tts'),
         'OCR_LANGS': os.getenv('OCR_LANGS', 'eng+deva'),
+        'OCR_BACKEND': os.getenv('OCR_BACKEND', 'auto'),
+        'OCR_CONFIDENCE': float(os.getenv('OCR_CONFIDENCE', '0.7')),
+        'OCR_LATENCY_BUDGET': float(os.getenv('OCR_LATENCY_BUDGET', '1.5')),
+        'CAMERA_INDEX': int(os.getenv('CAMERA_INDEX', '0')),
+        'SCENE_STABLE_DEADLINE': float(os.getenv('SCENE_STABLE_DEADLINE', '1.5')),
         'SPOON_DETECTOR_ONNX': os.getenv('SPOON_DETECTOR_ONNX'),
         'DEPTH_MODEL_ONNX': os.getenv('DEPTH_MODEL_ONNX'),
         'CALIB_FILE': os.getenv('CALIB_FILE'),
@@ -18,6 +18,7 @@ import logging
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from chef_assistant import ChefAssistant, load_config
+from camera_service import get_camera_service
 
 # Setup logging
 logging.basicConfig(
@@ -232,10 +233,11 @@ class ChefAssistantGUI:
     def camera_loop(self):
         """Main camera loop (runs in separate thread)."""
         try:
-            # Try to open camera
-            self.camera = cv2.VideoCapture(0)
+            # Share the assistant's camera service instead of opening the device twice
+            self.camera = get_camera_service(load_config()['CAMERA_INDEX'])
+            self.camera.start()
             
-            if not self.camera.isOpened():
+            if not self.camera.wait_until_ready(timeout=3.0):
                 self.root.after(0, lambda: self.camera_status.config(
                     text="Camera: Not available (using placeholder)",
                     fg="#E74C3C"
@@ -250,10 +252,10 @@ class ChefAssistantGUI:
             ))
             
             while self.is_running:
-                ret, frame = self.camera.read()
+                frame = self.camera.read()
                 
-                if ret:
-                    # Store current frame for processing
+                if frame is not None:
+                    # Store current frame for processing (the ring slot is reused)
                     self.current_frame = frame.copy()
                     
                     # Convert BGR to RGB
@@ -391,7 +393,7 @@ class ChefAssistantGUI:
         self.is_running = False
         
         if self.camera:
-            self.camera.release()
+            self.camera.stop()
         
         if self.assistant:
             self.assistant.cleanup()
@@ -0,0 +1,280 @@
+# camera_service.py
+"""
+Shared Camera Service
+Opens the camera once and grabs continuously on a dedicated thread into a small
+preallocated ring buffer, so the orchestrator, GUI, OCR and VLM all read the
+freshest frame without reopening the device or waiting on driver-buffered frames.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CameraService:
+    """
+    Background frame grabber with a latest-frame ring buffer.
+
+    Frames are returned as read-only views into the ring buffer (zero-copy).
+    A view stays valid for roughly `buffer_size - 1` frame periods before the
+    grabber reuses its slot; pass copy=True to keep a frame longer.
+    """
+
+    def __init__(
+        self,
+        camera_index: int = 0,
+        resolution: Tuple[int, int] = (640, 480),
+        buffer_size: int = 4
+    ):
+        """
+        Initialize camera service.
+
+        Args:
+            camera_index: OpenCV camera index
+            resolution: Requested (width, height)
+            buffer_size: Number of frames kept in the ring buffer
+        """
+        self.camera_index = camera_index
+        self.resolution = resolution
+        self.buffer_size = max(2, buffer_size)
+
+        self.available = True  # False when OpenCV is missing
+        self.error: Optional[str] = None
+
+        self._capture = None
+        self._frames: Optional[np.ndarray] = None
+        self._timestamps = np.zeros(self.buffer_size, dtype=np.float64)
+        self._latest = -1
+        self._frame_count = 0
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def is_running(self) -> bool:
+        """True while the grab thread is active."""
+        return self._running
+
+    @property
+    def frame_count(self) -> int:
+        """Total number of frames grabbed so far."""
+        return self._frame_count
+
+    def start(self):
+        """Open the camera and start grabbing on a background thread (non-blocking)."""
+        if self._running:
+            return
+        self._running = True
+        self._ready.clear()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self._thread.start()
+
+    def wait_until_ready(self, timeout: float = 3.0) -> bool:
+        """
+        Wait for the first frame.
+
+        Returns:
+            True if frames are flowing, False if the camera failed or timed out
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._ready.wait(0.05):
+                return True
+            if self._stopped.is_set():
+                return False
+        return False
+
+    def _open_capture(self):
+        """Open the OpenCV capture device."""
+        import cv2
+
+        capture = cv2.VideoCapture(self.camera_index)
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Keep driver-side queue short
+        return capture
+
+    def _grab_loop(self):
+        """Grab frames continuously into the ring buffer (runs in separate thread)."""
+        try:
+            self._capture = self._open_capture()
+        except ImportError:
+            logger.error("OpenCV not available - camera service disabled")
+            self.available = False
+            self.error = "OpenCV not available"
+            self._running = False
+            self._stopped.set()
+            return
+
+        if not self._capture.isOpened():
+            logger.error(f"Could not open camera {self.camera_index}")
+            self.error = "Camera not available"
+            self._running = False
+            self._capture.release()
+            self._capture = None
+            self._stopped.set()
+            return
+
+        logger.info(f"Camera {self.camera_index} opened, grabbing frames")
+        failures = 0
+
+        while self._running:
+            if not self._capture.grab():
+                failures += 1
+                if failures % 50 == 0:
+                    logger.warning(f"Camera grab failing ({failures} consecutive)")
+                time.sleep(0.02)
+                continue
+            failures = 0
+
+            slot = (self._latest + 1) % self.buffer_size
+            if self._frames is None:
+                ok, frame = self._capture.retrieve()
+                if not ok or frame is None:
+                    continue
+                # Preallocate the ring buffer once the real frame shape is known
+                self._frames = np.empty((self.buffer_size,) + frame.shape, dtype=frame.dtype)
+                self._frames[slot] = frame
+            else:
+                ok, frame = self._capture.retrieve(self._frames[slot])
+                if not ok or frame is None:
+                    continue
+                if frame.shape != self._frames.shape[1:]:
+                    continue
+                if frame is not self._frames[slot] and not np.shares_memory(frame, self._frames[slot]):
+                    np.copyto(self._frames[slot], frame)
+
+            with self._cond:
+                self._timestamps[slot] = time.time()
+                self._latest = slot
+                self._frame_count += 1
+                self._cond.notify_all()
+            self._ready.set()
+
+        self._capture.release()
+        self._capture = None
+        self._stopped.set()
+        logger.info(f"Camera {self.camera_index} released")
+
+    def _view(self, slot: int, copy: bool) -> np.ndarray:
+        frame = self._frames[slot]
+        if copy:
+            return frame.copy()
+        view = frame.view()
+        view.flags.writeable = False
+        return view
+
+    def latest(self, copy: bool = False) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Return the freshest frame and its capture timestamp.
+
+        Args:
+            copy: Return an owned copy instead of a read-only view
+
+        Returns:
+            (frame, timestamp) or None if no frame has been grabbed yet
+        """
+        with self._cond:
+            if self._latest < 0:
+                return None
+            slot = self._latest
+            return self._view(slot, copy), float(self._timestamps[slot])
+
+    def read(self, timeout: float = 2.0, copy: bool = False) -> Optional[np.ndarray]:
+        """
+        Return the freshest frame, waiting up to `timeout` for the first one.
+
+        Returns:
+            BGR frame, or None if the camera is unavailable
+        """
+        if self._latest < 0 and not self.wait_until_ready(timeout):
+            return None
+        latest = self.latest(copy)
+        return latest[0] if latest else None
+
+    def wait_for_frame(self, after: float, timeout: float = 1.0) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Wait for a frame captured strictly after timestamp `after`.
+
+        Returns:
+            (frame, timestamp) or None on timeout
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._latest < 0 or self._timestamps[self._latest] <= after:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._cond.wait(remaining)
+            slot = self._latest
+            return self._view(slot, False), float(self._timestamps[slot])
+
+    def recent(self, count: int) -> List[Tuple[np.ndarray, float]]:
+        """Return up to `count` most recent frames (newest first) as read-only views."""
+        with self._cond:
+            available = min(count, self._frame_count, self.buffer_size - 1)
+            slots = [(self._latest - i) % self.buffer_size for i in range(available)]
+            return [(self._view(s, False), float(self._timestamps[s])) for s in slots]
+
+    def sharpest(self, count: int = 3) -> Optional[np.ndarray]:
+        """
+        Return the sharpest of the last `count` frames (variance of the Laplacian).
+
+        Returns:
+            Read-only frame view, or None if no frames are available
+        """
+        frames = self.recent(count)
+        if not frames:
+            return None
+        if len(frames) == 1:
+            return frames[0][0]
+
+        import cv2
+
+        def sharpness(frame: np.ndarray) -> float:
+            small = frame[::4, ::4]
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+            return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+        return max(frames, key=lambda item: sharpness(item[0]))[0]
+
+    def stop(self):
+        """Stop grabbing and release the camera."""
+        if not self._running:
+            return
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+_services: Dict[int, CameraService] = {}
+_services_lock = threading.Lock()
+
+
+def get_camera_service(camera_index: int = 0, **kwargs) -> CameraService:
+    """
+    Return the process-wide camera service for `camera_index`, creating it on first use.
+
+    Args:
+        camera_index: OpenCV camera index
+        **kwargs: Passed to CameraService on creation
+
+    Returns:
+        Shared CameraService (not started)
+    """
+    with _services_lock:
+        service = _services.get(camera_index)
+        if service is None:
+            service = CameraService(camera_index, **kwargs)
+            _services[camera_index] = service
+        return service
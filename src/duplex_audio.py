@@ -0,0 +1,162 @@
+# duplex_audio.py
+"""
+Full-Duplex Audio Controller
+Lets the user talk over the assistant (barge-in). While TTS is playing, the
+capture path is echo-gated: speech-like audio only counts as the user when it
+is clearly louder than the assistant's own voice picked up by the microphone.
+Confirmed user speech first ducks and then stops playback, and the utterance
+(including its pre-roll) goes to transcription as usual.
+"""
+
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DuplexAudioController:
+    """
+    Couples PiperTTS playback with the WhisperSTT capture path.
+    - Echo gating: VAD hits during playback are suppressed unless the chunk
+      is echo_ratio times louder than the tracked echo level (a peak follower
+      over the mic level during playback, learned from the first chunks after
+      audio actually starts playing, not from the silence while synthesizing)
+    - Barge-in: the first loud speech chunk ducks playback, barge_in_chunks
+      consecutive ones stop it
+    """
+
+    def __init__(
+        self,
+        tts,
+        stt,
+        echo_ratio: float = 2.0,
+        barge_in_chunks: int = 3,
+        duck_gain: float = 0.3,
+        echo_tail: float = 0.3,
+        echo_decay: float = 0.05,
+        warmup_chunks: int = 3
+    ):
+        """
+        Initialize the controller and attach it to the capture path.
+
+        Args:
+            tts: PiperTTS instance (stop/duck/is_speaking)
+            stt: WhisperSTT instance (capture_gate hook)
+            echo_ratio: Required ratio of mic RMS to the echo level during playback
+            barge_in_chunks: Consecutive loud speech chunks that stop playback
+            duck_gain: Playback gain while a possible barge-in is being confirmed
+            echo_tail: Seconds after playback during which the gate stays closed
+                (room reverberation of the assistant's voice)
+            echo_decay: Per-chunk decay of the echo peak level; also the rate at
+                which the level rises towards a loud chunk that may be a barge-in
+            warmup_chunks: Chunks at the start of each assistant utterance's
+                playback that are only used to learn the echo level
+        """
+        self.tts = tts
+        self.stt = stt
+        self.echo_ratio = echo_ratio
+        self.barge_in_chunks = barge_in_chunks
+        self.duck_gain = duck_gain
+        self.echo_tail = echo_tail
+        self.echo_decay = echo_decay
+        self.warmup_chunks = warmup_chunks
+
+        self.echo_level = 0.0
+        self._candidate_chunks = 0
+        self._ducked = False
+        self._barged_in = False
+        self._was_speaking = False
+        self._last_playback = 0.0
+        self._playback_chunks = 0
+
+        self.barge_ins = 0
+        self.gated_chunks = 0
+
+        stt.capture_gate = self.gate
+
+    def detach(self):
+        """Remove the gate from the capture path."""
+        if self.stt.capture_gate == self.gate:
+            self.stt.capture_gate = None
+
+    def gate(self, chunk: np.ndarray, is_voice: bool) -> bool:
+        """
+        Filter one VAD decision (called by the capture loop).
+
+        Args:
+            chunk: Captured samples
+            is_voice: VAD decision for the chunk
+
+        Returns:
+            True if the chunk should count as user speech
+        """
+        now = time.time()
+        speaking = self.tts.is_speaking()
+        if speaking:
+            if not self._was_speaking:
+                # New utterance from the assistant
+                self._barged_in = False
+                self._playback_chunks = 0
+            if self.tts.is_playing():
+                # Synthesis can take longer than the warm-up: only audible chunks count
+                self._playback_chunks += 1
+            self._last_playback = now
+        self._was_speaking = speaking
+
+        # Gate open: nothing playing, or the user already took the turn
+        if self._barged_in or (not speaking and now - self._last_playback > self.echo_tail):
+            self._release()
+            return is_voice
+
+        rms = float(np.sqrt(np.dot(chunk, chunk) / len(chunk))) if len(chunk) else 0.0
+        if self._playback_chunks == 0:
+            # Still synthesizing: nothing audible to learn from or to talk over
+            if is_voice:
+                self.gated_chunks += 1
+            return False
+        loud = rms > self.echo_ratio * self.echo_level
+
+        if is_voice and loud and self._playback_chunks > self.warmup_chunks:
+            # Rise slowly towards the candidate: a user keeps clear of it, while
+            # echo that merely got louder soon stops counting as loud
+            self.echo_level += self.echo_decay * (rms - self.echo_level)
+            self._candidate_chunks += 1
+            if self._candidate_chunks >= self.barge_in_chunks:
+                self._barge_in()
+            elif not self._ducked:
+                self.tts.duck(self.duck_gain)
+                self._ducked = True
+            return True
+
+        # Assistant's own voice (or silence): learn its level and keep it out
+        self.echo_level = max(rms, self.echo_level * (1.0 - self.echo_decay))
+        if self._candidate_chunks:
+            # Not confirmed: the utterance opened for it was echo
+            self._release()
+            self.stt.discard_utterance()
+        if is_voice:
+            self.gated_chunks += 1
+        return False
+
+    def _barge_in(self):
+        logger.info("Barge-in: user started speaking, stopping playback")
+        self.tts.stop()
+        self.barge_ins += 1
+        self._barged_in = True
+        self._release()
+
+    def _release(self):
+        """Forget a possible barge-in and restore the volume."""
+        self._candidate_chunks = 0
+        if self._ducked:
+            self.tts.duck(1.0)
+            self._ducked = False
+
+    def stats(self):
+        """Barge-in and echo gating counters."""
+        return {
+            'barge_ins': self.barge_ins,
+            'gated_chunks': self.gated_chunks,
+            'echo_level': round(self.echo_level, 4)
+        }
@@ -0,0 +1,159 @@
+# frame_hash.py
+"""
+Perceptual Frame Hashing and VLM Result Cache
+Cheap DCT / average hashes of camera frames so near-identical frames (same jar,
+same pose) can reuse an earlier vision analysis instead of re-running the VLM.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis matrix of the given size."""
+    n = np.arange(size)
+    k = n.reshape(-1, 1)
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    """Convert a BGR (or already gray) frame to float32 luminance."""
+    if image.ndim == 3 and image.shape[2] >= 3:
+        return image[:, :, :3].astype(np.float32) @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+    return image.astype(np.float32)
+
+
+def perceptual_hash(image: np.ndarray, hash_size: int = 8, method: str = "dct") -> int:
+    """
+    Compute a 64-bit (for hash_size=8) perceptual hash of a frame.
+
+    Args:
+        image: Frame as numpy array (BGR or grayscale)
+        hash_size: Side of the hash grid (bits = hash_size ** 2)
+        method: "dct" (pHash, robust to lighting) or "average" (aHash, cheapest)
+
+    Returns:
+        Hash as a Python int
+    """
+    if method == "dct":
+        side = hash_size * 4
+    else:
+        side = hash_size
+
+    gray = _to_gray(image)
+    small = np.asarray(
+        Image.fromarray(gray).resize((side, side), Image.BILINEAR),
+        dtype=np.float32
+    )
+
+    if method == "dct":
+        basis = _dct_matrix(side)
+        coeffs = basis @ small @ basis.T
+        low = coeffs[:hash_size, :hash_size]
+        bits = low > np.median(low)
+    else:
+        bits = small > small.mean()
+
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class FrameResultCache:
+    """
+    LRU + TTL cache of VLM results keyed by (perceptual hash, prompt).
+    A lookup hits when a stored frame is within `max_distance` bits of the query.
+    """
+
+    def __init__(self, max_entries: int = 16, ttl: float = 30.0, max_distance: int = 6):
+        """
+        Initialize result cache.
+
+        Args:
+            max_entries: Maximum cached analyses (least recently used evicted)
+            ttl: Seconds an analysis stays valid
+            max_distance: Maximum Hamming distance for two frames to count as the same
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame_hash: int, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the cached analysis for a near-identical frame, if any.
+
+        Args:
+            frame_hash: perceptual_hash() of the query frame
+            prompt: Prompt the analysis must have been produced with
+        """
+        now = time.time()
+        with self._lock:
+            best_key = None
+            best_distance = self.max_distance + 1
+
+            for key, (stored_at, _) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    continue
+                if key[1] != prompt:
+                    continue
+                distance = hamming_distance(key[0], frame_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+
+            if best_key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            logger.debug(f"VLM cache hit (distance {best_distance})")
+            return copy.deepcopy(self._entries[best_key][1])
+
+    def put(self, frame_hash: int, prompt: str, result: Dict[str, Any]):
+        """Store an analysis for a frame."""
+        with self._lock:
+            key = (frame_hash, prompt)
+            self._entries[key] = (time.time(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached analyses."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries)
+            }
@@ -0,0 +1,119 @@
+# image_transport.py
+"""
+In-Memory Image Transport
+Encodes frames to bytes for VLM and OCR backends without fixed temp files.
+Bytes go over stdin/HTTP where the tool supports it; otherwise a uniquely named
+file in shared memory (/dev/shm) is used so concurrent analyses never collide.
+"""
+
+import io
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _encode_buffer() -> io.BytesIO:
+    """Per-thread reusable encode buffer (avoids reallocating for every frame)."""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = io.BytesIO()
+        _local.buffer = buffer
+    buffer.seek(0)
+    buffer.truncate(0)
+    return buffer
+
+
+def encode_image(image: np.ndarray, fmt: str = "JPEG", quality: int = 85) -> bytes:
+    """
+    Encode a BGR (or grayscale) frame to compressed image bytes.
+
+    Args:
+        image: Frame as numpy array (BGR from OpenCV, or single channel)
+        fmt: "JPEG" or "PNG"
+        quality: JPEG quality
+
+    Returns:
+        Encoded image bytes
+    """
+    try:
+        import cv2
+        ext = ".jpg" if fmt.upper() == "JPEG" else ".png"
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality] if ext == ".jpg" else []
+        ok, encoded = cv2.imencode(ext, np.ascontiguousarray(image), params)
+        if ok:
+            return encoded.tobytes()
+    except ImportError:
+        pass
+
+    if image.ndim == 3 and image.shape[2] == 3:
+        image = image[:, :, ::-1]  # BGR to RGB
+    buffer = _encode_buffer()
+    pil_image = Image.fromarray(image.astype(np.uint8))
+    if fmt.upper() == "JPEG":
+        pil_image.save(buffer, "JPEG", quality=quality)
+    else:
+        pil_image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def encode_pnm(image: np.ndarray) -> bytes:
+    """
+    Encode a frame as uncompressed PGM/PPM (no compression cost).
+    Readable by Tesseract/Leptonica from stdin.
+
+    Args:
+        image: Grayscale or BGR uint8 frame
+
+    Returns:
+        PNM file bytes
+    """
+    image = image.astype(np.uint8, copy=False)
+    height, width = image.shape[:2]
+    if image.ndim == 2:
+        header = f"P5\n{width} {height}\n255\n".encode("ascii")
+        return header + np.ascontiguousarray(image).tobytes()
+
+    header = f"P6\n{width} {height}\n255\n".encode("ascii")
+    return header + np.ascontiguousarray(image[:, :, 2::-1]).tobytes()  # BGR to RGB
+
+
+def _shared_memory_dir() -> str:
+    """Prefer RAM-backed /dev/shm; fall back to the system temp directory."""
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return tempfile.gettempdir()
+
+
+@contextmanager
+def shared_memory_file(data: bytes, suffix: str = ".jpg") -> Iterator[Path]:
+    """
+    Expose bytes as a uniquely named file for tools that need a path.
+
+    Args:
+        data: File contents
+        suffix: File extension (some tools sniff the format from it)
+
+    Yields:
+        Path to the file; it is deleted when the context exits
+    """
+    fd, name = tempfile.mkstemp(prefix="chef_", suffix=suffix, dir=_shared_memory_dir())
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        yield Path(name)
+    finally:
+        try:
+            os.unlink(name)
+        except OSError:
+            pass
@@ -0,0 +1,406 @@
+# ingredient_matcher.py
+"""
+Ingredient Alias Matcher
+Finds ingredient names in OCR (or transcribed) text using every alias in the
+knowledge base (English, transliterated and Devanagari). All aliases are
+compiled into one regular expression, so a text is scanned once regardless of
+how many aliases exist, and each hit maps back to its canonical ingredient key.
+A trigram index with bounded edit distance catches misread names ("turmerlc").
+"""
+
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KNOWLEDGE_FILE = Path(__file__).parent.parent / "knowledge" / "spices.yaml"
+
+# Word characters for boundary checks; Devanagari vowel signs and viramas are not
+# \w in Python, so the whole block is included to avoid matching inside words
+_WORD_CHARS = r"\wऀ-ॿ"
+
+
+@dataclass
+class IngredientMatch:
+    """One alias hit in a text."""
+    canonical: str  # Knowledge-base key, e.g. "turmeric"
+    alias: str      # Alias as written in the knowledge base
+    start: int
+    end: int
+
+
+@dataclass
+class FuzzyMatch:
+    """An approximate alias hit."""
+    canonical: str
+    alias: str
+    distance: int  # Edit distance after homoglyph folding
+    query: str
+    start: int = -1  # Span in the searched text (find_in_text only)
+    end: int = -1
+
+
+# Characters OCR (or mixed-script text) commonly substitutes for Latin letters
+_HOMOGLYPHS = str.maketrans({
+    'а': 'a', 'в': 'b', 'с': 'c', 'е': 'e', 'г': 'r', 'һ': 'h', 'і': 'i', 'ј': 'j',
+    'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o', 'р': 'p', 'т': 't', 'у': 'y', 'х': 'x',
+    'ѕ': 's', 'ԁ': 'd', 'ɡ': 'g', 'ο': 'o', 'ν': 'v', 'α': 'a', 'ι': 'i', 'κ': 'k',
+    '0': 'o', '1': 'l', '|': 'l', '5': 's', '$': 's', '@': 'a',
+})
+
+_TOKEN_RE = re.compile(rf"[{_WORD_CHARS}|$@]+")
+
+# Words that confirm a short alias refers to an ingredient ("rai seeds", "til tel")
+CONTEXT_WORDS = frozenset("dana ground leaves masala oil powder pure seed seeds whole".split())
+
+# Label boilerplate never worth an approximate match ("with" is one edit from "mith")
+STOPWORDS = frozenset("""
+    a an and are as at be before best by care contains cool date dry email for from
+    in ingredients is it keep made mfd mrp net no of on or pack packed packaging
+    place price product shop store sunlight tel the to tool use weight with wt www
+""".split())
+
+
+def fold(text: str) -> str:
+    """Fold case, spacing and OCR homoglyphs so misreads compare closer."""
+    return " ".join(normalize_text(text).casefold().translate(_HOMOGLYPHS).split())
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Edit distance between two strings, or None once it must exceed max_distance.
+    Only a diagonal band of width 2 * max_distance + 1 is computed.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+
+    infinity = max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [infinity] * (len(b) + 1)
+        current[0] = i if i <= max_distance else infinity
+        row_min = current[0]
+        ca = a[i - 1]
+        for j in range(low, high + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return None
+        previous = current
+
+    distance = previous[len(b)]
+    return distance if distance <= max_distance else None
+
+
+def _adjacent_words(text: str, start: int, end: int) -> List[str]:
+    """The word right before and the word right after a span, where present."""
+    before = _TOKEN_RE.findall(text[max(0, start - 40):start])
+    after = _TOKEN_RE.findall(text[end:end + 40])
+    return ([before[-1]] if before else []) + ([after[0]] if after else [])
+
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize so composed and decomposed Devanagari compare equal."""
+    if unicodedata.is_normalized("NFC", text):
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+def _alias_key(alias: str) -> str:
+    """Lookup key for an alias: NFC, case-folded, single-spaced."""
+    return " ".join(normalize_text(alias).casefold().split())
+
+
+def load_aliases(path: Optional[Path] = None) -> Dict[str, List[str]]:
+    """
+    Load canonical ingredient names and their aliases from the knowledge base.
+
+    Args:
+        path: spices.yaml path (defaults to knowledge/spices.yaml)
+
+    Returns:
+        Mapping of canonical key to aliases; the key itself (with spaces for
+        underscores) is always included as an alias
+    """
+    path = Path(path) if path else DEFAULT_KNOWLEDGE_FILE
+    try:
+        import yaml
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = yaml.safe_load(f).get('aliases', {}) or {}
+    except Exception as e:
+        logger.warning(f"Could not load ingredient aliases from {path}: {e}")
+        return {}
+
+    aliases = {}
+    for canonical, names in raw.items():
+        aliases[canonical] = [canonical.replace("_", " ")] + [str(n) for n in (names or [])]
+    return aliases
+
+
+class AliasMatcher:
+    """
+    Single-pass multi-pattern matcher over ingredient aliases.
+
+    Short Latin-script aliases such as "tel" or "rai" are also ordinary words
+    or abbreviations on a label ("Tel: 1800 123"), so they only count when an
+    adjacent word is another ingredient name or a context word ("powder",
+    "seeds", "oil", ...). Canonical names and Devanagari aliases always count.
+    """
+
+    def __init__(self, aliases: Dict[str, Iterable[str]], min_standalone_length: int = 4):
+        """
+        Build the matcher.
+
+        Args:
+            aliases: Mapping of canonical key to aliases
+            min_standalone_length: Latin aliases shorter than this need context
+        """
+        self._canonical: Dict[str, str] = {}
+        self._alias_text: Dict[str, str] = {}
+        self._needs_context: Set[str] = set()
+        for canonical, names in aliases.items():
+            for name in names:
+                key = _alias_key(name)
+                if key and key not in self._canonical:
+                    self._canonical[key] = canonical
+                    self._alias_text[key] = name
+                    if (len(key) < min_standalone_length and key.isascii()
+                            and key != canonical.replace("_", " ")):
+                        self._needs_context.add(key)
+
+        # Longest alias first so "garam masala" wins over "garam", "kali mirch" over "mirch"
+        alternatives = [
+            r"\s+".join(re.escape(part) for part in key.split())
+            for key in sorted(self._canonical, key=len, reverse=True)
+        ]
+        if alternatives:
+            self._pattern = re.compile(
+                rf"(?<![{_WORD_CHARS}])(?:{'|'.join(alternatives)})(?![{_WORD_CHARS}])",
+                re.IGNORECASE
+            )
+        else:
+            self._pattern = None
+
+        logger.debug(f"Alias matcher built with {len(self._canonical)} aliases")
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def find(self, text: str) -> List[IngredientMatch]:
+        """
+        Find all alias occurrences in a text.
+
+        Args:
+            text: OCR or transcript text
+
+        Returns:
+            Non-overlapping matches in text order; spans index the NFC-normalized text
+        """
+        if self._pattern is None or not text:
+            return []
+
+        text = normalize_text(text)
+        matches = []
+        for match in self._pattern.finditer(text):
+            key = _alias_key(match.group(0))
+            canonical = self._canonical.get(key)
+            if canonical is None:
+                continue
+            if key in self._needs_context and not self._has_context(text, match.start(), match.end()):
+                continue
+            matches.append(IngredientMatch(canonical, self._alias_text[key], match.start(), match.end()))
+        return matches
+
+    def _has_context(self, text: str, start: int, end: int) -> bool:
+        """True if the word before or after a span is an ingredient or context word."""
+        for word in _adjacent_words(text, start, end):
+            key = _alias_key(word)
+            if key in CONTEXT_WORDS or (key in self._canonical and key not in self._needs_context):
+                return True
+        return False
+
+    def canonical_names(self, text: str) -> List[str]:
+        """Return the distinct canonical ingredients mentioned, in order of first appearance."""
+        return list(dict.fromkeys(m.canonical for m in self.find(text)))
+
+
+class FuzzyIndex:
+    """
+    Approximate lookup of ingredient aliases tolerant of OCR and ASR errors.
+    Candidates come from a trigram inverted index (count filter), then are
+    verified with a banded edit distance; allowed distance grows with word length.
+    As in AliasMatcher, short transliterated aliases only count in find_in_text
+    when an adjacent word is an ingredient or context word.
+    """
+
+    def __init__(self, aliases: Dict[str, Iterable[str]], n: int = 3, min_standalone_length: int = 4):
+        """
+        Build the index.
+
+        Args:
+            aliases: Mapping of canonical key to aliases
+            n: n-gram size
+            min_standalone_length: Latin aliases shorter than this need context
+        """
+        self.n = n
+        self.min_standalone_length = min_standalone_length
+        self._canonical_folded: Set[str] = {fold(canonical.replace("_", " ")) for canonical in aliases}
+        self._entries: List[tuple] = []  # (folded alias, canonical, alias)
+        self._postings: Dict[str, List[int]] = {}
+
+        seen: Set[str] = set()
+        for canonical, names in aliases.items():
+            for name in names:
+                folded = fold(name)
+                if not folded or folded in seen:
+                    continue
+                seen.add(folded)
+                entry_id = len(self._entries)
+                self._entries.append((folded, canonical, name))
+                for gram in set(self._grams(folded)):
+                    self._postings.setdefault(gram, []).append(entry_id)
+
+        self.max_words = max((e[0].count(" ") + 1 for e in self._entries), default=1)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _grams(self, text: str) -> List[str]:
+        padded = f"^{text}$"
+        return [padded[i:i + self.n] for i in range(len(padded) - self.n + 1)]
+
+    @staticmethod
+    def allowed_distance(length: int) -> int:
+        """Edit budget for a word of the given length (short words must match exactly)."""
+        if length <= 3:
+            return 0
+        if length <= 5:
+            return 1
+        return 2
+
+    def search(self, query: str, max_results: int = 5, max_distance: Optional[int] = None) -> List[FuzzyMatch]:
+        """
+        Find aliases close to a word or short phrase.
+
+        Args:
+            query: Word(s) to look up, e.g. an OCR token or a spoken name
+            max_results: Maximum candidates returned
+            max_distance: Edit budget (defaults to allowed_distance() of the shorter
+                of query and alias)
+
+        Returns:
+            Candidates ranked by edit distance, then by length difference
+        """
+        folded = fold(query)
+        if not folded:
+            return []
+        k = self.allowed_distance(len(folded)) if max_distance is None else max_distance
+
+        grams = self._grams(folded)
+        counts: Dict[int, int] = {}
+        for gram in set(grams):
+            for entry_id in self._postings.get(gram, ()):
+                counts[entry_id] = counts.get(entry_id, 0) + 1
+
+        # Each edit destroys at most n grams; always require one shared gram
+        min_shared = max(1, len(set(grams)) - k * self.n)
+
+        results = []
+        for entry_id, shared in counts.items():
+            if shared < min_shared:
+                continue
+            alias_folded, canonical, alias = self._entries[entry_id]
+            limit = k if max_distance is not None else min(k, self.allowed_distance(len(alias_folded)))
+            distance = bounded_levenshtein(folded, alias_folded, limit)
+            if distance is not None:
+                results.append(FuzzyMatch(canonical, alias, distance, query))
+
+        results.sort(key=lambda m: (m.distance, abs(len(fold(m.alias)) - len(folded))))
+        return results[:max_results]
+
+    def best(self, query: str) -> Optional[FuzzyMatch]:
+        """Return the closest alias to a word, or None."""
+        results = self.search(query, max_results=1)
+        return results[0] if results else None
+
+    def find_in_text(self, text: str, min_fuzzy_length: int = 6) -> List[FuzzyMatch]:
+        """
+        Find approximate alias hits in free text.
+        Tries word windows of up to max_words words, longest first, without overlaps.
+        Windows containing a stopword are skipped, and windows shorter than
+        min_fuzzy_length characters must match exactly (after homoglyph folding),
+        since ordinary short words are often one edit away from a short alias.
+        Hits on short aliases, and approximate hits on aliases shorter than
+        min_fuzzy_length, need an adjacent ingredient or context word.
+
+        Returns:
+            Matches with spans into the NFC-normalized text, in text order
+        """
+        text = normalize_text(text)
+        tokens = [(m.group(0), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+        matches = []
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self.max_words, len(tokens) - i), 0, -1):
+                window = tokens[i:i + size]
+                if any(t[0].casefold() in STOPWORDS for t in window):
+                    continue
+                start, end = window[0][1], window[-1][2]
+                query = " ".join(t[0] for t in window)
+                exact = len(fold(query)) < min_fuzzy_length
+                results = self.search(query, max_results=1, max_distance=0 if exact else None)
+                found = results[0] if results else None
+                # Short aliases, and approximate hits on shortish ones, need a confirming neighbour
+                if found is not None and (
+                        self._is_short_alias(found.alias)
+                        or (found.distance > 0 and len(fold(found.alias)) < min_fuzzy_length)
+                ) and not self._has_context(text, start, end):
+                    found = None
+                if found is not None:
+                    found.start, found.end = start, end
+                    matches.append(found)
+                    i += size
+                    break
+            else:
+                i += 1
+        return matches
+
+    def _is_short_alias(self, alias: str) -> bool:
+        """True for transliterated aliases too short to count without context."""
+        folded = fold(alias)
+        return (len(folded) < self.min_standalone_length and folded.isascii()
+                and folded not in self._canonical_folded)
+
+    def _has_context(self, text: str, start: int, end: int) -> bool:
+        """True if the word before or after a span is a context word or another ingredient."""
+        for word in _adjacent_words(text, start, end):
+            if fold(word) in CONTEXT_WORDS:
+                return True
+            results = self.search(word, max_results=1, max_distance=0)
+            if results and not self._is_short_alias(results[0].alias):
+                return True
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_fuzzy_index() -> FuzzyIndex:
+    """Return the shared fuzzy index built from the default knowledge base."""
+    return FuzzyIndex(load_aliases())
+
+
+@lru_cache(maxsize=1)
+def get_matcher() -> AliasMatcher:
+    """Return the shared matcher built from the default knowledge base."""
+    return AliasMatcher(load_aliases())
@@ -0,0 +1,104 @@
+# label_parser.py
+"""
+Label Text Parser
+Stateless parsing of OCR text from ingredient labels: measurements (via the
+shared measurement tokenizer), ingredient names (via the shared alias matcher)
+and expiry dates. All patterns are compiled once at import time so the
+functions are cheap enough to run on every OCR result, or on batches of them.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from ingredient_matcher import get_fuzzy_index, get_matcher
+from measurement_parser import parse_measurements
+
+EXPIRY_PATTERNS = [
+    re.compile(r'exp[iry]*\s*:?\s*(\d{2}[/-]\d{2}[/-]\d{2,4})', re.IGNORECASE),
+    re.compile(r'best\s*before\s*:?\s*(\d{2}[/-]\d{2}[/-]\d{2,4})', re.IGNORECASE),
+]
+
+
+def extract_measurements(text: str) -> List[Dict[str, Any]]:
+    """
+    Extract measurement quantities from OCR text.
+
+    Args:
+        text: OCR text containing measurements
+
+    Returns:
+        List of detected measurements with amount and unit, in text order
+    """
+    return [m.to_dict() for m in parse_measurements(text)]
+
+
+def detect_ingredient_names(text: str) -> List[str]:
+    """
+    Detect ingredient names from OCR text using all knowledge-base aliases.
+    Falls back to approximate matching when no alias matches exactly.
+
+    Args:
+        text: OCR text
+
+    Returns:
+        Canonical ingredient keys (e.g. "turmeric" for "Haldi"), in order of appearance
+    """
+    names = get_matcher().canonical_names(text)
+    if names:
+        return names
+    return list(dict.fromkeys(m.canonical for m in get_fuzzy_index().find_in_text(text)))
+
+
+def extract_expiry(text: str) -> Optional[str]:
+    """Return the first expiry / best-before date in the text, if any."""
+    for pattern in EXPIRY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_label(ocr_text: str) -> Dict[str, Any]:
+    """
+    Extract structured information from ingredient label.
+
+    Args:
+        ocr_text: OCR text from label
+
+    Returns:
+        Dictionary with ingredient name, brand, quantity, expiry, etc.
+    """
+    measurements = extract_measurements(ocr_text)
+    return {
+        'ingredient_names': detect_ingredient_names(ocr_text),
+        'brand': None,
+        'quantity': measurements[0] if measurements else None,
+        'expiry_date': extract_expiry(ocr_text),
+        'batch_number': None
+    }
+
+
+def parse_labels(ocr_texts: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Parse a batch of OCR strings in one call.
+    Identical strings (common when the same label is read from consecutive
+    frames) are parsed once; each result is an independent dictionary.
+
+    Args:
+        ocr_texts: OCR texts from labels
+
+    Returns:
+        Parsed label info, one per input text, in order
+    """
+    parsed: Dict[str, Dict[str, Any]] = {}
+    results = []
+    for text in ocr_texts:
+        info = parsed.get(text)
+        if info is None:
+            info = parsed[text] = parse_label(text)
+        results.append({
+            **info,
+            'ingredient_names': list(info['ingredient_names']),
+            'quantity': dict(info['quantity']) if info['quantity'] else None
+        })
+    return results
@@ -0,0 +1,277 @@
+# local_server.py
+"""
+Local Model Server Supervisor
+Keeps llama.cpp / whisper.cpp style HTTP servers resident on localhost so models
+are loaded once per session instead of once per request.
+Provides health checks, automatic background restart and simple JSON/multipart helpers.
+"""
+
+import json
+import logging
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ServerUnavailable(RuntimeError):
+    """Raised when the managed server cannot serve a request."""
+
+
+class ManagedServer:
+    """
+    Supervises one long-lived local HTTP model server.
+    When no command is given, an already-running server at `url` is used as-is
+    (health checks still apply, but it cannot be restarted).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        command: Optional[List[str]] = None,
+        health_path: str = "/health",
+        startup_timeout: float = 60.0,
+        max_restarts: int = 3,
+        restart_window: float = 600.0
+    ):
+        """
+        Initialize server supervisor.
+
+        Args:
+            name: Human-readable name used in log messages
+            url: Base URL of the server (e.g. "http://127.0.0.1:8090")
+            command: Command line that launches the server (None for external server)
+            health_path: Endpoint polled for health checks
+            startup_timeout: Seconds to wait for the server to become healthy
+            max_restarts: Maximum automatic restarts within restart_window
+                before giving up (until older restarts age out of the window)
+            restart_window: Seconds over which restarts are counted, so a few
+                unrelated crashes in a long session do not exhaust the budget
+        """
+        self.name = name
+        self.url = url.rstrip("/")
+        self.command = command
+        self.health_path = health_path
+        self.startup_timeout = startup_timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+
+        self.process: Optional[subprocess.Popen] = None
+        self.restart_count = 0  # Total over the server's lifetime
+        self._recent_restarts: deque = deque()  # Times of restarts within the window
+        self._lock = threading.Lock()
+        self._restart_thread: Optional[threading.Thread] = None
+        self._restart_lock = threading.Lock()  # Not _lock: that is held while a restart runs
+
+    def start(self) -> bool:
+        """
+        Launch the server (if managed) and wait until it reports healthy.
+
+        Returns:
+            True if the server is ready to accept requests
+        """
+        with self._lock:
+            return self._start_locked()
+
+    def _start_locked(self) -> bool:
+        if self.command is None:
+            healthy = self.is_healthy()
+            if not healthy:
+                logger.warning(f"{self.name}: external server at {self.url} is not healthy")
+            return healthy
+
+        if self.process is not None and self.process.poll() is None:
+            return self._wait_healthy()
+
+        try:
+            logger.info(f"{self.name}: starting server: {' '.join(self.command)}")
+            self.process = subprocess.Popen(
+                self.command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except (FileNotFoundError, OSError) as e:
+            logger.error(f"{self.name}: could not start server: {e}")
+            self.process = None
+            return False
+
+        return self._wait_healthy()
+
+    def _wait_healthy(self) -> bool:
+        """Poll the health endpoint until ready, the process dies, or timeout."""
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                logger.error(f"{self.name}: server exited with code {self.process.returncode}")
+                return False
+            if self.is_healthy():
+                logger.info(f"{self.name}: server ready at {self.url}")
+                return True
+            time.sleep(0.25)
+
+        logger.error(f"{self.name}: server did not become healthy within {self.startup_timeout}s")
+        return False
+
+    def is_healthy(self, timeout: float = 1.0) -> bool:
+        """Return True if the health endpoint answers with HTTP 200."""
+        if self.process is not None and self.process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(self.url + self.health_path, timeout=timeout) as resp:
+                return resp.status == 200
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+
+    def ensure_running(self) -> bool:
+        """
+        Make sure the server is up, restarting it if it died.
+
+        Returns:
+            True if the server is healthy after the check
+        """
+        with self._lock:
+            if self.is_healthy():
+                return True
+            if self.command is None:
+                return False
+
+            now = time.time()
+            while self._recent_restarts and now - self._recent_restarts[0] > self.restart_window:
+                self._recent_restarts.popleft()
+            if len(self._recent_restarts) >= self.max_restarts:
+                return False
+
+            self._recent_restarts.append(now)
+            self.restart_count += 1
+            logger.warning(f"{self.name}: restarting server (attempt {len(self._recent_restarts)}/"
+                           f"{self.max_restarts} in {self.restart_window:.0f}s)")
+            self._terminate_locked()
+            return self._start_locked()
+
+    def restart_async(self) -> bool:
+        """
+        Run ensure_running() on a background thread, unless one is already running.
+
+        Returns:
+            True if a new restart thread was started
+        """
+        if self.command is None:
+            return False
+        with self._restart_lock:
+            if self._restart_thread is not None and self._restart_thread.is_alive():
+                return False
+            self._restart_thread = threading.Thread(
+                target=self.ensure_running,
+                name=f"{self.name}-restart",
+                daemon=True
+            )
+            self._restart_thread.start()
+            return True
+
+    def post(self, path: str, body: bytes, content_type: str, timeout: float) -> bytes:
+        """
+        POST raw bytes to the server, retrying once if the connection was refused
+        or reset and the server still reports healthy. Timeouts are not retried:
+        the request may already be running, and a second one would only double
+        the wait. A server that died is restarted in the background and the
+        request fails at once, so the caller can fall back instead of waiting
+        for the model to reload.
+
+        Returns:
+            Response body
+
+        Raises:
+            ServerUnavailable: If the server cannot be reached or returns an error
+        """
+        for attempt in range(2):
+            request = urllib.request.Request(
+                self.url + path,
+                data=body,
+                headers={"Content-Type": content_type},
+                method="POST"
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as resp:
+                    return resp.read()
+            except urllib.error.HTTPError as e:
+                raise ServerUnavailable(f"{self.name}: HTTP {e.code} from {path}") from e
+            except (urllib.error.URLError, ConnectionError, OSError) as e:
+                logger.warning(f"{self.name}: request to {path} failed: {e}")
+                if attempt == 0 and _is_connection_failure(e) and self.is_healthy():
+                    continue
+                self.restart_async()
+                raise ServerUnavailable(f"{self.name}: server unreachable") from e
+
+        raise ServerUnavailable(f"{self.name}: server unreachable")
+
+    def post_json(self, path: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """POST a JSON payload and decode the JSON response."""
+        raw = self.post(path, json.dumps(payload).encode("utf-8"), "application/json", timeout)
+        try:
+            return json.loads(raw.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ServerUnavailable(f"{self.name}: invalid JSON response") from e
+
+    def stop(self):
+        """Terminate the managed server process."""
+        with self._lock:
+            self._terminate_locked()
+
+    def _terminate_locked(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        logger.info(f"{self.name}: server stopped")
+        self.process = None
+
+
+def _is_connection_failure(error: Exception) -> bool:
+    """True if the connection was refused or reset before a response arrived."""
+    reason = error.reason if isinstance(error, urllib.error.URLError) else error
+    return isinstance(reason, (ConnectionRefusedError, ConnectionResetError))
+
+
+def encode_multipart(
+    fields: Dict[str, str],
+    files: Dict[str, Tuple[str, bytes, str]]
+) -> Tuple[bytes, str]:
+    """
+    Encode form fields and files as multipart/form-data.
+
+    Args:
+        fields: Plain form fields {name: value}
+        files: File fields {name: (filename, data, content_type)}
+
+    Returns:
+        Tuple of (body bytes, content type header value)
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f"--{boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+            f"{value}\r\n".encode("utf-8")
+        )
+    for name, (filename, data, content_type) in files.items():
+        parts.append(
+            f"--{boundary}\r\n"
+            f"Content-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
+        )
+        parts.append(data)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
@@ -0,0 +1,222 @@
+# measurement_parser.py
+"""
+Measurement Tokenizer
+Finds quantities such as "1/2 tsp", "1 1/2 tbsp", "½ cup", "100g" or "५० ग्राम"
+in OCR text. One combined pattern (amount forms x unit spellings, including the
+localized unit names in the knowledge base) is compiled once and the text is
+scanned a single time, so every span is reported at most once.
+Shared by the OCR label parser and the quantity estimator.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ingredient_matcher import DEFAULT_KNOWLEDGE_FILE, normalize_text
+
+logger = logging.getLogger(__name__)
+
+FRACTIONS = {
+    '½': 0.5, '¼': 0.25, '¾': 0.75,
+    '⅓': 0.333, '⅔': 0.667,
+    '⅛': 0.125, '⅜': 0.375, '⅝': 0.625, '⅞': 0.875
+}
+
+# Canonical unit -> spellings (knowledge-base abbreviations are added at load time)
+UNIT_SPELLINGS = {
+    'teaspoon': ['tsp', 'tsps', 'teaspoon', 'teaspoons', 'tea spoon', 'tea spoons'],
+    'tablespoon': ['tbsp', 'tbsps', 'tbs', 'tablespoon', 'tablespoons', 'table spoon', 'table spoons'],
+    'cup': ['cup', 'cups', 'c'],
+    'pinch': ['pinch', 'pinches'],
+    'grams': ['g', 'gm', 'gms', 'gram', 'grams'],
+    'kilograms': ['kg', 'kgs', 'kilogram', 'kilograms'],
+    'milliliters': ['ml', 'milliliter', 'milliliters', 'millilitre', 'millilitres'],
+    'liters': ['l', 'ltr', 'liter', 'liters', 'litre', 'litres'],
+    'ounce': ['oz', 'ounce', 'ounces'],
+    'pound': ['lb', 'lbs', 'pound', 'pounds'],
+}
+
+# Knowledge-base unit keys that differ from the canonical names above
+_KB_UNIT_NAMES = {
+    'gram': 'grams',
+    'kilogram': 'kilograms',
+    'milliliter': 'milliliters',
+    'liter': 'liters',
+}
+
+# Single letters are easily misread, so they earn less confidence
+_AMBIGUOUS_UNITS = {'c', 'l'}
+
+_DEVANAGARI_DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+
+_FRACTION_CHARS = ''.join(FRACTIONS)
+
+_AMOUNT = (
+    rf"(?P<whole>\d+)\s+(?P<mnum>\d+)\s*[/⁄]\s*(?P<mden>\d+)"  # 1 1/2
+    rf"|(?P<uwhole>\d+)\s*(?P<ufrac>[{_FRACTION_CHARS}])"      # 1½
+    rf"|(?P<num>\d+)\s*[/⁄]\s*(?P<den>\d+)"                     # 1/2
+    rf"|(?P<frac>[{_FRACTION_CHARS}])"                          # ½
+    rf"|(?P<dec>\d+(?:\.\d+)?)"                                 # 2, 2.5
+)
+
+
+@dataclass
+class Measurement:
+    """A quantity found in text."""
+    amount: float
+    unit: str  # Canonical unit name, e.g. "teaspoon", "grams"
+    raw_text: str
+    start: int
+    end: int
+    confidence: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'amount': self.amount,
+            'unit': self.unit,
+            'raw_text': self.raw_text,
+            'confidence': self.confidence
+        }
+
+
+def load_unit_spellings(path: Optional[Path] = None) -> Dict[str, List[str]]:
+    """
+    Merge the built-in unit spellings with the knowledge base's `units` abbreviations.
+
+    Args:
+        path: spices.yaml path (defaults to knowledge/spices.yaml)
+
+    Returns:
+        Mapping of canonical unit to spellings
+    """
+    spellings = {unit: list(names) for unit, names in UNIT_SPELLINGS.items()}
+    path = Path(path) if path else DEFAULT_KNOWLEDGE_FILE
+    try:
+        import yaml
+        with open(path, 'r', encoding='utf-8') as f:
+            units = yaml.safe_load(f).get('units', {}) or {}
+    except Exception as e:
+        logger.warning(f"Could not load unit names from {path}: {e}")
+        return spellings
+
+    for name, info in units.items():
+        canonical = _KB_UNIT_NAMES.get(name, name)
+        names = spellings.setdefault(canonical, [name])
+        for abbr in (info or {}).get('abbr', []) or []:
+            if str(abbr) not in names:
+                names.append(str(abbr))
+    return spellings
+
+
+class MeasurementTokenizer:
+    """
+    Single-pass measurement scanner over a compiled amount/unit grammar.
+    """
+
+    def __init__(self, unit_spellings: Dict[str, List[str]]):
+        """
+        Build the tokenizer.
+
+        Args:
+            unit_spellings: Mapping of canonical unit to spellings
+        """
+        self._units: Dict[str, str] = {}
+        for canonical, names in unit_spellings.items():
+            for name in names:
+                key = self._unit_key(name)
+                if key:
+                    self._units.setdefault(key, canonical)
+
+        # Longest spelling first so "tbsp" is not cut short as "tbs", "kg" as "g" etc.
+        units = "|".join(
+            r"\s*".join(re.escape(part) for part in key.split())
+            for key in sorted(self._units, key=len, reverse=True)
+        )
+        self._pattern = re.compile(
+            rf"(?<![\d.,/⁄])(?:{_AMOUNT})\s*(?P<unit>{units})(?![\wऀ-ॿ])",
+            re.IGNORECASE
+        )
+
+    @staticmethod
+    def _unit_key(name: str) -> str:
+        return " ".join(normalize_text(name).casefold().split())
+
+    def tokenize(self, text: str) -> List[Measurement]:
+        """
+        Find every measurement in a text in one scan.
+
+        Args:
+            text: OCR text
+
+        Returns:
+            Non-overlapping measurements in text order; spans index the
+            NFC-normalized text
+        """
+        if not text:
+            return []
+
+        text = normalize_text(text)
+        measurements = []
+        # Digit translation is one-to-one, so spans also index the original text
+        for match in self._pattern.finditer(text.translate(_DEVANAGARI_DIGITS)):
+            amount = self._amount(match)
+            if amount is None:
+                continue
+            raw_unit = self._unit_key(match.group('unit'))
+            unit = self._units.get(raw_unit) or self._units.get(raw_unit.replace(" ", ""))
+            if unit is None:
+                continue
+            measurements.append(Measurement(
+                amount=amount,
+                unit=unit,
+                raw_text=text[match.start():match.end()],
+                start=match.start(),
+                end=match.end(),
+                confidence=0.7 if raw_unit in _AMBIGUOUS_UNITS else 0.9
+            ))
+        return measurements
+
+    @staticmethod
+    def _amount(match: "re.Match") -> Optional[float]:
+        """Convert the matched amount alternative to a number."""
+        try:
+            if match.group('whole') is not None:
+                return int(match.group('whole')) + int(match.group('mnum')) / int(match.group('mden'))
+            if match.group('uwhole') is not None:
+                return int(match.group('uwhole')) + FRACTIONS[match.group('ufrac')]
+            if match.group('num') is not None:
+                return int(match.group('num')) / int(match.group('den'))
+            if match.group('frac') is not None:
+                return FRACTIONS[match.group('frac')]
+            return float(match.group('dec'))
+        except ZeroDivisionError:
+            return None
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer() -> MeasurementTokenizer:
+    """Return the shared tokenizer built from the default knowledge base."""
+    return MeasurementTokenizer(load_unit_spellings())
+
+
+def parse_measurements(text: str) -> List[Measurement]:
+    """Find all measurements in a text with the shared tokenizer."""
+    return get_tokenizer().tokenize(text)
+
+
+def parse_amount(amount_str: str) -> float:
+    """Parse an amount string ("1/2", "½", "1 1/2", "2.5", "२") to a float (1.0 if unparseable)."""
+    match = re.fullmatch(_AMOUNT, normalize_text(amount_str).translate(_DEVANAGARI_DIGITS).strip())
+    if match is None:
+        return 1.0
+    amount = MeasurementTokenizer._amount(match)
+    return 1.0 if amount is None else amount
+
+
+def normalize_unit(unit: str) -> str:
+    """Map a unit spelling to its canonical name (unknown units are lower-cased)."""
+    key = MeasurementTokenizer._unit_key(unit)
+    return get_tokenizer()._units.get(key, key)
@@ -6,12 +6,16 @@ Extracts ingredient names and quantity markings from containers and measuring to
 """
 
 import logging
+import queue
 import subprocess
-import re
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from PIL import Image
+
+import label_parser
+from image_transport import encode_pnm
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +26,49 @@ class TesseractOCR:
     Optimized for reading ingredient labels and measuring marks.
     """
     
-    def __init__(self, languages: str = "eng+deva"):
+    # Preprocessing tiers, cheapest first; later tiers only run when confidence is low
+    TIERS = ("fast", "adaptive", "restore")
+    
+    def __init__(
+        self,
+        languages: str = "eng+deva",
+        confidence_threshold: float = 0.7,
+        latency_budget: float = 1.5,
+        backend: str = "auto",
+        pool_size: int = 2
+    ):
         """
         Initialize Tesseract OCR.
         
         Args:
             languages: Language codes separated by + (e.g., "eng+deva" for English and Devanagari)
+            confidence_threshold: Mean word confidence (0-1) at which a tier's result is accepted
+            latency_budget: Default seconds allowed per read_text() call across all tiers
+            backend: "api" (in-process libtesseract via tesserocr), "subprocess", or
+                "auto" (api when tesserocr is installed, else subprocess)
+            pool_size: Number of initialized API handles (one per concurrent OCR worker)
         """
         self.languages = languages
+        self.confidence_threshold = confidence_threshold
+        self.latency_budget = latency_budget
         self.tesseract_path = self._find_tesseract()
         
-        if not self.tesseract_path:
+        # In-process engines: traineddata is loaded once per handle, not per read
+        self.api_pool: Optional[TesseractAPIPool] = None
+        if backend in ("api", "auto"):
+            try:
+                self.api_pool = TesseractAPIPool(languages, size=pool_size)
+                logger.info(f"Using in-process Tesseract API pool ({pool_size} handles)")
+            except (ImportError, RuntimeError) as e:
+                if backend == "api":
+                    logger.warning(f"Tesseract API unavailable ({e}) - falling back to subprocess")
+        
+        # Moving average of seconds spent per tier (preprocess + recognition)
+        self.tier_costs: Dict[str, float] = {}
+        self.last_confidence = 0.0
+        self.last_tier: Optional[str] = None
+        
+        if not self.tesseract_path and self.api_pool is None:
             logger.warning("Tesseract not found - OCR will be limited")
         
         logger.info(f"Initialized Tesseract OCR with languages: {languages}")
@@ -60,51 +96,110 @@ class TesseractOCR:
         
         return None
     
-    def read_text(self, image: np.ndarray, preprocess: bool = True) -> str:
+    def read_text(
+        self,
+        image: np.ndarray,
+        preprocess: bool = True,
+        budget: Optional[float] = None,
+        psm: int = 6
+    ) -> str:
         """
         Extract text from image.
         
         Args:
             image: Image as numpy array (BGR format)
             preprocess: Whether to preprocess image for better OCR
+            budget: Seconds allowed for this call (defaults to latency_budget)
+            psm: Tesseract page segmentation mode (6 = text block for labels,
+                7 = single line, 11 = sparse text for measuring marks)
         
         Returns:
             Extracted text
         """
-        if self.tesseract_path is None:
-            return self._mock_ocr(image)
+        text, _ = self.read_text_with_confidence(image, preprocess, budget, psm)
+        return text
+    
+    def read_text_with_confidence(
+        self,
+        image: np.ndarray,
+        preprocess: bool = True,
+        budget: Optional[float] = None,
+        psm: int = 6
+    ) -> Tuple[str, float]:
+        """
+        Extract text and its mean word confidence using tiered preprocessing.
         
-        # Preprocess if requested
-        if preprocess:
-            image = self._preprocess_image(image)
+        The fast tier (grayscale + Otsu) runs first; adaptive thresholding and then
+        denoise/deskew/upscale are tried only while confidence stays below
+        confidence_threshold and the next tier is expected to fit in the budget.
         
-        # Save to temp file
-        temp_path = Path("/tmp/chef_ocr_temp.png")
-        self._save_image(image, temp_path)
+        Returns:
+            Tuple of (text, confidence 0-1) for the most confident tier
+        """
+        if self.tesseract_path is None and self.api_pool is None:
+            return self._mock_ocr(image), 0.0
         
-        # Run Tesseract
-        text = self._run_tesseract(temp_path)
+        if not preprocess:
+            text, confidence = self._recognize(image, psm)
+            self.last_confidence, self.last_tier = confidence, None
+            return text, confidence
         
-        return text
+        budget = self.latency_budget if budget is None else budget
+        start = time.time()
+        best_text, best_confidence, best_tier = "", -1.0, None
+        
+        for index, tier in enumerate(self.TIERS):
+            elapsed = time.time() - start
+            remaining = budget - elapsed
+            if index > 0 and self.tier_costs.get(tier, 0.0) > remaining:
+                logger.debug(f"OCR budget exhausted before '{tier}' tier ({elapsed:.2f}s used)")
+                break
+            
+            tier_start = time.time()
+            processed = self._preprocess_image(image, tier)
+            text, confidence = self._recognize(processed, psm, timeout=max(0.5, remaining))
+            self._record_tier_cost(tier, time.time() - tier_start)
+            
+            if confidence > best_confidence:
+                best_text, best_confidence, best_tier = text, confidence, tier
+            if best_confidence >= self.confidence_threshold:
+                break
+        
+        self.last_confidence, self.last_tier = max(best_confidence, 0.0), best_tier
+        logger.debug(f"OCR tier '{best_tier}' confidence {self.last_confidence:.2f} "
+                     f"in {time.time() - start:.2f}s")
+        return best_text, self.last_confidence
+    
+    def _record_tier_cost(self, tier: str, seconds: float):
+        """Update the moving average cost of a tier."""
+        previous = self.tier_costs.get(tier)
+        self.tier_costs[tier] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
     
-    def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
+    def _preprocess_image(self, image: np.ndarray, tier: str = "fast") -> np.ndarray:
         """
-        Preprocess image for better OCR results.
-        - Convert to grayscale
-        - Increase contrast
-        - Denoise
+        Preprocess image for OCR at the given tier.
+        - fast: grayscale + Otsu threshold
+        - adaptive: grayscale + adaptive threshold (uneven lighting, glare)
+        - restore: denoise, deskew and upscale, then Otsu (blurry or small text)
         """
         try:
             import cv2
-            
-            # Convert to grayscale
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image
-            
-            # Apply adaptive thresholding
-            processed = cv2.adaptiveThreshold(
+        except ImportError:
+            logger.warning("OpenCV not available for preprocessing")
+            return image
+        
+        # Convert to grayscale
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        
+        if tier == "fast":
+            _, processed = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return processed
+        
+        if tier == "adaptive":
+            return cv2.adaptiveThreshold(
                 gray,
                 255,
                 cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
@@ -112,54 +207,93 @@ class TesseractOCR:
                 11,
                 2
             )
-            
-            # Denoise
-            processed = cv2.fastNlMeansDenoising(processed, h=10)
-            
-            return processed
-            
-        except ImportError:
-            logger.warning("OpenCV not available for preprocessing")
-            return image
+        
+        # Restore: the expensive path, only reached on low confidence.
+        # Denoise before upscaling so the denoiser sees a quarter of the pixels.
+        gray = cv2.fastNlMeansDenoising(gray, h=10)
+        if max(gray.shape[:2]) < 1000:
+            gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+        _, processed = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return self._deskew(processed)
     
-    def _save_image(self, image: np.ndarray, path: Path):
-        """Save numpy array as image file."""
-        pil_image = Image.fromarray(image)
-        pil_image.save(path)
+    @staticmethod
+    def _deskew(binary: np.ndarray) -> np.ndarray:
+        """Rotate a binarized image so text lines are horizontal."""
+        import cv2
+        
+        # Text is dark on a light background after thresholding
+        coords = np.column_stack(np.where(binary < 128))
+        if len(coords) < 50:
+            return binary
+        
+        angle = cv2.minAreaRect(coords[:, ::-1].astype(np.float32))[2]
+        if angle > 45:
+            angle -= 90
+        elif angle < -45:
+            angle += 90
+        if abs(angle) < 0.5:
+            return binary
+        
+        h, w = binary.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        return cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_NEAREST,
+                              borderMode=cv2.BORDER_CONSTANT, borderValue=255)
     
-    def _run_tesseract(self, image_path: Path) -> str:
-        """Run Tesseract OCR."""
+    def _recognize(self, image: np.ndarray, psm: int = 6, timeout: float = 5.0) -> Tuple[str, float]:
+        """Recognize a (preprocessed) image with the API pool, or the subprocess fallback."""
+        if self.api_pool is not None:
+            try:
+                return self.api_pool.recognize(image, psm, timeout=timeout)
+            except (RuntimeError, queue.Empty) as e:
+                logger.warning(f"Tesseract API error: {e}")
+                if self.tesseract_path is None:
+                    return "", 0.0
+        return self._run_tesseract(encode_pnm(image), timeout=timeout, psm=psm)
+    
+    def close(self):
+        """Release in-process Tesseract handles."""
+        if self.api_pool is not None:
+            self.api_pool.close()
+    
+    def _run_tesseract(self, image_bytes: bytes, timeout: float = 5.0, psm: int = 6) -> Tuple[str, float]:
+        """
+        Run Tesseract OCR on an encoded image passed via stdin.
+        
+        Returns:
+            Tuple of (text, mean word confidence 0-1)
+        """
         try:
             cmd = [
                 self.tesseract_path,
-                str(image_path),
+                "stdin",
                 "stdout",
                 "-l", self.languages,
-                "--psm", "6",  # Assume uniform block of text
-                "--oem", "1"   # Use LSTM neural nets
+                "--psm", str(psm),  # Page segmentation mode (6 = uniform block of text)
+                "--oem", "1",  # Use LSTM neural nets
+                "tsv"          # Word boxes with confidences
             ]
             
             result = subprocess.run(
                 cmd,
+                input=image_bytes,
                 capture_output=True,
-                text=True,
-                timeout=5
+                timeout=min(timeout, 5.0)
             )
             
             if result.returncode == 0:
-                text = result.stdout.strip()
-                logger.debug(f"OCR result: '{text}'")
-                return text
+                text, confidence = parse_tsv(result.stdout.decode("utf-8", errors="replace"))
+                logger.debug(f"OCR result: '{text}' (confidence {confidence:.2f})")
+                return text, confidence
             else:
-                logger.error(f"Tesseract failed: {result.stderr}")
-                return ""
+                logger.error(f"Tesseract failed: {result.stderr.decode('utf-8', errors='replace')}")
+                return "", 0.0
                 
         except subprocess.TimeoutExpired:
             logger.error("Tesseract timeout")
-            return ""
+            return "", 0.0
         except Exception as e:
             logger.error(f"Tesseract error: {e}")
-            return ""
+            return "", 0.0
     
     def _mock_ocr(self, image: np.ndarray) -> str:
         """Mock OCR for testing."""
@@ -176,82 +310,7 @@ class TesseractOCR:
         Returns:
             List of detected measurements with amount and unit
         """
-        measurements = []
-        
-        # Pattern for common measurements
-        patterns = [
-            # Fractions with units: 1/2 tsp, ½ tbsp, etc.
-            (r'(\d+/\d+|½|¼|¾|⅓|⅔)\s*(tsp|tbsp|cup|oz|lb|g|kg|ml|l)', 'fraction_unit'),
-            # Decimals with units: 0.5 tsp, 2.5 cups
-            (r'(\d+\.?\d*)\s*(tsp|tbsp|cup|oz|lb|g|kg|ml|l)', 'decimal_unit'),
-            # Whole numbers with units: 1 tsp, 2 cups
-            (r'(\d+)\s*(teaspoon|tablespoon|cup|ounce|pound|gram|kilogram)', 'word_unit'),
-            # Weight markings: 100g, 250ml
-            (r'(\d+)\s*(g|kg|ml|l)\b', 'metric')
-        ]
-        
-        for pattern, pattern_type in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                amount_str = match.group(1)
-                unit = match.group(2).lower()
-                
-                # Convert fraction to decimal
-                amount = self._parse_amount(amount_str)
-                
-                # Normalize unit
-                unit = self._normalize_unit(unit)
-                
-                measurements.append({
-                    'amount': amount,
-                    'unit': unit,
-                    'raw_text': match.group(0),
-                    'confidence': 0.9 if pattern_type in ['fraction_unit', 'decimal_unit'] else 0.7
-                })
-        
-        return measurements
-    
-    def _parse_amount(self, amount_str: str) -> float:
-        """Parse amount string to float (handles fractions)."""
-        # Unicode fractions
-        fraction_map = {
-            '½': 0.5, '¼': 0.25, '¾': 0.75,
-            '⅓': 0.333, '⅔': 0.667,
-            '⅛': 0.125, '⅜': 0.375, '⅝': 0.625, '⅞': 0.875
-        }
-        
-        if amount_str in fraction_map:
-            return fraction_map[amount_str]
-        
-        # Regular fractions like 1/2, 3/4
-        if '/' in amount_str:
-            parts = amount_str.split('/')
-            if len(parts) == 2:
-                try:
-                    return float(parts[0]) / float(parts[1])
-                except (ValueError, ZeroDivisionError):
-                    return 1.0
-        
-        # Regular decimal
-        try:
-            return float(amount_str)
-        except ValueError:
-            return 1.0
-    
-    def _normalize_unit(self, unit: str) -> str:
-        """Normalize unit names to standard forms."""
-        unit_map = {
-            'tsp': 'teaspoon',
-            'tbsp': 'tablespoon',
-            'oz': 'ounce',
-            'lb': 'pound',
-            'g': 'grams',
-            'kg': 'kilograms',
-            'ml': 'milliliters',
-            'l': 'liters'
-        }
-        
-        return unit_map.get(unit.lower(), unit.lower())
+        return label_parser.extract_measurements(text)
     
     def detect_ingredient_names(self, text: str) -> List[str]:
         """
@@ -263,61 +322,194 @@ class TesseractOCR:
         Returns:
             List of detected ingredient names
         """
-        # Common ingredient keywords
-        ingredients = []
-        
-        # English ingredients
-        english_ingredients = [
-            'turmeric', 'haldi', 'cumin', 'jeera', 'coriander', 'dhania',
-            'chili', 'mirch', 'salt', 'namak', 'sugar', 'chini',
-            'mustard', 'rai', 'pepper', 'garam masala', 'oil', 'tel'
-        ]
-        
-        text_lower = text.lower()
-        for ingredient in english_ingredients:
-            if ingredient in text_lower:
-                ingredients.append(ingredient)
-        
-        return ingredients
+        return label_parser.detect_ingredient_names(text)
 
 
-def extract_label_info(ocr_text: str) -> Dict[str, Any]:
+class TesseractAPIPool:
     """
-    Extract structured information from ingredient label.
+    Small pool of initialized libtesseract handles (via tesserocr).
+    Each handle loads the traineddata once and is reused across calls; a handle is
+    used by one thread at a time, so the pool size bounds concurrent OCR workers.
+    """
+    
+    def __init__(self, languages: str = "eng+deva", size: int = 2, tessdata_path: Optional[str] = None):
+        """
+        Initialize the pool with one warm handle; more are created on demand, up to `size`.
+        
+        Args:
+            languages: Tesseract language string
+            size: Maximum number of handles
+            tessdata_path: Directory with traineddata files (tesserocr default if None)
+        
+        Raises:
+            ImportError: If tesserocr is not installed
+            RuntimeError: If the languages cannot be loaded
+        """
+        import tesserocr
+        
+        self._tesserocr = tesserocr
+        self.languages = languages
+        self.size = size
+        self.tessdata_path = tessdata_path
+        
+        self._idle: "queue.Queue" = queue.Queue()
+        self._handles = [self._create_handle()]
+        self._idle.put(self._handles[0])
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    def _create_handle(self):
+        """Initialize a new API handle (slow: loads the language models)."""
+        kwargs = {'lang': self.languages, 'oem': self._tesserocr.OEM.LSTM_ONLY}
+        if self.tessdata_path:
+            kwargs['path'] = self.tessdata_path
+        api = self._tesserocr.PyTessBaseAPI(**kwargs)
+        logger.debug(f"Initialized Tesseract API handle ({self.languages})")
+        return api
+    
+    def _acquire(self, timeout: float):
+        """Take an idle handle, creating one if the pool is not full."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Tesseract API pool is closed")
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if len(self._handles) < self.size:
+                api = self._create_handle()
+                self._handles.append(api)
+                return api
+        
+        # Wait in slices so close() does not leave callers blocked until the timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise queue.Empty
+            try:
+                api = self._idle.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                if self._closed:
+                    raise RuntimeError("Tesseract API pool is closed")
+                continue
+            with self._lock:
+                if not self._closed:
+                    return api
+            self._release(api)
+            raise RuntimeError("Tesseract API pool is closed")
+    
+    def _release(self, api):
+        """Return a handle to the pool, or free it if the pool was closed meanwhile."""
+        with self._lock:
+            if not self._closed:
+                self._idle.put(api)
+                return
+            if api in self._handles:
+                self._handles.remove(api)
+        self._end(api)
+    
+    @staticmethod
+    def _end(api):
+        try:
+            api.End()
+        except Exception:
+            pass
+    
+    def recognize(self, image: np.ndarray, psm: int = 6, timeout: float = 5.0) -> Tuple[str, float]:
+        """
+        Run OCR on a grayscale or BGR image.
+        
+        Args:
+            image: uint8 image
+            psm: Page segmentation mode for this request
+            timeout: Seconds to wait for a free handle
+        
+        Returns:
+            Tuple of (text, mean word confidence 0-1)
+        
+        Raises:
+            queue.Empty: If no handle became free within the timeout
+            RuntimeError: If the pool has been closed
+        """
+        if image.ndim == 3:
+            image = image[:, :, 2::-1]  # BGR to RGB
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        
+        api = self._acquire(timeout)
+        try:
+            api.SetPageSegMode(psm)
+            api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+            text = api.GetUTF8Text().strip()
+            confidence = api.MeanTextConf() / 100.0
+            api.Clear()
+        finally:
+            self._release(api)
+        
+        logger.debug(f"OCR result: '{text}' (confidence {confidence:.2f})")
+        return text, max(confidence, 0.0)
+    
+    def close(self):
+        """
+        Free all idle handles and refuse further reads. Handles still in use
+        are freed when their read finishes.
+        """
+        with self._lock:
+            self._closed = True
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            for api in idle:
+                self._handles.remove(api)
+        for api in idle:
+            self._end(api)
+
+
+def parse_tsv(tsv: str) -> Tuple[str, float]:
+    """
+    Rebuild text and mean word confidence from Tesseract TSV output.
     
     Args:
-        ocr_text: OCR text from label
+        tsv: Output of `tesseract ... tsv`
     
     Returns:
-        Dictionary with ingredient name, brand, quantity, expiry, etc.
+        Tuple of (text with one line per OCR line, mean confidence 0-1)
     """
-    info = {
-        'ingredient_names': [],
-        'brand': None,
-        'quantity': None,
-        'expiry_date': None,
-        'batch_number': None
-    }
+    lines: Dict[Tuple[str, str, str], List[str]] = {}
+    confidences = []
     
-    # Extract measurements
-    ocr = TesseractOCR()
-    measurements = ocr.extract_measurements(ocr_text)
-    if measurements:
-        info['quantity'] = measurements[0]
-    
-    # Extract ingredient names
-    info['ingredient_names'] = ocr.detect_ingredient_names(ocr_text)
+    for row in tsv.splitlines()[1:]:
+        cols = row.split("\t")
+        if len(cols) < 12 or cols[0] != "5":  # level 5 = word
+            continue
+        word = cols[11].strip()
+        try:
+            conf = float(cols[10])
+        except ValueError:
+            continue
+        if not word or conf < 0:
+            continue
+        lines.setdefault((cols[2], cols[3], cols[4]), []).append(word)
+        confidences.append(conf)
     
-    # Extract expiry date (common patterns)
-    expiry_patterns = [
-        r'exp[iry]*\s*:?\s*(\d{2}[/-]\d{2}[/-]\d{2,4})',
-        r'best\s*before\s*:?\s*(\d{2}[/-]\d{2}[/-]\d{2,4})'
-    ]
+    text = "\n".join(" ".join(words) for words in lines.values())
+    confidence = sum(confidences) / len(confidences) / 100.0 if confidences else 0.0
+    return text, confidence
+
+
+def extract_label_info(ocr_text: str) -> Dict[str, Any]:
+    """
+    Extract structured information from ingredient label.
     
-    for pattern in expiry_patterns:
-        match = re.search(pattern, ocr_text, re.IGNORECASE)
-        if match:
-            info['expiry_date'] = match.group(1)
-            break
+    Args:
+        ocr_text: OCR text from label
     
-    return info
+    Returns:
+        Dictionary with ingredient name, brand, quantity, expiry, etc.
+    """
+    return label_parser.parse_label(ocr_text)
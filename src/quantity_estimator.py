@@ -6,12 +6,16 @@ to produce quantity estimates for cooking ingredients.
 """
 
 from dataclasses import dataclass, asdict
-from typing import Optional, Dict, Any
-import re
+from typing import Optional, Dict, Any, List
 import logging
 
+from measurement_parser import normalize_unit, parse_amount, parse_measurements
+
 logger = logging.getLogger(__name__)
 
+# Units the OCR stage reports, most specific first
+OCR_UNIT_PRIORITY = ("teaspoon", "tablespoon", "grams", "milliliters", "cup")
+
 
 @dataclass
 class QuantityEstimate:
@@ -33,14 +37,17 @@ class QuantityEstimate:
 class QuantityEstimator:
     """Estimates ingredient quantities from vision data."""
     
-    def __init__(self, calibration_data: Optional[Dict] = None):
+    def __init__(self, calibration_data: Optional[Dict] = None, conclusive_confidence: float = 0.8):
         """
         Initialize the quantity estimator.
         
         Args:
             calibration_data: Optional calibration data with pixels_per_cm and spoon dimensions
+            conclusive_confidence: Confidence at which an estimate is final and
+                remaining perception stages can be skipped
         """
         self.calibration_data = calibration_data or {}
+        self.conclusive_confidence = conclusive_confidence
         self.pixels_per_cm = self.calibration_data.get("pixels_per_cm", 35.0)
         self.spoon_data = self.calibration_data.get("spoons", {
             "teaspoon": {"bowl_diameter_cm": 3.2, "bowl_area_cm2": 8.0},
@@ -51,16 +58,21 @@ class QuantityEstimator:
         self, 
         vlm_json: Dict[str, Any], 
         ocr_text: str = "", 
-        depth_map: Optional[Any] = None
+        depth_map: Optional[Any] = None,
+        spoon_detections: Optional[List[Dict[str, Any]]] = None
     ) -> Optional[QuantityEstimate]:
         """
         Fuse spoon/container detections, fill ratios, OCR marks, and optional depth
         to produce a quantity estimate. Optimized for CPU performance.
         
+        Can be called repeatedly with partial inputs as perception stages finish;
+        see is_conclusive() for deciding when to stop waiting.
+        
         Args:
             vlm_json: Vision LLM output with detected items, tools, containers
             ocr_text: OCR text from labels or measuring marks
             depth_map: Optional depth map for volume estimation
+            spoon_detections: Optional spoon detector output (bbox, fill_ratio, name)
             
         Returns:
             QuantityEstimate or None if unable to estimate
@@ -68,7 +80,10 @@ class QuantityEstimator:
         logger.debug(f"Estimating quantity from VLM: {vlm_json.keys()}, OCR: '{ocr_text[:50]}'")
         
         # Priority 1: Spoon detection & fill ratio from VLM/YOLO detections
-        spoon_estimate = self._estimate_from_spoon(vlm_json)
+        tools = list(vlm_json.get("tools", []))
+        for detection in spoon_detections or []:
+            tools.append({"name": "spoon", **detection})
+        spoon_estimate = self._estimate_from_spoon({"tools": tools})
         if spoon_estimate and spoon_estimate.confidence > 0.6:
             logger.info(f"Spoon estimate: {spoon_estimate}")
             return spoon_estimate
@@ -100,6 +115,12 @@ class QuantityEstimator:
             method="heuristic"
         )
     
+    def is_conclusive(self, estimate: Optional[QuantityEstimate]) -> bool:
+        """Return True if an estimate is confident enough to skip remaining stages."""
+        return (estimate is not None
+                and estimate.method != "heuristic"
+                and estimate.confidence >= self.conclusive_confidence)
+    
     def _estimate_from_spoon(self, vlm_json: Dict[str, Any]) -> Optional[QuantityEstimate]:
         """Extract quantity from spoon detection and fill ratio."""
         tools = vlm_json.get("tools", [])
@@ -148,66 +169,21 @@ class QuantityEstimator:
     
     def _estimate_from_ocr(self, text: str) -> Optional[QuantityEstimate]:
         """Extract quantity from OCR text."""
-        # Pattern matching for common measurements
-        patterns = [
-            (r'(\d+/\d+|½|¼|¾)\s*(tsp|teaspoon)', 'teaspoon'),
-            (r'(\d+/\d+|½|¼|¾)\s*(tbsp|tablespoon)', 'tablespoon'),
-            (r'(\d+\.?\d*)\s*(tsp|teaspoon)', 'teaspoon'),
-            (r'(\d+\.?\d*)\s*(tbsp|tablespoon)', 'tablespoon'),
-            (r'(\d+\.?\d*)\s*(g|grams?)', 'grams'),
-            (r'(\d+\.?\d*)\s*(cup|cups)', 'cup')
-        ]
-        
-        text_lower = text.lower()
-        
-        for pattern, unit in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                amount_str = match.group(1)
-                amount = self._parse_amount(amount_str)
-                normalized_unit = self._normalize_unit(unit)
-                
-                return QuantityEstimate(amount, normalized_unit, 0.9, "ocr_mark")
+        # Prefer spoon marks over weights over cups, as measuring tools carry the former
+        candidates = [m for m in parse_measurements(text) if m.unit in OCR_UNIT_PRIORITY]
+        if not candidates:
+            return None
         
-        return None
+        best = min(candidates, key=lambda m: (OCR_UNIT_PRIORITY.index(m.unit), m.start))
+        return QuantityEstimate(best.amount, best.unit, best.confidence, "ocr_mark")
     
     def _parse_amount(self, amount_str: str) -> float:
         """Parse amount string to float (handles fractions)."""
-        # Unicode fractions
-        fraction_map = {
-            '½': 0.5, '¼': 0.25, '¾': 0.75,
-            '⅓': 0.333, '⅔': 0.667,
-            '⅛': 0.125, '⅜': 0.375, '⅝': 0.625, '⅞': 0.875
-        }
-        
-        if amount_str in fraction_map:
-            return fraction_map[amount_str]
-        
-        # Regular fractions like 1/2, 3/4
-        if '/' in amount_str:
-            parts = amount_str.split('/')
-            if len(parts) == 2:
-                try:
-                    return float(parts[0]) / float(parts[1])
-                except (ValueError, ZeroDivisionError):
-                    return 1.0
-        
-        # Regular decimal
-        try:
-            return float(amount_str)
-        except ValueError:
-            return 1.0
+        return parse_amount(amount_str)
     
     def _normalize_unit(self, unit: str) -> str:
         """Normalize unit names to standard forms."""
-        unit_map = {
-            'tsp': 'teaspoon',
-            'tbsp': 'tablespoon',
-            'g': 'grams',
-            'gram': 'grams',
-        }
-        
-        return unit_map.get(unit.lower(), unit.lower())
+        return normalize_unit(unit)
     
     def _estimate_from_depth(self, depth_map, vlm_json: Dict[str, Any]) -> Optional[QuantityEstimate]:
         """Estimate volume from depth map (placeholder for future implementation)."""
@@ -0,0 +1,213 @@
+# roi.py
+"""
+Region-of-Interest Selection
+Crops frames to the spoon bowl or jar label before VLM and OCR so fewer pixels
+are encoded, tokenized and recognized. ROIs come from VLM bounding boxes or a
+cheap OpenCV contour pass, and are reused while the scene stays the same.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+from frame_hash import hamming_distance, perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ROI:
+    """Rectangular region in full-frame pixel coordinates."""
+    x: int
+    y: int
+    width: int
+    height: int
+    source: str  # "vlm_bbox" | "contour"
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """Return a view of the region (no copy)."""
+        return frame[self.y:self.y + self.height, self.x:self.x + self.width]
+
+
+@dataclass
+class ROICrop:
+    """A cropped, resized image plus the mapping back to the full frame."""
+    image: np.ndarray
+    roi: Optional[ROI]  # None when the whole frame was used
+    scale: float  # crop pixels -> image pixels
+
+
+class ROISelector:
+    """
+    Picks the region of a frame worth analyzing and caches it per scene.
+    """
+
+    def __init__(
+        self,
+        vlm_input_size: int = 378,
+        padding: float = 0.15,
+        min_area_ratio: float = 0.02,
+        reuse_distance: int = 10
+    ):
+        """
+        Initialize ROI selector.
+
+        Args:
+            vlm_input_size: Native image size of the VLM's vision encoder
+                (378 for Moondream2, 336 for LLaVA-Phi-3)
+            padding: Fractional margin added around a detected region
+            min_area_ratio: Smallest region (fraction of frame area) accepted
+            reuse_distance: Max perceptual-hash distance for reusing the cached ROI
+        """
+        self.vlm_input_size = vlm_input_size
+        self.padding = padding
+        self.min_area_ratio = min_area_ratio
+        self.reuse_distance = reuse_distance
+
+        self._cached: Optional[ROI] = None
+        self._cached_hash: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def select(self, frame: np.ndarray) -> Optional[ROI]:
+        """
+        Return the ROI for a frame, reusing the cached one for the same scene.
+
+        Returns:
+            ROI in frame coordinates, or None to use the whole frame
+        """
+        frame_hash = perceptual_hash(frame)
+        with self._lock:
+            if (self._cached is not None and self._cached_hash is not None
+                    and hamming_distance(frame_hash, self._cached_hash) <= self.reuse_distance):
+                return self._cached
+
+        roi = self._detect_contour_roi(frame)
+        with self._lock:
+            self._cached, self._cached_hash = roi, frame_hash
+        return roi
+
+    def crop_for_vlm(self, frame: np.ndarray) -> ROICrop:
+        """Crop to the ROI and resize so the longer side matches the VLM input size."""
+        return self._vlm_crop(frame, self.select(frame))
+
+    def crop_for_ocr(self, frame: np.ndarray) -> np.ndarray:
+        """Crop to the ROI at full resolution (OCR needs the pixels)."""
+        roi = self.select(frame)
+        return roi.crop(frame) if roi is not None else frame
+
+    def crops(self, frame: np.ndarray) -> Tuple[ROICrop, np.ndarray]:
+        """
+        VLM and OCR crops from a single ROI selection, for stages that run in
+        parallel (so a VLM update of the cached ROI cannot shift the OCR crop).
+
+        Returns:
+            Tuple of (VLM crop, OCR crop)
+        """
+        roi = self.select(frame)
+        return self._vlm_crop(frame, roi), roi.crop(frame) if roi is not None else frame
+
+    def _vlm_crop(self, frame: np.ndarray, roi: Optional[ROI]) -> ROICrop:
+        region = roi.crop(frame) if roi is not None else frame
+        image, scale = self._resize_longest(region, self.vlm_input_size)
+        return ROICrop(image, roi, scale)
+
+    def update_from_vlm(self, vlm_json: Dict[str, Any], crop: ROICrop, frame: np.ndarray):
+        """
+        Cache the most confident VLM bounding box as the ROI for this scene.
+
+        Args:
+            vlm_json: VLM result whose bboxes are relative to crop.image
+            crop: The crop that was sent to the VLM
+            frame: Full frame the crop came from
+        """
+        items = [i for i in vlm_json.get("recognized_items", []) if self._valid_bbox(i.get("bbox"))]
+        if not items:
+            return
+
+        best = max(items, key=lambda i: i.get("confidence", 0))
+        x, y, w, h = best["bbox"]
+        offset_x = crop.roi.x if crop.roi is not None else 0
+        offset_y = crop.roi.y if crop.roi is not None else 0
+        roi = self._padded(
+            offset_x + x / crop.scale, offset_y + y / crop.scale,
+            w / crop.scale, h / crop.scale,
+            frame.shape, "vlm_bbox"
+        )
+        if roi is None:
+            return
+
+        with self._lock:
+            self._cached, self._cached_hash = roi, perceptual_hash(frame)
+        logger.debug(f"ROI from VLM bbox: {roi}")
+
+    def reset(self):
+        """Forget the cached ROI."""
+        with self._lock:
+            self._cached, self._cached_hash = None, None
+
+    @staticmethod
+    def _valid_bbox(bbox: Any) -> bool:
+        return (isinstance(bbox, (list, tuple)) and len(bbox) == 4
+                and all(isinstance(v, (int, float)) for v in bbox)
+                and bbox[2] > 0 and bbox[3] > 0)
+
+    def _padded(
+        self,
+        x: float, y: float, w: float, h: float,
+        frame_shape: Tuple[int, ...],
+        source: str
+    ) -> Optional[ROI]:
+        """Pad a box, clamp it to the frame and reject tiny regions."""
+        frame_h, frame_w = frame_shape[:2]
+        pad_x, pad_y = w * self.padding, h * self.padding
+        x0 = int(max(0, x - pad_x))
+        y0 = int(max(0, y - pad_y))
+        x1 = int(min(frame_w, x + w + pad_x))
+        y1 = int(min(frame_h, y + h + pad_y))
+
+        if x1 <= x0 or y1 <= y0:
+            return None
+        if (x1 - x0) * (y1 - y0) < self.min_area_ratio * frame_w * frame_h:
+            return None
+        return ROI(x0, y0, x1 - x0, y1 - y0, source)
+
+    def _detect_contour_roi(self, frame: np.ndarray) -> Optional[ROI]:
+        """Cheap saliency: bounding box of the largest edge contour on a 4x-downscaled frame."""
+        try:
+            import cv2
+        except ImportError:
+            return None
+
+        small = frame[::4, ::4]
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        edges = cv2.Canny(gray, 50, 150)
+        edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=2)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        roi = self._padded(x * 4, y * 4, w * 4, h * 4, frame.shape, "contour")
+        if roi is not None:
+            logger.debug(f"ROI from contours: {roi}")
+        return roi
+
+    @staticmethod
+    def _resize_longest(image: np.ndarray, size: int) -> Tuple[np.ndarray, float]:
+        """Resize so the longer side equals `size` (only ever shrinks)."""
+        longest = max(image.shape[:2])
+        if longest <= size:
+            return image, 1.0
+
+        scale = size / longest
+        new_w = max(1, int(round(image.shape[1] * scale)))
+        new_h = max(1, int(round(image.shape[0] * scale)))
+        try:
+            import cv2
+            return cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA), scale
+        except ImportError:
+            from PIL import Image
+            resized = Image.fromarray(np.ascontiguousarray(image)).resize((new_w, new_h), Image.BOX)
+            return np.asarray(resized), scale
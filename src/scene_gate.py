@@ -0,0 +1,162 @@
+# scene_gate.py
+"""
+Scene Stability Gate
+Lightweight motion and sharpness checks on downscaled grayscale frames (NumPy only)
+so the VLM only runs on stable, sharp frames and is skipped when the scene
+has not changed since the last analysis.
+"""
+
+import logging
+import time
+from typing import Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_GRAY_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)  # BGR luminance
+
+
+def downscale_gray(frame: np.ndarray, factor: int = 4) -> np.ndarray:
+    """
+    Block-average a frame by `factor` and convert it to float32 luminance.
+
+    Args:
+        frame: BGR or grayscale frame
+        factor: Downscale factor per axis
+
+    Returns:
+        2-D float32 array of shape (H // factor, W // factor)
+    """
+    h = frame.shape[0] // factor * factor
+    w = frame.shape[1] // factor * factor
+    cropped = frame[:h, :w]
+
+    if cropped.ndim == 3:
+        blocks = cropped.reshape(h // factor, factor, w // factor, factor, cropped.shape[2])
+        small = blocks.mean(axis=(1, 3), dtype=np.float32)
+        return small[:, :, :3] @ _GRAY_WEIGHTS
+
+    blocks = cropped.reshape(h // factor, factor, w // factor, factor)
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Sharpness score: variance of the 4-neighbour Laplacian (higher = sharper)."""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    lap = (4.0 * gray[1:-1, 1:-1]
+           - gray[:-2, 1:-1] - gray[2:, 1:-1]
+           - gray[1:-1, :-2] - gray[1:-1, 2:])
+    return float(lap.var())
+
+
+def frame_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean absolute difference between two downscaled gray frames."""
+    if a.shape != b.shape:
+        return float("inf")
+    return float(np.abs(a - b).mean())
+
+
+class SceneGate:
+    """
+    Decides when a frame is worth sending to the VLM.
+    - wait_for_stable(): waits for consecutive low-motion, sharp frames
+    - has_changed(): compares a frame against the last analyzed one
+    """
+
+    def __init__(
+        self,
+        motion_threshold: float = 3.0,
+        sharpness_threshold: float = 30.0,
+        change_threshold: float = 8.0,
+        stable_frames: int = 2,
+        factor: int = 4
+    ):
+        """
+        Initialize scene gate.
+
+        Args:
+            motion_threshold: Max mean abs gray difference between consecutive frames
+            sharpness_threshold: Min Laplacian variance for a frame to count as sharp
+            change_threshold: Mean abs difference from the last analyzed frame that
+                counts as a new scene
+            stable_frames: Consecutive stable frames required
+            factor: Downscale factor used for all measurements
+        """
+        self.motion_threshold = motion_threshold
+        self.sharpness_threshold = sharpness_threshold
+        self.change_threshold = change_threshold
+        self.stable_frames = stable_frames
+        self.factor = factor
+
+        self._reference: Optional[np.ndarray] = None
+
+    def measure(self, frame: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Return (downscaled gray frame, sharpness) for a frame."""
+        small = downscale_gray(frame, self.factor)
+        return small, laplacian_variance(small)
+
+    def wait_for_stable(self, camera, deadline: float = 1.5) -> Optional[np.ndarray]:
+        """
+        Wait for a stable, sharp frame from a CameraService.
+
+        Args:
+            camera: CameraService providing fresh frames
+            deadline: Maximum seconds to wait
+
+        Returns:
+            The first frame that is stable and sharp, or the sharpest frame seen
+            when the deadline passes (None if no frames arrived). The frame is
+            an owned copy: the camera's ring slots are reused within a few
+            frame periods, far sooner than the VLM/OCR stages finish with it.
+        """
+        start = time.time()
+        latest = camera.latest()
+        if latest is None:
+            return None
+
+        frame, timestamp = latest
+        previous, sharpness = self.measure(frame)
+        # Motion/sharpness are measured on views; only the kept frame is copied
+        best_frame, best_sharpness = frame.copy(), sharpness
+        stable_count = 0
+
+        while time.time() - start < deadline:
+            remaining = deadline - (time.time() - start)
+            nxt = camera.wait_for_frame(timestamp, timeout=max(0.01, remaining))
+            if nxt is None:
+                break
+            frame, timestamp = nxt
+            small, sharpness = self.measure(frame)
+
+            if sharpness > best_sharpness:
+                best_frame, best_sharpness = frame.copy(), sharpness
+
+            motion = frame_difference(small, previous)
+            previous = small
+            if motion <= self.motion_threshold and sharpness >= self.sharpness_threshold:
+                stable_count += 1
+                if stable_count >= self.stable_frames:
+                    logger.debug(f"Stable frame after {time.time() - start:.2f}s "
+                                 f"(motion {motion:.1f}, sharpness {sharpness:.0f})")
+                    return frame.copy()
+            else:
+                stable_count = 0
+
+        logger.debug(f"No stable frame within {deadline}s - using sharpest ({best_sharpness:.0f})")
+        return best_frame
+
+    def has_changed(self, frame: np.ndarray) -> bool:
+        """Return True if the frame differs from the last analyzed frame."""
+        if self._reference is None:
+            return True
+        small = downscale_gray(frame, self.factor)
+        return frame_difference(small, self._reference) > self.change_threshold
+
+    def mark_analyzed(self, frame: np.ndarray):
+        """Remember a frame as the reference for has_changed()."""
+        self._reference = downscale_gray(frame, self.factor)
+
+    def reset(self):
+        """Forget the reference frame."""
+        self._reference = None
@@ -4,20 +4,169 @@ Speech-to-Text Module using Whisper.cpp
 Offline voice recognition with Voice Activity Detection (VAD) for the Chef Assistant.
 """
 
+import io
+import json
 import logging
+import re
 import subprocess
 import wave
 import numpy as np
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple, Callable
+from typing import Dict, List, Optional, Set, Tuple, Callable
 import threading
 import queue
 import time
 import tempfile
 
+from image_transport import shared_memory_file
+from local_server import ManagedServer, ServerUnavailable, encode_multipart
+from vad import EnergyVAD, VADEngine
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SpeechSegment:
+    """One utterance queued for transcription."""
+    uid: int
+    audio: np.ndarray  # Usually a read-only view into the capture ring buffer
+    start: Optional[int] = None  # Ring position of the first sample, if ring-backed
+    captured_at: float = field(default_factory=time.monotonic)
+    deadline: float = float("inf")  # Monotonic time after which it is stale
+    merged_uids: List[int] = field(default_factory=list)  # Later utterances coalesced into this one
+
+
+class UtteranceQueue:
+    """
+    Bounded two-lane work queue between capture and transcription.
+    
+    - Short utterances (likely commands) go to a priority lane that is
+      always served first.
+    - Every item gets a deadline; items past it are dropped instead of being
+      transcribed long after they were spoken.
+    - When full, the oldest item is dropped (regular lane first).
+    - Consecutive waiting segments in the regular lane are merged into one
+      transcription (a zero-copy ring view when they are adjacent in the ring).
+    """
+    
+    def __init__(
+        self,
+        maxsize: int = 4,
+        max_age: float = 6.0,
+        priority_duration: float = 3.0,
+        sample_rate: int = 16000,
+        ring: Optional["AudioRingBuffer"] = None,
+        max_coalesced_duration: float = 15.0
+    ):
+        """
+        Args:
+            maxsize: Maximum number of waiting segments (both lanes)
+            max_age: Seconds a segment may wait before it is dropped as stale
+            priority_duration: Segments up to this long use the priority lane
+            sample_rate: Audio sample rate
+            ring: Capture ring buffer backing the segments, if any
+            max_coalesced_duration: Longest merged segment in seconds
+        """
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.priority_duration = priority_duration
+        self.sample_rate = sample_rate
+        self.ring = ring
+        self.max_coalesced_duration = max_coalesced_duration
+        
+        self._priority: deque = deque()
+        self._regular: deque = deque()
+        self._cond = threading.Condition()
+        
+        self.dropped_full = 0
+        self.dropped_stale = 0
+        self.coalesced = 0
+    
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._priority) + len(self._regular)
+    
+    def empty(self) -> bool:
+        return len(self) == 0
+    
+    def put(self, segment: SpeechSegment):
+        """Queue a segment, dropping the oldest one if the queue is full."""
+        duration = len(segment.audio) / self.sample_rate
+        segment.deadline = segment.captured_at + self.max_age
+        
+        with self._cond:
+            if duration <= self.priority_duration:
+                self._priority.append(segment)
+            elif not (self._regular and self._coalesce(self._regular[-1], segment)):
+                self._regular.append(segment)
+            
+            while len(self._priority) + len(self._regular) > self.maxsize:
+                dropped = (self._regular or self._priority).popleft()
+                self.dropped_full += 1
+                logger.warning(f"STT queue full - dropped utterance {dropped.uid}")
+            self._cond.notify()
+    
+    def _coalesce(self, previous: SpeechSegment, segment: SpeechSegment) -> bool:
+        """Merge segment into the waiting previous one; False if not possible."""
+        total = len(segment.audio) + len(previous.audio)
+        if total > self.max_coalesced_duration * self.sample_rate:
+            return False
+        
+        # Only the two utterances: audio between them may belong to a priority
+        # command or to discarded echo
+        contiguous = (previous.start is not None and segment.start is not None
+                      and segment.start == previous.start + len(previous.audio))
+        if self.ring is not None and contiguous and self.ring.is_valid(previous.start):
+            previous.audio = self.ring.view(previous.start, segment.start + len(segment.audio))
+        else:
+            previous.audio = np.concatenate((previous.audio, segment.audio))
+            previous.start = None
+        previous.merged_uids.extend([segment.uid, *segment.merged_uids])
+        previous.deadline = segment.deadline
+        self.coalesced += 1
+        return True
+    
+    def get(self, timeout: Optional[float] = None) -> SpeechSegment:
+        """
+        Take the next fresh segment (priority lane first).
+        
+        Raises:
+            queue.Empty: If no fresh segment arrives within timeout
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._priority or self._regular:
+                    segment = (self._priority or self._regular).popleft()
+                    if time.monotonic() <= segment.deadline:
+                        return segment
+                    self.dropped_stale += 1
+                    logger.warning(f"Dropped stale utterance {segment.uid} "
+                                   f"({time.monotonic() - segment.captured_at:.1f}s old)")
+                
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+    
+    def get_nowait(self) -> SpeechSegment:
+        return self.get(timeout=0)
+    
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and drop counters."""
+        with self._cond:
+            return {
+                'depth': len(self._priority) + len(self._regular),
+                'priority_depth': len(self._priority),
+                'dropped_full': self.dropped_full,
+                'dropped_stale': self.dropped_stale,
+                'coalesced': self.coalesced
+            }
+
+
 class WhisperSTT:
     """
     Offline Speech-to-Text using whisper.cpp with VAD.
@@ -31,7 +180,21 @@ class WhisperSTT:
         vad_threshold: float = 0.02,
         language: str = "en",
         silence_duration: float = 1.5,
-        min_speech_duration: float = 0.5
+        min_speech_duration: float = 0.5,
+        backend: str = "subprocess",
+        server_url: Optional[str] = None,
+        server_port: int = 8178,
+        server_timeout: float = 10.0,
+        keyword_spotter: Optional["KeywordSpotter"] = None,
+        streaming: bool = False,
+        partial_interval: float = 0.5,
+        partial_window: float = 3.0,
+        pre_roll: float = 0.3,
+        max_speech_duration: float = 15.0,
+        buffer_duration: float = 30.0,
+        vad: Optional[VADEngine] = None,
+        queue_size: int = 4,
+        max_queue_age: float = 6.0
     ):
         """
         Initialize Whisper STT.
@@ -39,10 +202,32 @@ class WhisperSTT:
         Args:
             model_path: Path to whisper GGML model file
             sample_rate: Audio sample rate (whisper expects 16kHz)
-            vad_threshold: Voice activity detection threshold (RMS energy)
+            vad_threshold: Voice activity detection threshold (RMS energy),
+                used when no VAD engine is given
             language: Language code ("en", "hi", "mr")
             silence_duration: Seconds of silence to end speech segment
             min_speech_duration: Minimum speech duration to process
+            backend: "subprocess" (whisper.cpp per utterance via WAV file) or
+                "server" (resident whisper-server, PCM sent in-memory)
+            server_url: URL of an already-running whisper-server (skips launching one)
+            server_port: Local port for the launched whisper-server
+            server_timeout: Per-request timeout for the server backend in seconds
+            keyword_spotter: Optional spotter for fixed commands; matching
+                utterances skip Whisper entirely
+            streaming: Decode the utterance while it is still being spoken and
+                dispatch as soon as a stable prefix matches the command matcher
+            partial_interval: Seconds of new speech between partial decodes
+            partial_window: Longest utterance decoded for partials (seconds);
+                longer speech waits for the end-of-speech silence
+            pre_roll: Seconds of audio before the VAD trigger kept with each
+                utterance, so the first syllable is not clipped
+            max_speech_duration: Utterances are cut off after this many seconds
+            buffer_duration: Capture ring buffer length in seconds; queued
+                utterances are views into it and must be transcribed before
+                it wraps around (buffer_duration - max_speech_duration of slack)
+            vad: VAD engine (see vad.py); defaults to an RMS threshold
+            queue_size: Maximum utterances waiting for transcription
+            max_queue_age: Seconds after capture when a waiting utterance is dropped
         """
         self.model_path = Path(model_path)
         if not self.model_path.exists():
@@ -53,16 +238,75 @@ class WhisperSTT:
         self.language = language
         self.silence_duration = silence_duration
         self.min_speech_duration = min_speech_duration
+        self.vad = vad if vad is not None else EnergyVAD(vad_threshold, sample_rate)
         
         self.whisper_cpp_path = self._find_whisper_cpp()
+        
+        # Resident server backend (falls back to the subprocess path on failure)
+        self.server_timeout = server_timeout
+        self.server: Optional[ManagedServer] = None
+        if backend == "server":
+            self.server = self._start_server(server_url, server_port)
+        self.last_latency = 0.0
+        
+        self.keyword_spotter = keyword_spotter
+        self.kws_hits = 0
+        self.whisper_runs = 0
+        # Final and partial decodes run on different threads
+        self._stats_lock = threading.Lock()
+        
+        # Constrained decoding for short command utterances (see set_command_vocabulary)
+        self.command_phrases: List[str] = []
+        self.command_terms: List[str] = []
+        self.command_prompt = ""
+        self.command_matcher: Optional[Callable[[str], bool]] = None
+        self.command_max_duration = 3.0
+        self.command_min_confidence = 0.6  # Mean token probability to trust grammar output
+        self._grammar_scoring = True  # Cleared if whisper.cpp cannot report token probabilities
+        self.grammar_rejections = 0
+        self._grammar_path: Optional[Path] = None
+        
+        # Streaming partial transcription (only with a resident model: a
+        # subprocess per partial would reload the model every interval)
+        if streaming and self.server is None:
+            logger.warning("Streaming partials need the whisper-server backend - disabled")
+            streaming = False
+        self.streaming = streaming
+        self.partial_interval = partial_interval
+        self.partial_window = partial_window
+        self.partial_callback: Optional[Callable[[str], None]] = None
+        self.partial_runs = 0
+        self.partial_dispatches = 0
+        self._partial_queue: "queue.Queue[Tuple[int, np.ndarray]]" = queue.Queue(maxsize=1)
+        self._partial_hypothesis: Tuple[int, List[str]] = (0, [])
+        self._last_partial_samples = 0
+        self._utterance_id = 0
+        self._claimed: Set[int] = set()  # Utterances dispatched early or discarded
+        self._claim_lock = threading.Lock()
+        self.skipped_claimed = 0  # Queued utterances skipped because they were claimed
+        self.dropped_overrun = 0  # Queued utterances overwritten in the ring
+        
         self.is_recording = False
         self.is_listening = False
-        self.audio_queue = queue.Queue()
         self.result_callback = None
+        self.chunk_duration = 0.1  # Capture chunk length in seconds
         
-        # Audio buffering for continuous listening
-        self.audio_buffer = []
-        self.speech_buffer = []
+        # Optional filter on VAD decisions, callback(chunk, is_voice) -> is_voice;
+        # used for echo gating while the assistant is speaking
+        self.capture_gate: Optional[Callable[[np.ndarray, bool], bool]] = None
+        
+        # Audio buffering for continuous listening: utterances are slices of the ring
+        self.pre_roll = pre_roll
+        self.max_speech_duration = min(max_speech_duration, buffer_duration - pre_roll)
+        self.ring = AudioRingBuffer(int(buffer_duration * sample_rate))
+        self._speech_start = 0  # Absolute sample position of the current utterance
+        self.audio_queue = UtteranceQueue(
+            maxsize=queue_size,
+            max_age=max_queue_age,
+            priority_duration=self.command_max_duration,
+            sample_rate=sample_rate,
+            ring=self.ring
+        )
         self.is_speech_active = False
         self.silence_counter = 0
         self.speech_start_time = 0
@@ -86,6 +330,242 @@ class WhisperSTT:
         logger.warning("whisper.cpp not found - using mock mode")
         return None
     
+    def _find_whisper_server(self) -> Optional[Path]:
+        """Find whisper.cpp server executable."""
+        possible_paths = [
+            Path("./whisper.cpp/whisper-server"),
+            Path("./whisper.cpp/build/bin/whisper-server"),
+            Path("/usr/local/bin/whisper-server"),
+            Path("./whisper.cpp/server"),
+            Path("./whisper.cpp/build/bin/server")
+        ]
+        
+        for path in possible_paths:
+            if path.exists():
+                logger.info(f"Found whisper server at: {path}")
+                return path
+        
+        return None
+    
+    def _start_server(self, server_url: Optional[str], server_port: int) -> Optional[ManagedServer]:
+        """Launch (or attach to) a resident whisper-server with the model loaded."""
+        if server_url:
+            server = ManagedServer("whisper-server", server_url)
+        else:
+            server_path = self._find_whisper_server()
+            if server_path is None:
+                logger.warning("whisper-server not found - using subprocess backend")
+                return None
+            
+            cmd = [
+                str(server_path),
+                "-m", str(self.model_path),
+                "-l", self.language,
+                "--host", "127.0.0.1",
+                "--port", str(server_port)
+            ]
+            server = ManagedServer("whisper-server", f"http://127.0.0.1:{server_port}", cmd)
+        
+        if not server.start():
+            logger.warning("Whisper server not ready - will retry on first request")
+        return server
+    
+    def close(self):
+        """Stop the resident server backend, if any."""
+        if self.server is not None:
+            self.server.stop()
+    
+    def transcribe_buffer(self, audio_data: np.ndarray) -> Tuple[str, float]:
+        """
+        Transcribe an in-memory PCM buffer.
+        
+        With the server backend the audio never touches disk; otherwise it is
+        written to a uniquely named WAV file (in shared memory where available)
+        for the whisper.cpp subprocess, so concurrent decodes never collide.
+        
+        Args:
+            audio_data: Audio samples (float32 -1.0..1.0 or int16), mono at sample_rate
+        
+        Returns:
+            Tuple of (transcribed text, latency in seconds)
+        """
+        start = time.time()
+        text = None
+        
+        if self.server is not None:
+            text = self._run_server(audio_data)
+            if text is None:
+                logger.warning("Whisper server unavailable - falling back to subprocess")
+        
+        if text is None:
+            with shared_memory_file(audio_to_wav_bytes(audio_data, self.sample_rate), ".wav") as wav:
+                text = self.transcribe_audio(str(wav))
+        
+        latency = self._record_latency(start)
+        logger.debug(f"Transcription latency: {latency * 1000:.0f} ms")
+        return text, latency
+    
+    def _record_latency(self, start: float) -> float:
+        """Store and return the latency of a recognition that began at start."""
+        latency = time.time() - start
+        with self._stats_lock:
+            self.last_latency = latency
+        return latency
+    
+    def recognize(self, audio_data: np.ndarray) -> Tuple[str, float]:
+        """
+        Recognize an utterance: keyword spotting first, Whisper for everything else.
+        
+        Args:
+            audio_data: Audio samples (float32), mono at sample_rate
+        
+        Returns:
+            Tuple of (text, latency in seconds)
+        """
+        if self.keyword_spotter is not None:
+            start = time.time()
+            spotted = self.keyword_spotter.spot(audio_data)
+            if spotted is not None:
+                command, distance = spotted
+                latency = self._record_latency(start)
+                with self._stats_lock:
+                    self.kws_hits += 1
+                logger.info(f"Keyword spotted: '{command}' (distance {distance:.2f}, "
+                            f"{latency * 1000:.0f} ms)")
+                return command, latency
+        
+        with self._stats_lock:
+            self.whisper_runs += 1
+        # Segments carry pre-roll and the end-of-speech silence: judge the spoken part
+        if (self.command_phrases and self._grammar_scoring
+                and voiced_duration(audio_data, self.sample_rate) <= self.command_max_duration):
+            return self.transcribe_command(audio_data)
+        return self.transcribe_buffer(audio_data)
+    
+    def set_command_vocabulary(
+        self,
+        phrases: List[str],
+        terms: Optional[List[str]] = None,
+        matcher: Optional[Callable[[str], bool]] = None
+    ):
+        """
+        Configure constrained decoding for short (command-length) utterances.
+        
+        Args:
+            phrases: Command phrases, e.g. ["next step", "repeat", "how much"]
+            terms: Extra words that may follow a command, e.g. recipe ingredients
+            matcher: Returns True once decoded text is a complete command (used to
+                dispatch stable streaming partials)
+        """
+        self.command_phrases = list(dict.fromkeys(p.lower() for p in phrases))
+        self.command_terms = list(dict.fromkeys(t.replace("_", " ").lower() for t in terms or []))
+        self.command_prompt = build_command_prompt(self.command_phrases, self.command_terms)
+        if matcher is not None:
+            self.command_matcher = matcher
+        
+        # Grammar file is rewritten on next use
+        if self._grammar_path is not None:
+            self._grammar_path.unlink(missing_ok=True)
+            self._grammar_path = None
+        logger.debug(f"Command vocabulary: {len(self.command_phrases)} phrases, "
+                     f"{len(self.command_terms)} terms")
+    
+    def transcribe_command(self, audio_data: np.ndarray) -> Tuple[str, float]:
+        """
+        Transcribe a short utterance biased towards the command vocabulary.
+        
+        The whisper.cpp CLI gets the vocabulary prompt, a GBNF grammar, no prior
+        text context and an audio context sized to the clip. The grammar can only
+        produce commands, so its output is accepted only when the mean token
+        probability reaches command_min_confidence; anything else (non-command
+        speech, noise) is rejected as an empty transcript rather than decoded a
+        second time, since only commands are acted on. whisper-server only
+        receives the prompt, which biases but does not force the output.
+        
+        Returns:
+            Tuple of (transcribed text, latency in seconds)
+        """
+        start = time.time()
+        text = None
+        
+        if self.server is not None:
+            text = self._run_server(audio_data, prompt=self.command_prompt)
+        
+        if text is None:
+            if self.whisper_cpp_path is None:
+                return self.transcribe_buffer(audio_data)
+            
+            duration = len(audio_data) / self.sample_rate
+            extra_args = [
+                "--prompt", self.command_prompt,
+                "--grammar", str(self._command_grammar_file()),
+                "--grammar-rule", "root",
+                "-mc", "0",  # No text context from earlier segments
+                "-ac", str(min(1500, int(duration * 50) + 64))  # Encoder frames for this clip only
+            ]
+            with shared_memory_file(audio_to_wav_bytes(audio_data, self.sample_rate), ".wav") as wav:
+                text, confidence = self._run_whisper_scored(wav, extra_args)
+            
+            if confidence is None:
+                # Forced output cannot be judged: stop constraining short utterances
+                logger.warning("whisper.cpp reported no token probabilities - "
+                               "constrained command decoding disabled")
+                self._grammar_scoring = False
+                text, _ = self.transcribe_buffer(audio_data)
+            elif confidence < self.command_min_confidence:
+                with self._stats_lock:
+                    self.grammar_rejections += 1
+                logger.info(f"Constrained decode '{text}' below confidence "
+                            f"({confidence:.2f}) - not a command")
+                text = ""
+        
+        latency = self._record_latency(start)
+        logger.debug(f"Command transcription latency: {latency * 1000:.0f} ms")
+        return text, latency
+    
+    def _command_grammar_file(self) -> Path:
+        """Write the command grammar once per vocabulary and return its path."""
+        if self._grammar_path is None or not self._grammar_path.exists():
+            grammar = build_command_grammar(self.command_phrases, self.command_terms)
+            fd, name = tempfile.mkstemp(prefix="chef_commands_", suffix=".gbnf")
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(grammar)
+            self._grammar_path = Path(name)
+        return self._grammar_path
+    
+    def _run_server(self, audio_data: np.ndarray, prompt: str = "") -> Optional[str]:
+        """
+        Send PCM (wrapped as in-memory WAV) to the resident whisper-server.
+        
+        Args:
+            audio_data: Audio samples
+            prompt: Optional initial prompt biasing the vocabulary
+        
+        Returns:
+            Transcribed text, or None if the server is unavailable
+        """
+        fields = {"response_format": "json", "temperature": "0.0"}
+        if prompt:
+            fields["prompt"] = prompt
+        body, content_type = encode_multipart(
+            fields,
+            {"file": ("speech.wav", audio_to_wav_bytes(audio_data, self.sample_rate), "audio/wav")}
+        )
+        
+        try:
+            raw = self.server.post("/inference", body, content_type, self.server_timeout)
+            text = json.loads(raw.decode("utf-8")).get("text", "")
+        except ServerUnavailable as e:
+            logger.error(f"Whisper server error: {e}")
+            return None
+        except (UnicodeDecodeError, json.JSONDecodeError, AttributeError):
+            logger.error("Unexpected whisper server response format")
+            return None
+        
+        text = self._parse_whisper_output(text)
+        logger.info(f"Transcribed: '{text}'")
+        return text
+    
     def transcribe_audio(self, audio_path: str) -> str:
         """
         Transcribe audio file to text.
@@ -106,19 +586,25 @@ class WhisperSTT:
         else:
             return self._mock_transcribe(audio_path)
     
-    def _run_whisper(self, audio_path: Path) -> str:
-        """Run whisper.cpp inference."""
+    def _run_whisper(self, audio_path: Path, extra_args: Optional[List[str]] = None) -> str:
+        """
+        Run whisper.cpp inference.
+        
+        Args:
+            audio_path: WAV file to transcribe
+            extra_args: Additional whisper.cpp arguments
+        """
+        cmd = [
+            str(self.whisper_cpp_path),
+            "-m", str(self.model_path),
+            "-f", str(audio_path),
+            "-l", self.language,
+            "-nt",  # No timestamps
+            "-np"  # No progress; the transcript is read from stdout (no .txt file)
+        ] + (extra_args or [])
+        
         try:
-            cmd = [
-                str(self.whisper_cpp_path),
-                "-m", str(self.model_path),
-                "-f", str(audio_path),
-                "-l", self.language,
-                "-nt",  # No timestamps
-                "-np",  # No progress
-                "--output-txt"  # Text output only
-            ]
-            
+            # communicate() drains stdout and stderr, so a chatty build cannot block
             result = subprocess.run(
                 cmd,
                 capture_output=True,
@@ -142,6 +628,23 @@ class WhisperSTT:
             logger.error(f"Whisper error: {e}")
             return ""
     
+    def _run_whisper_scored(self, audio_path: Path, extra_args: List[str]) -> Tuple[str, Optional[float]]:
+        """
+        Run whisper.cpp and also return the mean probability of the text tokens.
+        The per-token probabilities come from the full JSON output, written next
+        to the WAV and removed afterwards.
+        
+        Returns:
+            Tuple of (text, confidence in 0..1 or None if unavailable)
+        """
+        base = audio_path.with_suffix("")
+        json_path = base.with_name(base.name + ".json")
+        try:
+            text = self._run_whisper(audio_path, extra_args + ["-ojf", "-of", str(base)])
+            return text, _mean_token_probability(json_path)
+        finally:
+            json_path.unlink(missing_ok=True)
+    
     def _parse_whisper_output(self, output: str) -> str:
         """Parse whisper output to extract clean text."""
         # Remove timestamps and formatting
@@ -158,7 +661,7 @@ class WhisperSTT:
     
     def detect_voice_activity(self, audio_data: np.ndarray) -> bool:
         """
-        Voice activity detection using RMS energy threshold.
+        Voice activity detection with the configured VAD engine.
         
         Args:
             audio_data: Audio samples as numpy array (float32, -1.0 to 1.0)
@@ -166,21 +669,22 @@ class WhisperSTT:
         Returns:
             True if voice detected, False otherwise
         """
-        if len(audio_data) == 0:
-            return False
-        
-        # Calculate RMS energy
-        rms = np.sqrt(np.mean(audio_data ** 2))
-        
-        # Simple threshold-based VAD
-        return rms > self.vad_threshold
+        return self.vad.is_speech(audio_data)
     
-    def start_listening(self, callback: Optional[Callable[[str], None]] = None):
+    def start_listening(
+        self,
+        callback: Optional[Callable[[str], None]] = None,
+        partial_callback: Optional[Callable[[str], None]] = None
+    ):
         """
         Start continuous listening mode with VAD (non-blocking).
         
         Args:
-            callback: Function to call with transcription results callback(text: str)
+            callback: Function to call with transcription results callback(text: str).
+                In streaming mode it may be called with a partial transcript as
+                soon as a stable prefix matches the command matcher; the final
+                transcript of that utterance is then not delivered.
+            partial_callback: Optional function receiving every partial hypothesis
         """
         if self.is_listening:
             logger.warning("Already listening")
@@ -188,6 +692,7 @@ class WhisperSTT:
         
         self.is_listening = True
         self.result_callback = callback
+        self.partial_callback = partial_callback
         
         # Start audio capture thread
         self.capture_thread = threading.Thread(
@@ -203,6 +708,14 @@ class WhisperSTT:
         )
         self.process_thread.start()
         
+        # Partial decodes run beside the capture loop so reading never stalls
+        if self.streaming:
+            self.partial_thread = threading.Thread(
+                target=self._partial_process_loop,
+                daemon=True
+            )
+            self.partial_thread.start()
+        
         logger.info("Started continuous listening with VAD")
     
     def stop_listening(self):
@@ -223,7 +736,7 @@ class WhisperSTT:
             audio = pyaudio.PyAudio()
             
             # Open audio stream
-            chunk_size = int(self.sample_rate * 0.1)  # 100ms chunks
+            chunk_size = int(self.sample_rate * self.chunk_duration)  # 100ms chunks
             stream = audio.open(
                 format=pyaudio.paFloat32,
                 channels=1,
@@ -234,53 +747,11 @@ class WhisperSTT:
             
             logger.info("Audio stream opened, listening for voice...")
             
-            silence_chunks = int(self.silence_duration / 0.1)  # Number of chunks for silence duration
-            speech_chunks = int(self.min_speech_duration / 0.1)  # Minimum speech chunks
-            
             while self.is_listening:
                 try:
                     # Read audio chunk
                     data = stream.read(chunk_size, exception_on_overflow=False)
-                    audio_chunk = np.frombuffer(data, dtype=np.float32)
-                    
-                    # Detect voice activity
-                    is_voice = self.detect_voice_activity(audio_chunk)
-                    
-                    if is_voice:
-                        if not self.is_speech_active:
-                            # Speech started
-                            self.is_speech_active = True
-                            self.speech_start_time = time.time()
-                            self.speech_buffer = []
-                            logger.debug("Speech started")
-                        
-                        # Add to speech buffer
-                        self.speech_buffer.append(audio_chunk)
-                        self.silence_counter = 0
-                    else:
-                        if self.is_speech_active:
-                            # Potential silence during speech
-                            self.silence_counter += 1
-                            self.speech_buffer.append(audio_chunk)  # Keep capturing
-                            
-                            # Check if silence duration exceeded
-                            if self.silence_counter >= silence_chunks:
-                                # Speech ended
-                                speech_duration = time.time() - self.speech_start_time
-                                
-                                # Check if speech was long enough
-                                if speech_duration >= self.min_speech_duration:
-                                    # Queue for transcription
-                                    speech_audio = np.concatenate(self.speech_buffer)
-                                    self.audio_queue.put(speech_audio)
-                                    logger.debug(f"Speech ended (duration: {speech_duration:.2f}s), queued for transcription")
-                                else:
-                                    logger.debug(f"Speech too short ({speech_duration:.2f}s), ignored")
-                                
-                                # Reset
-                                self.is_speech_active = False
-                                self.speech_buffer = []
-                                self.silence_counter = 0
+                    self._handle_chunk(np.frombuffer(data, dtype=np.float32))
                 
                 except Exception as e:
                     logger.error(f"Error reading audio: {e}")
@@ -310,13 +781,219 @@ class WhisperSTT:
                 time.sleep(5)  # Wait 5 seconds between mock commands
                 if self.is_listening:
                     mock_audio = np.random.randn(self.sample_rate * 2).astype(np.float32) * 0.1
-                    self.audio_queue.put(mock_audio)
+                    self._utterance_id += 1
+                    self.audio_queue.put(SpeechSegment(self._utterance_id, mock_audio))
                     logger.info(f"[MOCK] Generated test command: {test_commands[cmd_index]}")
                     cmd_index = (cmd_index + 1) % len(test_commands)
         
         except Exception as e:
             logger.error(f"Fatal error in audio capture loop: {e}")
     
+    def _handle_chunk(self, audio_chunk: np.ndarray):
+        """
+        Advance the VAD segmentation by one captured chunk.
+        
+        Completed utterances are queued for transcription once silence_duration
+        of silence follows them; in streaming mode the utterance so far is also
+        handed to the partial decoder every partial_interval seconds.
+        
+        Args:
+            audio_chunk: Captured samples (float32, -1.0 to 1.0)
+        """
+        silence_chunks = int(self.silence_duration / self.chunk_duration)
+        chunk_start = self.ring.written
+        self.ring.write(audio_chunk)
+        
+        is_voice = self.detect_voice_activity(audio_chunk)
+        if self.capture_gate is not None:
+            is_voice = self.capture_gate(audio_chunk, is_voice)
+        
+        if is_voice:
+            if not self.is_speech_active:
+                # Speech started: include the pre-roll already in the ring
+                self.is_speech_active = True
+                self.speech_start_time = time.time()
+                self._speech_start = max(
+                    chunk_start - int(self.pre_roll * self.sample_rate),
+                    self.ring.oldest
+                )
+                self._utterance_id += 1
+                self._last_partial_samples = 0
+                logger.debug("Speech started")
+            
+            self.silence_counter = 0
+        elif self.is_speech_active:
+            # Potential silence during speech (keeps capturing)
+            self.silence_counter += 1
+            
+            # Check if silence duration exceeded
+            if self.silence_counter >= silence_chunks:
+                self._end_utterance()
+                return
+        else:
+            return
+        
+        if self.ring.written - self._speech_start >= self.max_speech_duration * self.sample_rate:
+            logger.debug("Maximum utterance length reached")
+            self._end_utterance()
+            return
+        
+        if self.streaming:
+            self._submit_partial()
+    
+    def _end_utterance(self):
+        """Queue the finished utterance (fallback path when streaming) and reset."""
+        uid = self._utterance_id
+        speech_duration = (self.ring.written - self._speech_start) / self.sample_rate
+        
+        if self._is_claimed(uid):
+            self.vad.metrics.passed += 1
+            logger.debug(f"Speech ended (duration: {speech_duration:.2f}s), already dispatched from partial")
+        elif speech_duration >= self.min_speech_duration:
+            # Queue a view of the ring for transcription (no copy)
+            speech_audio = self.ring.view(self._speech_start, self.ring.written)
+            self.audio_queue.put(SpeechSegment(uid, speech_audio, self._speech_start))
+            self.vad.metrics.passed += 1
+            logger.debug(f"Speech ended (duration: {speech_duration:.2f}s), queued for transcription")
+        else:
+            logger.debug(f"Speech too short ({speech_duration:.2f}s), ignored")
+        
+        # Reset
+        self.is_speech_active = False
+        self.silence_counter = 0
+    
+    def discard_utterance(self):
+        """
+        Drop the utterance being captured (e.g. it turned out to be echo).
+        Only this utterance is marked; earlier ones still queued are unaffected.
+        """
+        if self.is_speech_active:
+            uid = self._utterance_id
+            self._claim(uid)  # Also blocks its partial dispatch
+            self.is_speech_active = False
+            self.silence_counter = 0
+            logger.debug(f"Utterance {uid} discarded")
+    
+    def _submit_partial(self):
+        """Hand the utterance so far to the partial decoder when enough new audio arrived."""
+        uid = self._utterance_id
+        samples = self.ring.written - self._speech_start
+        if (self._is_claimed(uid)
+                or samples - self._last_partial_samples < self.partial_interval * self.sample_rate
+                or samples > self.partial_window * self.sample_rate):
+            return
+        
+        self._last_partial_samples = samples
+        job = (uid, self.ring.view(self._speech_start, self.ring.written))
+        # Only the newest window matters: replace a decode that has not started yet
+        try:
+            self._partial_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._partial_queue.put_nowait(job)
+        except queue.Full:
+            pass
+    
+    def _partial_process_loop(self):
+        """
+        Partial decoding loop (runs in separate thread in streaming mode).
+        Decodes growing windows of the current utterance and dispatches early.
+        """
+        logger.info("Partial decoding loop started")
+        
+        while self.is_listening:
+            try:
+                uid, audio_data = self._partial_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            try:
+                self.process_partial(uid, audio_data)
+            except Exception as e:
+                logger.error(f"Error in partial decoding: {e}")
+        
+        logger.info("Partial decoding loop stopped")
+    
+    def process_partial(self, uid: int, audio_data: np.ndarray) -> Optional[str]:
+        """
+        Decode a partial window and dispatch it once its prefix is stable.
+        
+        A prefix is stable when two consecutive hypotheses for the same
+        utterance agree on it word for word. When the stable prefix satisfies
+        the command matcher, the utterance is claimed and the prefix is passed
+        to the result callback.
+        
+        Args:
+            uid: Utterance the window belongs to
+            audio_data: Utterance audio captured so far
+        
+        Returns:
+            The dispatched prefix, or None
+        """
+        if self._is_claimed(uid):
+            return None
+        
+        text, latency = self.recognize(audio_data)
+        with self._stats_lock:
+            self.partial_runs += 1
+        logger.debug(f"Partial hypothesis: '{text}' ({latency * 1000:.0f} ms)")
+        if self.partial_callback and text:
+            try:
+                self.partial_callback(text)
+            except Exception as e:
+                logger.error(f"Error in partial callback: {e}")
+        
+        words = _words(text)
+        previous_uid, previous = self._partial_hypothesis
+        self._partial_hypothesis = (uid, words)
+        if previous_uid != uid:
+            return None
+        
+        stable = []
+        for a, b in zip(previous, words):
+            if a != b:
+                break
+            stable.append(a)
+        prefix = " ".join(stable)
+        
+        if not prefix or self.command_matcher is None or not self.command_matcher(prefix):
+            return None
+        if not self._claim(uid):
+            return None
+        
+        self.partial_dispatches += 1
+        logger.info(f"Stable partial '{prefix}' matched a command - dispatching early")
+        if self.result_callback:
+            try:
+                self.result_callback(prefix)
+            except Exception as e:
+                logger.error(f"Error in transcription callback: {e}")
+        return prefix
+    
+    def _claim(self, uid: int) -> bool:
+        """Mark one utterance as dispatched; False if it already was."""
+        with self._claim_lock:
+            if uid in self._claimed:
+                return False
+            self._claimed.add(uid)
+            # Only recent utterances can still be queued or decoding
+            stale = uid - 64
+            self._claimed = {claimed for claimed in self._claimed if claimed > stale}
+            return True
+    
+    def _is_claimed(self, uid: int) -> bool:
+        with self._claim_lock:
+            return uid in self._claimed
+    
+    def _segment_intact(self, segment: SpeechSegment) -> bool:
+        """False once the ring buffer has overwritten a queued utterance."""
+        if segment.start is None or self.ring.is_valid(segment.start):
+            return True
+        self.dropped_overrun += 1
+        logger.warning(f"Transcription fell behind capture - utterance {segment.uid} overwritten, dropped")
+        return False
+    
     def _audio_process_loop(self):
         """
         Audio processing loop (runs in separate thread).
@@ -328,23 +1005,31 @@ class WhisperSTT:
             try:
                 # Get audio from queue (with timeout to allow loop exit)
                 try:
-                    audio_data = self.audio_queue.get(timeout=0.5)
+                    segment = self.audio_queue.get(timeout=0.5)
                 except queue.Empty:
                     continue
                 
-                # Save to temporary file
-                temp_wav = Path(tempfile.gettempdir()) / "chef_stt_temp.wav"
-                save_audio_wav(audio_data, str(temp_wav), self.sample_rate)
+                uids = [segment.uid, *segment.merged_uids]
+                if all(self._is_claimed(uid) for uid in uids):
+                    # Already dispatched from a partial transcript, or discarded as echo
+                    self.skipped_claimed += 1
+                    logger.debug(f"Utterance {segment.uid} already claimed - skipped")
+                    continue
+                if not self._segment_intact(segment):
+                    continue
                 
                 # Transcribe
                 logger.debug("Transcribing speech segment...")
-                text = self.transcribe_audio(str(temp_wav))
+                text, latency = self.recognize(segment.audio)
                 
+                if not self._segment_intact(segment):
+                    text = ""
                 if text and text.strip():
-                    logger.info(f"Transcription result: '{text}'")
+                    logger.info(f"Transcription result: '{text}' ({latency * 1000:.0f} ms)")
                     
-                    # Call callback if provided
-                    if self.result_callback:
+                    # Call callback if provided (unless a partial won the race)
+                    claimed = [self._claim(uid) for uid in uids]
+                    if self.result_callback and any(claimed):
                         try:
                             self.result_callback(text)
                         except Exception as e:
@@ -352,9 +1037,6 @@ class WhisperSTT:
                 else:
                     logger.debug("Transcription empty or failed")
                 
-                # Mark task as done
-                self.audio_queue.task_done()
-                
             except Exception as e:
                 logger.error(f"Error in audio processing loop: {e}")
                 time.sleep(0.1)
@@ -369,11 +1051,14 @@ class WhisperSTT:
             threshold: New RMS threshold (0.01-0.1 typical range)
         """
         self.vad_threshold = threshold
+        if hasattr(self.vad, 'threshold'):
+            self.vad.threshold = threshold
         logger.info(f"VAD threshold set to: {threshold}")
     
     def calibrate_vad(self, duration: float = 3.0) -> float:
         """
         Calibrate VAD threshold by measuring ambient noise.
+        Not needed for adaptive engines, which track the noise floor continuously.
         
         Args:
             duration: Calibration duration in seconds
@@ -381,6 +1066,10 @@ class WhisperSTT:
         Returns:
             Recommended threshold value
         """
+        if self.vad.adaptive:
+            logger.info("VAD tracks the noise floor continuously - no calibration needed")
+            return self.vad_threshold
+        
         logger.info(f"Calibrating VAD for {duration} seconds...")
         logger.info("Please remain silent...")
         
@@ -403,7 +1092,7 @@ class WhisperSTT:
             for _ in range(num_chunks):
                 data = stream.read(chunk_size, exception_on_overflow=False)
                 audio_chunk = np.frombuffer(data, dtype=np.float32)
-                rms = np.sqrt(np.mean(audio_chunk ** 2))
+                rms = np.sqrt(np.dot(audio_chunk, audio_chunk) / len(audio_chunk))
                 noise_levels.append(rms)
             
             stream.stop_stream()
@@ -428,6 +1117,365 @@ class WhisperSTT:
             return self.vad_threshold
 
 
+class AudioRingBuffer:
+    """
+    Preallocated float32 ring buffer for captured audio.
+    
+    Samples are addressed by absolute position (total samples written). Every
+    sample is stored twice, at i and i + capacity, so any span of up to
+    capacity samples is one contiguous slice and can be handed out as a
+    read-only view without copying. A view stays valid until the writer has
+    advanced capacity samples past its start.
+    """
+    
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: Number of samples retained
+        """
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=np.float32)
+        self.written = 0
+    
+    @property
+    def oldest(self) -> int:
+        """Absolute position of the oldest sample still held."""
+        return max(0, self.written - self.capacity)
+    
+    def write(self, samples: np.ndarray):
+        """Append samples, overwriting the oldest ones."""
+        self.written += len(samples) - min(len(samples), self.capacity)
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        pos = self.written % self.capacity
+        end = pos + n
+        self._data[pos:end] = samples
+        if end <= self.capacity:
+            self._data[pos + self.capacity:end + self.capacity] = samples
+        else:
+            split = self.capacity - pos
+            self._data[pos + self.capacity:] = samples[:split]
+            self._data[:end - self.capacity] = samples[split:]
+        self.written += n
+    
+    def view(self, start: int, end: int) -> np.ndarray:
+        """
+        Read-only view of samples [start, end) by absolute position.
+        
+        Raises:
+            ValueError: If the span is no longer (or not yet) in the buffer
+        """
+        if start < self.oldest or end > self.written or end < start:
+            raise ValueError(f"Samples [{start}, {end}) not in ring buffer")
+        offset = start % self.capacity
+        segment = self._data[offset:offset + end - start]
+        segment.flags.writeable = False
+        return segment
+    
+    def is_valid(self, start: int) -> bool:
+        """True while samples from absolute position start have not been overwritten."""
+        return start >= self.oldest
+
+
+def build_command_prompt(phrases: List[str], terms: Optional[List[str]] = None) -> str:
+    """Initial prompt listing the expected vocabulary (biases Whisper towards it)."""
+    prompt = "Kitchen voice commands: " + ", ".join(phrases) + "."
+    if terms:
+        prompt += " Ingredients: " + ", ".join(terms) + "."
+    return prompt
+
+
+def _gbnf_literal(phrase: str) -> str:
+    """GBNF for a phrase whose first letter may be capitalized."""
+    phrase = phrase.replace("\\", "").replace('"', "")
+    first, rest = phrase[0], phrase[1:]
+    head = f"[{first.lower()}{first.upper()}]" if first.isalpha() else f'"{first}"'
+    return f'{head} "{rest}"' if rest else head
+
+
+def build_command_grammar(phrases: List[str], terms: Optional[List[str]] = None) -> str:
+    """
+    GBNF grammar (whisper.cpp --grammar) accepting one command, optionally
+    followed by one of the terms, e.g. "How much turmeric?".
+    """
+    lines = [
+        'root ::= " "? command (" " term)? [.?!]?',
+        "command ::= " + " | ".join(_gbnf_literal(p) for p in phrases if p),
+    ]
+    if terms:
+        lines.append("term ::= " + " | ".join(_gbnf_literal(t) for t in terms if t))
+    else:
+        lines[0] = 'root ::= " "? command [.?!]?'
+    return "\n".join(lines) + "\n"
+
+
+def voiced_duration(
+    audio_data: np.ndarray,
+    sample_rate: int = 16000,
+    frame_duration: float = 0.02,
+    relative_threshold: float = 0.1
+) -> float:
+    """
+    Seconds from the first to the last voiced frame, ignoring pre-roll and
+    trailing silence. A frame is voiced when its RMS reaches relative_threshold
+    of the loudest frame's; audio without any energy counts at full length.
+    """
+    frame = max(1, int(sample_rate * frame_duration))
+    count = len(audio_data) // frame
+    if count == 0:
+        return len(audio_data) / sample_rate
+    frames = np.asarray(audio_data[:count * frame], dtype=np.float32).reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    peak = float(rms.max())
+    if peak <= 0.0:
+        return len(audio_data) / sample_rate
+    voiced = np.flatnonzero(rms >= relative_threshold * peak)
+    return (voiced[-1] - voiced[0] + 1) * frame / sample_rate
+
+
+def _words(text: str) -> List[str]:
+    """Lower-cased words of a transcript, punctuation stripped."""
+    return re.findall(r"[\w']+", text.lower()) if text else []
+
+
+@lru_cache(maxsize=4)
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """Triangular mel filterbank of shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+    
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+    
+    mel_points = np.linspace(hz_to_mel(60.0), hz_to_mel(sample_rate / 2.0), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+
+@lru_cache(maxsize=4)
+def _dct_basis(n_mels: int, n_mfcc: int) -> np.ndarray:
+    """DCT-II basis (n_mels, n_mfcc) for cepstral coefficients."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc).reshape(-1, 1)
+    return (np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)).T.astype(np.float32)
+
+
+def mfcc(
+    audio_data: np.ndarray,
+    sample_rate: int = 16000,
+    n_mfcc: int = 13,
+    n_mels: int = 26,
+    frame_ms: float = 25.0,
+    hop_ms: float = 20.0
+) -> np.ndarray:
+    """
+    Mean-normalized MFCC features (NumPy only).
+    
+    Args:
+        audio_data: float32 mono samples
+        sample_rate: Sample rate in Hz
+        n_mfcc: Cepstral coefficients per frame (c0 dropped, so n_mfcc - 1 returned)
+        n_mels: Mel bands
+        frame_ms: Analysis window length
+        hop_ms: Hop between frames
+    
+    Returns:
+        Array of shape (frames, n_mfcc - 1)
+    """
+    frame_len = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    audio = np.asarray(audio_data, dtype=np.float32)
+    if len(audio) < frame_len:
+        audio = np.pad(audio, (0, frame_len - len(audio)))
+    
+    emphasized = np.append(audio[:1], audio[1:] - 0.97 * audio[:-1])
+    n_frames = 1 + (len(emphasized) - frame_len) // hop
+    frames = np.lib.stride_tricks.as_strided(
+        emphasized,
+        shape=(n_frames, frame_len),
+        strides=(emphasized.strides[0] * hop, emphasized.strides[0])
+    )
+    
+    n_fft = 1 << (frame_len - 1).bit_length()
+    spectrum = np.fft.rfft(frames * np.hamming(frame_len).astype(np.float32), n_fft)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2) / n_fft
+    mel_energy = np.log(power @ _mel_filterbank(sample_rate, n_fft, n_mels).T + 1e-10)
+    # Limit dynamic range to ~40 dB so near-silent frames don't dominate the distance
+    np.maximum(mel_energy, mel_energy.max() - 9.0, out=mel_energy)
+    
+    # Drop c0 (loudness) and remove the channel/mic colouring per utterance
+    cepstra = (mel_energy @ _dct_basis(n_mels, n_mfcc))[:, 1:]
+    return cepstra - cepstra.mean(axis=0)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray, band: float = 0.25) -> float:
+    """
+    Length-normalized DTW distance between two feature sequences, restricted to a
+    Sakoe-Chiba band. Returns inf if the lengths are too different for the band.
+    """
+    n, m = len(a), len(b)
+    width = max(int(band * max(n, m)), abs(n - m)) + 1
+    if abs(n - m) > 2 * min(n, m):
+        return float("inf")
+    
+    # Pairwise Euclidean frame distances, computed once
+    cost = np.sqrt(np.maximum(
+        (a * a).sum(1)[:, None] + (b * b).sum(1)[None, :] - 2.0 * a @ b.T, 0.0
+    ))
+    
+    infinity = float("inf")
+    previous = [infinity] * (m + 1)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        current = [infinity] * (m + 1)
+        center = i * m / n
+        low = max(1, int(center - width))
+        high = min(m, int(center + width))
+        row = cost[i - 1]
+        for j in range(low, high + 1):
+            best = previous[j - 1]
+            if previous[j] < best:
+                best = previous[j]
+            if current[j - 1] < best:
+                best = current[j - 1]
+            current[j] = row[j - 1] + best
+        previous = current
+    
+    return previous[m] / (n + m)
+
+
+class KeywordSpotter:
+    """
+    Template-matching keyword spotter for the fixed command vocabulary.
+    Each command has one or more recorded examples; an utterance is matched by
+    DTW over MFCCs and accepted only if it is close to one command and clearly
+    closer to it than to any other.
+    """
+    
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        threshold: float = 2.0,
+        margin: float = 0.85,
+        max_duration: float = 2.0
+    ):
+        """
+        Initialize keyword spotter.
+        
+        Args:
+            sample_rate: Audio sample rate
+            threshold: Maximum normalized DTW distance for a match
+            margin: Best distance must be below margin * best distance of any other command
+            max_duration: Longer utterances are treated as open-ended speech
+        """
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.margin = margin
+        self.max_duration = max_duration
+        self.templates: Dict[str, List[np.ndarray]] = {}
+    
+    def __len__(self) -> int:
+        return sum(len(t) for t in self.templates.values())
+    
+    def enroll(self, command: str, audio_data: np.ndarray):
+        """Add a recorded example of a command."""
+        self.templates.setdefault(command, []).append(mfcc(audio_data, self.sample_rate))
+    
+    def load_templates(self, directory: str) -> int:
+        """
+        Load examples from <directory>/<command>/*.wav (e.g. "next step/1.wav").
+        
+        Returns:
+            Number of templates loaded
+        """
+        root = Path(directory)
+        if not root.is_dir():
+            return 0
+        
+        count = 0
+        for command_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+            for wav_path in sorted(command_dir.glob("*.wav")):
+                try:
+                    audio, rate = load_audio_wav(str(wav_path))
+                except (wave.Error, OSError) as e:
+                    logger.warning(f"Skipping keyword template {wav_path}: {e}")
+                    continue
+                if rate != self.sample_rate:
+                    logger.warning(f"Skipping keyword template {wav_path}: {rate} Hz")
+                    continue
+                self.enroll(command_dir.name, audio)
+                count += 1
+        
+        logger.info(f"Loaded {count} keyword templates for {len(self.templates)} commands")
+        return count
+    
+    def spot(self, audio_data: np.ndarray) -> Optional[Tuple[str, float]]:
+        """
+        Match an utterance against the command templates.
+        
+        Returns:
+            (command, distance) if the utterance is a known command, else None
+        """
+        if not self.templates or len(audio_data) > self.max_duration * self.sample_rate:
+            return None
+        
+        features = mfcc(audio_data, self.sample_rate)
+        scores = {
+            command: min(dtw_distance(features, template) for template in templates)
+            for command, templates in self.templates.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: item[1])
+        best_command, best_distance = ranked[0]
+        
+        if best_distance > self.threshold:
+            return None
+        if len(ranked) > 1 and best_distance > self.margin * ranked[1][1]:
+            return None
+        return best_command, best_distance
+
+
+def load_audio_wav(filename: str) -> Tuple[np.ndarray, int]:
+    """
+    Load a mono 16-bit WAV file.
+    
+    Returns:
+        Tuple of (float32 samples -1.0..1.0, sample rate)
+    """
+    with wave.open(filename, 'rb') as wav_file:
+        rate = wav_file.getframerate()
+        channels = wav_file.getnchannels()
+        frames = wav_file.readframes(wav_file.getnframes())
+    
+    audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, rate
+
+
+def _mean_token_probability(json_path: Path) -> Optional[float]:
+    """Mean probability of the text tokens in a whisper.cpp full JSON output."""
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            segments = json.load(f).get("transcription", [])
+    except (OSError, ValueError, AttributeError):
+        return None
+    probabilities = [
+        token["p"]
+        for segment in segments
+        for token in segment.get("tokens", [])
+        if "p" in token and not token.get("text", "").startswith("[_")
+    ]
+    return float(np.mean(probabilities)) if probabilities else None
+
+
 def save_audio_wav(audio_data: np.ndarray, filename: str, sample_rate: int = 16000):
     """
     Save audio data as WAV file.
@@ -437,14 +1485,36 @@ def save_audio_wav(audio_data: np.ndarray, filename: str, sample_rate: int = 160
         filename: Output filename
         sample_rate: Sample rate in Hz
     """
+    with wave.open(filename, 'wb') as wav_file:
+        _write_wav(wav_file, audio_data, sample_rate)
+
+
+def audio_to_wav_bytes(audio_data: np.ndarray, sample_rate: int = 16000) -> bytes:
+    """
+    Encode audio data as an in-memory WAV file.
+    
+    Args:
+        audio_data: Audio samples (float32 or int16)
+        sample_rate: Sample rate in Hz
+    
+    Returns:
+        WAV file contents
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        _write_wav(wav_file, audio_data, sample_rate)
+    return buffer.getvalue()
+
+
+def _write_wav(wav_file: wave.Wave_write, audio_data: np.ndarray, sample_rate: int):
+    """Write mono 16-bit PCM frames to an open WAV writer."""
     # Normalize to int16
     if audio_data.dtype == np.float32 or audio_data.dtype == np.float64:
         # Clip to [-1, 1] and convert to int16
         audio_data = np.clip(audio_data, -1.0, 1.0)
         audio_data = (audio_data * 32767).astype(np.int16)
     
-    with wave.open(filename, 'wb') as wav_file:
-        wav_file.setnchannels(1)  # Mono
-        wav_file.setsampwidth(2)  # 16-bit
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(audio_data.tobytes())
\ No newline at end of file
+    wav_file.setnchannels(1)  # Mono
+    wav_file.setsampwidth(2)  # 16-bit
+    wav_file.setframerate(sample_rate)
+    wav_file.writeframes(audio_data.tobytes())
\ No newline at end of file
@@ -5,11 +5,23 @@ Offline TTS for voice output in the Chef Assistant.
 Warm, calm, practical voice for accessibility.
 """
 
+import hashlib
+import heapq
+import itertools
+import json
 import logging
+import os
+import queue
+import select
 import subprocess
+import threading
+import time
 import wave
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import IntEnum
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
 import numpy as np
 import tempfile
 
@@ -27,7 +39,9 @@ class PiperTTS:
         model_path: str,
         speaker_id: int = 0,
         speed: float = 1.0,
-        output_sample_rate: int = 22050
+        output_sample_rate: int = 22050,
+        streaming: bool = False,
+        phrase_cache: Optional["PhraseCache"] = None
     ):
         """
         Initialize Piper TTS.
@@ -37,6 +51,9 @@ class PiperTTS:
             speaker_id: Speaker ID for multi-speaker models
             speed: Speech speed multiplier (0.5-2.0)
             output_sample_rate: Output audio sample rate
+            streaming: Keep one Piper process resident and stream raw PCM
+                straight to the sound device (no temp WAV files)
+            phrase_cache: Synthesized-audio cache (defaults to an in-memory cache)
         """
         self.model_path = Path(model_path)
         if not self.model_path.exists():
@@ -47,7 +64,29 @@ class PiperTTS:
         self.output_sample_rate = output_sample_rate
         
         self.piper_path = self._find_piper()
-        logger.info(f"Initialized Piper TTS with model: {model_path}")
+        if self.piper_path:
+            self.output_sample_rate = self._read_voice_sample_rate()
+        self.cache = phrase_cache if phrase_cache is not None else PhraseCache()
+        
+        # Playback state for barge-in (see stop() / duck())
+        self._speaking = threading.Event()
+        self._interrupted = threading.Event()
+        self._begun = False  # begin() was called for the next speak()
+        self._playback: Optional[subprocess.Popen] = None
+        self.interruptions = 0
+        
+        # Live speak()/synthesize() calls in progress; presynthesis yields to them
+        self._live = 0
+        self._live_cond = threading.Condition()
+        
+        # Streaming mode: resident Piper process + persistent raw PCM player
+        self.stream: Optional[PiperStream] = None
+        self.player: Optional[RawAudioPlayer] = None
+        if streaming and self.piper_path:
+            self._start_streaming()
+        
+        logger.info(f"Initialized Piper TTS with model: {model_path} "
+                    f"(streaming: {self.stream is not None})")
     
     def _find_piper(self) -> Optional[Path]:
         """Find Piper executable."""
@@ -66,6 +105,42 @@ class PiperTTS:
         logger.warning("Piper not found - using mock mode")
         return None
     
+    def _read_voice_sample_rate(self) -> int:
+        """Read the voice's native sample rate from its .onnx.json config."""
+        config_path = Path(str(self.model_path) + ".json")
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return self.output_sample_rate
+    
+    def _start_streaming(self):
+        """Start the resident Piper process and raw audio player."""
+        stream = PiperStream(
+            self.piper_path,
+            self.model_path,
+            length_scale=1.0 / self.speed,
+            speaker_id=self.speaker_id
+        )
+        player = RawAudioPlayer(self.output_sample_rate)
+        
+        if stream.start() and player.open():
+            self.stream = stream
+            self.player = player
+        else:
+            logger.warning("Streaming TTS unavailable - using per-sentence Piper runs")
+            stream.close()
+            player.close()
+    
+    def close(self):
+        """Stop the resident Piper process and audio player, if any."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if self.player is not None:
+            self.player.close()
+            self.player = None
+    
     def speak(self, text: str, output_path: Optional[str] = None, blocking: bool = True) -> bool:
         """
         Convert text to speech and play/save audio.
@@ -73,23 +148,219 @@ class PiperTTS:
         Args:
             text: Text to speak
             output_path: Optional path to save WAV file
-            blocking: If True, wait for speech to complete
+            blocking: If True, wait for speech to complete (or stop())
         
         Returns:
-            True if successful, False otherwise
+            True if successful, False if it failed or was interrupted
         """
-        if not text or not text.strip():
-            logger.warning("Empty text provided to TTS")
-            return False
-        
+        if not self._begun:
+            self.begin()
+        self._begun = False
+        self._enter_live()
+        try:
+            if not text or not text.strip():
+                logger.warning("Empty text provided to TTS")
+                return False
+            return self._speak(text, output_path, blocking) and not self._interrupted.is_set()
+        finally:
+            self._speaking.clear()
+            self._exit_live()
+    
+    def _enter_live(self):
+        with self._live_cond:
+            self._live += 1
+    
+    def _exit_live(self):
+        with self._live_cond:
+            self._live -= 1
+            self._live_cond.notify_all()
+    
+    def _wait_until_quiet(self, busy: Optional[Callable[[], bool]] = None, poll: float = 0.1):
+        """Block while live speech is being synthesized or played (or busy() says so)."""
+        with self._live_cond:
+            while self._live or self.is_speaking() or (busy is not None and busy()):
+                # Playback finishing does not notify, so poll as well
+                self._live_cond.wait(poll)
+    
+    def begin(self):
+        """
+        Start the next utterance ahead of speak(): from here on stop() cuts it
+        off even if speak() has not run yet (lets a scheduler check for
+        preemption and start playback under one lock).
+        """
+        self._interrupted.clear()
+        if self.player is not None:
+            self.player.resume()
+        self._begun = True
+        self._speaking.set()
+    
+    def stop(self):
+        """
+        Cut off the current utterance immediately (barge-in).
+        Synthesis in progress still completes into the phrase cache, unheard.
+        """
+        if not self.is_speaking():
+            return
+        self._interrupted.set()
+        self.interruptions += 1
+        if self.player is not None:
+            self.player.stop()
+        playback = self._playback
+        if playback is not None and playback.poll() is None:
+            playback.terminate()
+        logger.info("Speech interrupted")
+    
+    def duck(self, gain: float = 0.3):
+        """
+        Lower (gain < 1) or restore (gain = 1) the playback volume.
+        Only the streaming player can duck; file playback can only be stopped.
+        """
+        if self.player is not None:
+            self.player.gain = gain
+    
+    def is_speaking(self) -> bool:
+        """True while an utterance is being synthesized or played."""
+        return self._speaking.is_set() or (self.player is not None and self.player.is_playing())
+    
+    def is_playing(self) -> bool:
+        """True while audio is actually coming out of the speaker (not just being synthesized)."""
+        if self.player is not None and self.player.is_playing():
+            return True
+        playback = self._playback
+        return playback is not None and playback.poll() is None
+    
+    def _speak(self, text: str, output_path: Optional[str], blocking: bool) -> bool:
+        """Synthesize and play one utterance (see speak())."""
         # Clean and prepare text for TTS
         text = self._prepare_text(text)
         logger.info(f"Speaking: '{text[:50]}...'")
         
-        if self.piper_path:
-            return self._run_piper(text, output_path, blocking)
-        else:
+        if not self.piper_path:
             return self._mock_speak(text, output_path)
+        
+        # Repeated phrases are served straight from the cache
+        key = self.cache.make_key(text, str(self.model_path), self.speaker_id, self.speed)
+        pcm = self.cache.get(key)
+        if pcm is not None:
+            logger.debug("TTS cache hit")
+            return self._play_pcm(pcm, output_path, blocking)
+        
+        if self.stream is not None:
+            return self._speak_streaming(text, output_path, blocking, key)
+        else:
+            return self._run_piper(text, output_path, blocking, key)
+    
+    def synthesize(self, text: str) -> Optional[bytes]:
+        """
+        Synthesize text into the phrase cache without playing it.
+        
+        Args:
+            text: Text to synthesize (prepared the same way as speak())
+        
+        Returns:
+            Raw 16-bit PCM, or None if synthesis is unavailable or failed
+        """
+        self._enter_live()
+        try:
+            return self._synthesize(text)
+        finally:
+            self._exit_live()
+    
+    def _synthesize(self, text: str) -> Optional[bytes]:
+        """synthesize() without marking the call as live speech."""
+        if not self.piper_path or not text or not text.strip():
+            return None
+        
+        text = self._prepare_text(text)
+        key = self.cache.make_key(text, str(self.model_path), self.speaker_id, self.speed)
+        pcm = self.cache.get(key, record=False)
+        if pcm is not None:
+            return pcm
+        
+        if self.stream is not None:
+            pcm = self.stream.synthesize(text)
+            if pcm is not None:
+                self.cache.put(key, pcm)
+                return pcm
+        
+        fd, temp_path = tempfile.mkstemp(prefix="chef_tts_", suffix=".wav")
+        os.close(fd)
+        try:
+            self._run_piper(text, temp_path, blocking=False, cache_key=key)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+        return self.cache.get(key, record=False)
+    
+    def presynthesize(
+        self,
+        texts: List[str],
+        bundle_id: Optional[str] = None,
+        busy: Optional[Callable[[], bool]] = None
+    ) -> int:
+        """
+        Render a batch of utterances into the phrase cache ahead of time.
+        Runs at low priority: each utterance waits until no live speech is
+        being synthesized or played, so it never delays what the user hears
+        by more than one utterance.
+        
+        Args:
+            texts: Utterances that will be spoken later
+            bundle_id: Identifier of the batch (e.g. recipe file hash); when the
+                cache is persistent, a completed bundle is skipped on later runs
+            busy: Optional check for speech queued elsewhere (e.g.
+                SpeechScheduler.is_busy); presynthesis also waits while it is True
+        
+        Returns:
+            Number of utterances that had to be synthesized
+        """
+        if not self.piper_path:
+            return 0
+        
+        keys = [
+            self.cache.make_key(self._prepare_text(t), str(self.model_path), self.speaker_id, self.speed)
+            for t in texts if t and t.strip()
+        ]
+        manifest = None
+        if bundle_id and self.cache.cache_dir is not None:
+            manifest = self.cache.cache_dir / "bundles" / f"{bundle_id}.json"
+            if manifest.exists() and all(k in self.cache for k in keys):
+                logger.info(f"Speech bundle {bundle_id} already cached ({len(keys)} utterances)")
+                return 0
+        
+        start = time.time()
+        rendered = 0
+        for text, key in zip([t for t in texts if t and t.strip()], keys):
+            if key in self.cache:
+                continue
+            self._wait_until_quiet(busy)
+            if self._synthesize(text) is not None:
+                rendered += 1
+        
+        if manifest is not None:
+            manifest.parent.mkdir(parents=True, exist_ok=True)
+            manifest.write_text(json.dumps({'keys': keys}))
+        
+        logger.info(f"Pre-synthesized {rendered}/{len(keys)} utterances in {time.time() - start:.1f}s")
+        return rendered
+    
+    def presynthesize_async(
+        self,
+        texts: List[str],
+        bundle_id: Optional[str] = None,
+        busy: Optional[Callable[[], bool]] = None
+    ) -> threading.Thread:
+        """Run presynthesize() on a background thread and return the thread."""
+        thread = threading.Thread(
+            target=self.presynthesize,
+            args=(texts, bundle_id, busy),
+            daemon=True
+        )
+        thread.start()
+        return thread
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return phrase cache statistics (hits, misses, hit_rate, sizes)."""
+        return self.cache.stats()
     
     def _prepare_text(self, text: str) -> str:
         """
@@ -116,7 +387,13 @@ class PiperTTS:
         
         return text.strip()
     
-    def _run_piper(self, text: str, output_path: Optional[str], blocking: bool) -> bool:
+    def _run_piper(
+        self,
+        text: str,
+        output_path: Optional[str],
+        blocking: bool,
+        cache_key: Optional[str] = None
+    ) -> bool:
         """Run Piper TTS inference."""
         try:
             # Determine output path
@@ -144,8 +421,11 @@ class PiperTTS:
             )
             
             if result.returncode == 0:
-                # Play audio if blocking mode
-                if blocking:
+                if cache_key is not None:
+                    self._cache_wav(cache_key, output_path)
+                
+                # Play audio if blocking mode (unless interrupted while synthesizing)
+                if blocking and not self._interrupted.is_set():
                     self._play_audio(output_path)
                 logger.info("TTS successful")
                 return True
@@ -160,6 +440,70 @@ class PiperTTS:
             logger.error(f"Piper error: {e}")
             return False
     
+    def _speak_streaming(
+        self,
+        text: str,
+        output_path: Optional[str],
+        blocking: bool,
+        cache_key: Optional[str] = None
+    ) -> bool:
+        """Synthesize on the resident Piper process, playing audio as it arrives."""
+        played = []
+        
+        def on_chunk(data: bytes):
+            played.append(len(data))
+            self.player.write(data)
+        
+        pcm = self.stream.synthesize(text, on_chunk=on_chunk)
+        if pcm is None:
+            if played:
+                # Part of the sentence was heard; replaying all of it would repeat it
+                logger.warning("Streaming TTS stopped mid-utterance - not cached")
+                return False
+            logger.warning("Streaming TTS failed - falling back to per-sentence Piper run")
+            return self._run_piper(text, output_path, blocking, cache_key)
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, pcm)
+        if output_path:
+            self._write_wav(output_path, pcm)
+        if blocking:
+            self.player.drain()
+        return True
+    
+    def _play_pcm(self, pcm: bytes, output_path: Optional[str], blocking: bool) -> bool:
+        """Play (and optionally save) already-synthesized PCM."""
+        if output_path:
+            self._write_wav(output_path, pcm)
+        
+        if self.player is not None:
+            self.player.write(pcm)
+            if blocking:
+                self.player.drain()
+        elif blocking and not self._interrupted.is_set():
+            play_path = output_path or str(Path(tempfile.gettempdir()) / "chef_tts_output.wav")
+            if not output_path:
+                self._write_wav(play_path, pcm)
+            self._play_audio(play_path)
+        return True
+    
+    def _cache_wav(self, cache_key: str, wav_path: str):
+        """Store the PCM frames of a freshly synthesized WAV in the phrase cache."""
+        try:
+            with wave.open(wav_path, 'rb') as wav_file:
+                self.output_sample_rate = wav_file.getframerate()
+                self.cache.put(cache_key, wav_file.readframes(wav_file.getnframes()))
+        except (OSError, wave.Error) as e:
+            logger.debug(f"Could not cache synthesized audio: {e}")
+    
+    def _write_wav(self, output_path: str, pcm: bytes):
+        """Write raw 16-bit mono PCM as a WAV file."""
+        with wave.open(output_path, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.output_sample_rate)
+            wav_file.writeframes(pcm)
+    
     def _play_audio(self, audio_path: str):
         """Play audio file using system audio player."""
         audio_path = Path(audio_path)
@@ -178,8 +522,15 @@ class PiperTTS:
                         cmd = player % audio_path
                         subprocess.run(cmd, shell=True, timeout=30)
                     else:
-                        # Linux audio players
-                        subprocess.run([player, str(audio_path)], timeout=30, stderr=subprocess.DEVNULL)
+                        # Linux audio players (terminated by stop() on barge-in)
+                        self._playback = subprocess.Popen([player, str(audio_path)], stderr=subprocess.DEVNULL)
+                        try:
+                            self._playback.wait(timeout=30)
+                        except subprocess.TimeoutExpired:
+                            self._playback.kill()
+                            continue
+                        finally:
+                            self._playback = None
                     logger.info(f"Played audio with {player}")
                     return
                 except (FileNotFoundError, subprocess.TimeoutExpired):
@@ -244,9 +595,13 @@ class PiperTTS:
         Returns:
             True if successful
         """
+        return self.speak(self.format_step(step_text, step_number, total_steps), blocking=True)
+    
+    @staticmethod
+    def format_step(step_text: str, step_number: int, total_steps: int) -> str:
+        """Build the spoken text for a recipe step, including its intro."""
         intro = f"Step {step_number} of {total_steps}. "
-        full_text = intro + step_text
-        return self.speak(full_text, blocking=True)
+        return intro + step_text
     
     def confirm_action(self, action: str) -> bool:
         """
@@ -262,6 +617,766 @@ class PiperTTS:
         return self.speak(text, blocking=True)
 
 
+class PhraseCache:
+    """
+    Content-addressed cache of synthesized PCM.
+    Keyed on (prepared text, voice model, speaker_id, speed); an in-memory LRU
+    is backed by an optional size-bounded disk store that survives restarts.
+    """
+    
+    def __init__(
+        self,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024
+    ):
+        """
+        Initialize phrase cache.
+        
+        Args:
+            max_memory_bytes: Upper bound for PCM held in memory
+            cache_dir: Directory for the persistent store (None = memory only)
+            max_disk_bytes: Upper bound for the persistent store
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(f.stat().st_size for f in self.cache_dir.glob("*.pcm"))
+    
+    @staticmethod
+    def make_key(text: str, voice: str, speaker_id: int, speed: float) -> str:
+        """Build the content address for a phrase."""
+        material = f"{voice}\x00{speaker_id}\x00{speed:.3f}\x00{text}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str, record: bool = True) -> Optional[bytes]:
+        """
+        Return cached PCM for `key`, or None on a miss.
+        
+        Args:
+            key: Content address from make_key()
+            record: Count the lookup in hits/misses; pass False for prefetch
+                and presynthesis so the stats reflect playback only
+        """
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is None:
+                pcm = self._read_disk(key)
+                if pcm is not None:
+                    self._store_memory(key, pcm)
+            else:
+                self._memory.move_to_end(key)
+            
+            if record:
+                if pcm is not None:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return pcm
+    
+    def put(self, key: str, pcm: bytes):
+        """Store PCM for `key` in memory and on disk."""
+        if not pcm:
+            return
+        with self._lock:
+            self._store_memory(key, pcm)
+            self._write_disk(key, pcm)
+    
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._memory:
+                return True
+            return self.cache_dir is not None and (self.cache_dir / f"{key}.pcm").exists()
+    
+    def _store_memory(self, key: str, pcm: bytes):
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = pcm
+        self._memory_bytes += len(pcm)
+        
+        # Evict least recently used entries
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+    
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if self.cache_dir is None:
+            return None
+        path = self.cache_dir / f"{key}.pcm"
+        try:
+            pcm = path.read_bytes()
+            os.utime(path)  # mtime tracks recency for disk LRU
+            return pcm
+        except OSError:
+            return None
+    
+    def _write_disk(self, key: str, pcm: bytes):
+        if self.cache_dir is None:
+            return
+        path = self.cache_dir / f"{key}.pcm"
+        if path.exists():
+            return
+        try:
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(pcm)
+            tmp_path.replace(path)
+            self._disk_bytes += len(pcm)
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry: {e}")
+            return
+        
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict_disk()
+    
+    def _evict_disk(self):
+        """Delete least recently used files until the store fits its budget."""
+        files = sorted(self.cache_dir.glob("*.pcm"), key=lambda f: f.stat().st_mtime)
+        for f in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                size = f.stat().st_size
+                f.unlink()
+                self._disk_bytes -= size
+            except OSError:
+                continue
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes
+            }
+
+
+class PiperStream:
+    """
+    Resident Piper process fed one utterance per line on stdin.
+    Raw 16-bit PCM is read from stdout and handed to a callback as it arrives,
+    so playback can start before the whole sentence is synthesized.
+    
+    The stdout reader never waits on playback: chunks are passed to a separate
+    delivery thread, so a sink writing at playback speed cannot make the stream
+    look idle. An utterance ends when Piper has logged it as finished and the
+    reader has drained everything Piper wrote to stdout before that line.
+    """
+    
+    _END = object()  # Delivery queue marker: everything before it was handed to the sink
+    
+    def __init__(
+        self,
+        piper_path: Path,
+        model_path: Path,
+        length_scale: float = 1.0,
+        speaker_id: int = 0,
+        poll_interval: float = 0.02
+    ):
+        """
+        Initialize the resident Piper stream.
+        
+        Args:
+            piper_path: Piper executable
+            model_path: Piper ONNX voice
+            length_scale: Piper length scale (1 / speed)
+            speaker_id: Speaker ID for multi-speaker models
+            poll_interval: How often the reader re-checks for the completion
+                line while stdout has nothing to read
+        """
+        self.piper_path = piper_path
+        self.model_path = model_path
+        self.length_scale = length_scale
+        self.speaker_id = speaker_id
+        self.poll_interval = poll_interval
+        
+        self.process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._sink: Optional[Callable[[bytes], None]] = None
+        self._buffer = bytearray()
+        self._utterance_done = threading.Event()  # Completion line logged
+        self._drained = threading.Event()  # Utterance fully read from stdout
+        self._delivered = threading.Event()  # Utterance fully handed to its sink
+        self._chunks: "queue.Queue" = queue.Queue()
+    
+    def start(self) -> bool:
+        """Launch Piper in raw-output mode and start the reader threads."""
+        if os.name == "nt":
+            # The reader polls stdout with select(), which only supports sockets on Windows
+            logger.warning("Resident Piper streaming needs POSIX pipes - not available on Windows")
+            return False
+        
+        cmd = [
+            str(self.piper_path),
+            "--model", str(self.model_path),
+            "--output_raw",
+            "--length_scale", str(self.length_scale)
+        ]
+        if self.speaker_id > 0:
+            cmd.extend(["--speaker", str(self.speaker_id)])
+        
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0
+            )
+        except (FileNotFoundError, OSError) as e:
+            logger.error(f"Could not start resident Piper: {e}")
+            return False
+        
+        threading.Thread(target=self._read_audio, args=(self.process,), daemon=True).start()
+        threading.Thread(target=self._read_log, args=(self.process,), daemon=True).start()
+        threading.Thread(target=self._deliver, daemon=True).start()
+        logger.info("Resident Piper process started")
+        return True
+    
+    def is_alive(self) -> bool:
+        """Return True if the Piper process is running."""
+        return self.process is not None and self.process.poll() is None
+    
+    def _read_audio(self, process: subprocess.Popen):
+        """Read raw PCM from Piper's stdout and detect the end of each utterance."""
+        fd = process.stdout.fileno()
+        while True:
+            # Check the completion flag before polling: Piper writes an utterance's
+            # audio before logging it, so once the line was seen an empty pipe
+            # means the whole utterance has been read
+            done = self._utterance_done.is_set()
+            try:
+                readable, _, _ = select.select([fd], [], [], 0 if done else self.poll_interval)
+            except (OSError, ValueError):
+                break
+            
+            if not readable:
+                if done:
+                    self._utterance_done.clear()
+                    self._drained.set()
+                    self._chunks.put((None, self._END))
+                continue
+            
+            try:
+                data = os.read(fd, 4096)
+            except OSError:
+                break
+            if not data:
+                break
+            self._buffer.extend(data)
+            self._chunks.put((self._sink, data))
+    
+    def _read_log(self, process: subprocess.Popen):
+        """Watch Piper's log for the per-utterance completion line."""
+        for line in iter(process.stderr.readline, b""):
+            if b"Real-time factor" in line:
+                self._utterance_done.set()
+    
+    def _deliver(self):
+        """Hand chunks to their sinks (may block at playback speed) off the reader thread."""
+        while True:
+            sink, data = self._chunks.get()
+            if data is self._END:
+                self._delivered.set()
+                continue
+            if sink is not None:
+                try:
+                    sink(data)
+                except Exception as e:
+                    logger.error(f"Audio sink error: {e}")
+    
+    def synthesize(
+        self,
+        text: str,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+        timeout: float = 10.0
+    ) -> Optional[bytes]:
+        """
+        Synthesize one utterance.
+        
+        Args:
+            text: Prepared text (newlines are flattened to keep one utterance per line)
+            on_chunk: Called with each raw PCM chunk as soon as it is produced
+            timeout: Maximum seconds to wait for synthesis
+        
+        Returns:
+            Complete raw PCM for the utterance, or None on failure. Audio is only
+            returned once Piper logged the utterance as finished, all of it was
+            read and every chunk was handed to on_chunk; a timeout or process
+            exit mid-utterance returns None (chunks already passed to on_chunk
+            are not taken back).
+        """
+        with self._lock:
+            if not self.is_alive():
+                logger.error("Resident Piper process is not running")
+                return None
+            
+            self._buffer = bytearray()
+            self._sink = on_chunk
+            self._utterance_done.clear()
+            self._drained.clear()
+            self._delivered.clear()
+            
+            try:
+                line = " ".join(text.split()) + "\n"
+                self.process.stdin.write(line.encode("utf-8"))
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                logger.error(f"Resident Piper write failed: {e}")
+                self._sink = None
+                return None
+            
+            # Pauses between sentences are normal: only the completion line ends
+            # the utterance, otherwise truncated audio would be cached
+            deadline = time.time() + timeout
+            while not self._drained.wait(0.05):
+                if time.time() >= deadline or not self.is_alive():
+                    logger.error(f"Resident Piper did not finish the utterance "
+                                 f"({len(self._buffer)} bytes received)")
+                    self._sink = None
+                    return None
+            
+            self._sink = None
+            pcm = bytes(self._buffer)
+            # Playback of the tail may still be running; callers drain the
+            # player afterwards, so every chunk must have reached it by then
+            self._delivered.wait()
+            return pcm
+    
+    def close(self):
+        """Terminate the Piper process."""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class RawAudioPlayer:
+    """
+    Persistent sink for raw 16-bit mono PCM.
+    Uses a PyAudio output stream when available, otherwise a resident `aplay` process.
+    Audio is written in short slices so playback can be ducked (gain) or
+    cancelled (stop) within one slice.
+    """
+    
+    def __init__(self, sample_rate: int = 22050, slice_duration: float = 0.05):
+        """
+        Initialize the player.
+        
+        Args:
+            sample_rate: Sample rate of the PCM that will be written
+            slice_duration: Seconds of audio written to the device at a time
+        """
+        self.sample_rate = sample_rate
+        self.slice_bytes = 2 * max(1, int(sample_rate * slice_duration))
+        self.gain = 1.0
+        self._pyaudio = None
+        self._stream = None
+        self._process: Optional[subprocess.Popen] = None
+        self._play_until = 0.0
+        self._carry = b""  # Odd trailing byte of the previous chunk
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+    
+    def open(self) -> bool:
+        """Open the audio device. Returns False if no raw sink is available."""
+        try:
+            import pyaudio
+            self._pyaudio = pyaudio.PyAudio()
+            self._stream = self._pyaudio.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.sample_rate,
+                output=True
+            )
+            logger.info("Raw audio player: PyAudio")
+            return True
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"PyAudio output unavailable: {e}")
+            self._pyaudio = None
+        
+        return self._open_aplay()
+    
+    def _open_aplay(self) -> bool:
+        """Start a resident aplay process reading raw PCM from stdin."""
+        try:
+            self._process = subprocess.Popen(
+                ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", "1",
+                 "-r", str(self.sample_rate), "-"],
+                stdin=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            logger.info("Raw audio player: aplay")
+            return True
+        except (FileNotFoundError, OSError):
+            logger.warning("No raw audio sink available (install pyaudio or aplay)")
+            return False
+    
+    def write(self, chunk: bytes):
+        """Queue a PCM chunk for playback (discarded after stop() until resume())."""
+        data = self._carry + chunk
+        self._carry = data[len(data) & ~1:]
+        for offset in range(0, len(data) & ~1, self.slice_bytes):
+            if self._cancelled.is_set():
+                return
+            piece = data[offset:min(offset + self.slice_bytes, len(data) & ~1)]
+            if self.gain != 1.0:
+                piece = (np.frombuffer(piece, dtype=np.int16) * self.gain).astype(np.int16).tobytes()
+            self._write_slice(piece)
+    
+    def _write_slice(self, piece: bytes):
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            now = time.time()
+            self._play_until = max(self._play_until, now) + len(piece) / (2.0 * self.sample_rate)
+            try:
+                if self._stream is not None:
+                    self._stream.write(piece)
+                elif self._process is not None:
+                    self._process.stdin.write(piece)
+                    self._process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                logger.error(f"Audio playback error: {e}")
+    
+    def drain(self):
+        """Block until everything written so far has been played (or stop() is called)."""
+        remaining = self._play_until - time.time()
+        if remaining > 0:
+            self._cancelled.wait(remaining)
+    
+    def is_playing(self) -> bool:
+        """True while written audio is still being played."""
+        return time.time() < self._play_until
+    
+    def stop(self):
+        """Discard queued audio and stop playback now."""
+        self._cancelled.set()
+        with self._lock:
+            self._play_until = 0.0
+            self._carry = b""
+            if self._stream is not None:
+                try:
+                    self._stream.abort_stream()
+                    self._stream.start_stream()
+                except Exception as e:
+                    logger.warning(f"Could not flush audio stream: {e}")
+            elif self._process is not None:
+                # aplay has no flush: restart it so buffered audio is dropped
+                self._process.terminate()
+                self._process = None
+                self._open_aplay()
+    
+    def resume(self):
+        """Accept audio again after stop(), at full volume."""
+        self._cancelled.clear()
+        self.gain = 1.0
+    
+    def close(self):
+        """Release the audio device."""
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._process.terminate()
+            self._process = None
+
+
+class SpeechPriority(IntEnum):
+    """Speech urgency (lower value is more urgent)."""
+    SAFETY = 0
+    STEP = 1
+    CHATTER = 2
+
+
+@dataclass
+class SpeechItem:
+    """One utterance queued on the SpeechScheduler."""
+    text: str
+    priority: SpeechPriority
+    seq: int
+    state: str = "pending"  # pending -> synthesizing -> ready, or playing
+    spoken: Optional[bool] = None  # Result once done
+    preempted: bool = False
+    interrupted: bool = False  # Cut off once and queued to be said again
+    done: threading.Event = field(default_factory=threading.Event)
+    ready: threading.Event = field(default_factory=threading.Event)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the item was spoken, dropped or cancelled."""
+        return self.done.wait(timeout)
+
+
+class SpeechScheduler:
+    """
+    Non-blocking, prioritized speech output on top of PiperTTS.
+    
+    say() queues an utterance and returns immediately. A playback thread
+    speaks the most urgent item first (safety > step > chatter, then in
+    order of arrival) while a lookahead thread synthesizes the next item
+    into the phrase cache, so it plays without a synthesis gap.
+    
+    A more urgent item preempts the one playing: an interrupted step is
+    spoken again afterwards unless a newer step has been queued by then,
+    interrupted chatter is dropped. When the user
+    barges in (playback stopped from outside), the rest of the interrupted
+    response is dropped; safety warnings are always kept.
+    """
+    
+    def __init__(self, tts: PiperTTS, preempt: bool = True):
+        """
+        Initialize the scheduler (threads start on the first say()).
+        
+        Args:
+            tts: TTS engine used for synthesis and playback
+            preempt: Let more urgent items interrupt the one playing
+        """
+        self.tts = tts
+        self.preempt = preempt
+        
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._current: Optional[SpeechItem] = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        
+        self.spoken = 0
+        self.preemptions = 0
+        self.dropped = 0
+    
+    def start(self):
+        """Start the playback and lookahead threads."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [
+            threading.Thread(target=self._playback_loop, daemon=True),
+            threading.Thread(target=self._lookahead_loop, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def say(self, text: str, priority: SpeechPriority = SpeechPriority.CHATTER) -> Optional[SpeechItem]:
+        """
+        Queue an utterance and return immediately.
+        
+        Args:
+            text: Text to speak
+            priority: SpeechPriority of the utterance
+        
+        Returns:
+            The queued SpeechItem (wait() on it to block), or None for empty text
+        """
+        if not text or not text.strip():
+            return None
+        self.start()
+        
+        item = SpeechItem(text, SpeechPriority(priority), next(self._seq))
+        with self._cond:
+            if item.priority == SpeechPriority.STEP:
+                self._drop_interrupted_steps()
+            heapq.heappush(self._queue, (item.priority, item.seq, item))
+            current = self._current
+            if (self.preempt and current is not None
+                    and item.priority < current.priority and not current.preempted):
+                # Under the lock: the playback thread either sees the flag before
+                # starting the item, or has started it and stop() cuts it off
+                current.preempted = True
+                self.preemptions += 1
+                logger.info(f"Preempting {current.priority.name.lower()} speech "
+                            f"for {item.priority.name.lower()}")
+                self.tts.stop()
+            self._cond.notify_all()
+        return item
+    
+    def clear(self, keep_safety: bool = True) -> int:
+        """
+        Drop queued utterances (the one playing is not affected).
+        
+        Args:
+            keep_safety: Keep queued safety warnings
+        
+        Returns:
+            Number of utterances dropped
+        """
+        with self._cond:
+            return self._drop_queued(keep_safety)
+    
+    def _drop_queued(self, keep_safety: bool) -> int:
+        kept, dropped = [], []
+        for entry in self._queue:
+            if keep_safety and entry[2].priority == SpeechPriority.SAFETY:
+                kept.append(entry)
+            else:
+                dropped.append(entry[2])
+        heapq.heapify(kept)
+        self._queue = kept
+        for item in dropped:
+            item.spoken = False
+            item.done.set()
+        self.dropped += len(dropped)
+        return len(dropped)
+    
+    def _drop_interrupted_steps(self):
+        """Drop interrupted steps waiting to be repeated; a newer step replaces them."""
+        stale = [entry for entry in self._queue if entry[2].interrupted]
+        if not stale:
+            return
+        self._queue = [entry for entry in self._queue if not entry[2].interrupted]
+        heapq.heapify(self._queue)
+        for _, _, item in stale:
+            item.spoken = False
+            item.done.set()
+            logger.debug(f"Dropped interrupted step '{item.text[:40]}'")
+        self.dropped += len(stale)
+    
+    def is_busy(self) -> bool:
+        """True while something is playing or queued."""
+        with self._cond:
+            return self._current is not None or bool(self._queue)
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued has been spoken (or dropped)."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._current is not None or self._queue:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+    
+    def _playback_loop(self):
+        """Speak queued items, most urgent first."""
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                _, _, item = heapq.heappop(self._queue)
+                synthesizing = item.state == "synthesizing"
+                item.state = "playing"
+                item.preempted = False
+                self._current = item
+                self._cond.notify_all()  # Wake the lookahead thread
+            
+            # Let an in-flight lookahead synthesis finish so playback is a cache hit
+            if synthesizing:
+                item.ready.wait(timeout=10.0)
+            
+            interruptions = self.tts.interruptions
+            with self._cond:
+                start = not item.preempted
+                if start:
+                    self.tts.begin()
+            spoken = start and self.tts.speak(item.text)
+            
+            with self._cond:
+                self._current = None
+                superseded = any(entry[2].priority == SpeechPriority.STEP and entry[2].seq > item.seq
+                                 for entry in self._queue)
+                if (not spoken and item.preempted and item.priority < SpeechPriority.CHATTER
+                        and not superseded):
+                    # Say it again once the more urgent item is done
+                    item.state = "ready"
+                    item.interrupted = True
+                    heapq.heappush(self._queue, (item.priority, item.seq, item))
+                else:
+                    if spoken:
+                        self.spoken += 1
+                    elif self.tts.interruptions > interruptions and not item.preempted:
+                        # User barged in: the rest of this response is no longer wanted
+                        self._drop_queued(keep_safety=True)
+                    elif item.preempted:
+                        self.dropped += 1
+                    item.spoken = spoken
+                    item.done.set()
+                self._cond.notify_all()
+    
+    def _lookahead_loop(self):
+        """Synthesize the next item while the current one plays."""
+        while True:
+            with self._cond:
+                item = None
+                while self._running:
+                    if self._current is not None:
+                        pending = [entry[2] for entry in sorted(self._queue) if entry[2].state == "pending"]
+                        if pending:
+                            item = pending[0]
+                            break
+                    self._cond.wait()
+                if not self._running:
+                    return
+                item.state = "synthesizing"
+            
+            try:
+                self.tts.synthesize(item.text)
+            except Exception as e:
+                logger.error(f"Lookahead synthesis failed: {e}")
+            finally:
+                with self._cond:
+                    if item.state == "synthesizing":
+                        item.state = "ready"
+                item.ready.set()
+    
+    def stats(self) -> Dict[str, int]:
+        """Spoken, preempted and dropped counters plus current queue depth."""
+        with self._cond:
+            return {
+                'spoken': self.spoken,
+                'preemptions': self.preemptions,
+                'dropped': self.dropped,
+                'queued': len(self._queue)
+            }
+    
+    def close(self, timeout: float = 5.0):
+        """Let queued speech finish (up to timeout), then stop the threads."""
+        if self._running:
+            self.wait_idle(timeout)
+        with self._cond:
+            self._running = False
+            self._drop_queued(keep_safety=False)
+            self._cond.notify_all()
+        if self._current is not None:
+            self.tts.stop()
+
+
 def format_quantity_speech(amount: float, unit: str) -> str:
     """
     Format quantity for natural speech.
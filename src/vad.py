@@ -0,0 +1,280 @@
+# vad.py
+"""
+Voice Activity Detection Engines
+Pluggable detectors deciding whether a captured chunk contains speech.
+- EnergyVAD: fixed RMS threshold (the original behaviour)
+- SpectralVAD: frame-level band energy ratio, spectral flatness and
+  zero-crossing rate against a continuously tracked noise floor, with
+  onset/hangover smoothing, so fans, whistles and sizzling oil do not
+  trigger Whisper jobs.
+Both keep trigger metrics for tuning.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VADMetrics:
+    """Trigger counters; time is measured in processed audio, not wall clock."""
+    samples: int = 0
+    sample_rate: int = 16000
+    speech_frames: int = 0
+    frames: int = 0
+    triggers: int = 0  # Speech onsets
+    passed: int = 0  # Onsets that produced an utterance for transcription
+
+    @property
+    def minutes(self) -> float:
+        return self.samples / self.sample_rate / 60.0
+
+    @property
+    def triggers_per_minute(self) -> float:
+        return self.triggers / self.minutes if self.samples else 0.0
+
+    @property
+    def pass_rate(self) -> float:
+        """Fraction of triggers passed on to Whisper."""
+        return self.passed / self.triggers if self.triggers else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'minutes': round(self.minutes, 2),
+            'triggers': self.triggers,
+            'triggers_per_minute': round(self.triggers_per_minute, 2),
+            'passed': self.passed,
+            'pass_rate': round(self.pass_rate, 3),
+            'speech_ratio': round(self.speech_frames / self.frames, 3) if self.frames else 0.0
+        }
+
+
+class VADEngine:
+    """
+    Base class for VAD engines.
+    Subclasses implement _detect(); is_speech() adds metrics bookkeeping.
+    """
+
+    # True when the engine tracks background noise itself (no calibration needed)
+    adaptive = False
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.metrics = VADMetrics(sample_rate=sample_rate)
+        self._active = False
+
+    def is_speech(self, audio: np.ndarray) -> bool:
+        """
+        Decide whether a chunk contains speech.
+
+        Args:
+            audio: Audio samples (float32, -1.0 to 1.0)
+
+        Returns:
+            True if voice detected, False otherwise
+        """
+        if len(audio) == 0:
+            return False
+        self.metrics.samples += len(audio)
+        active = self._detect(audio)
+        if active and not self._active:
+            self.metrics.triggers += 1
+        self._active = active
+        return active
+
+    def _detect(self, audio: np.ndarray) -> bool:
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget detection state (metrics are kept)."""
+        self._active = False
+
+
+class EnergyVAD(VADEngine):
+    """Voice activity detection using a fixed RMS energy threshold."""
+
+    def __init__(self, threshold: float = 0.02, sample_rate: int = 16000):
+        """
+        Args:
+            threshold: RMS energy threshold (0.01-0.1 typical range)
+            sample_rate: Audio sample rate
+        """
+        super().__init__(sample_rate)
+        self.threshold = threshold
+
+    def _detect(self, audio: np.ndarray) -> bool:
+        # Dot product: no squared temporary per chunk
+        rms = np.sqrt(np.dot(audio, audio) / len(audio))
+        active = rms > self.threshold
+        self.metrics.frames += 1
+        self.metrics.speech_frames += int(active)
+        return active
+
+
+class SpectralVAD(VADEngine):
+    """
+    Frame-level spectral voice activity detector.
+
+    Each 20 ms frame counts as speech when its energy is snr_db above the
+    tracked noise floor and its spectrum looks like a voice:
+    - most energy in the 300-3400 Hz voice band (band energy ratio)
+    - neither a pure tone nor flat noise (spectral flatness in range)
+    - a low zero-crossing rate (sizzle and hiss cross zero constantly)
+    Speech starts after onset_frames consecutive speech frames and ends after
+    hangover_frames without one.
+
+    The noise floor follows the quietest recent frames: it drops immediately
+    and rises by at most floor_rise_db per second, so stationary noise such as
+    an exhaust fan is absorbed within seconds while speech (which has pauses)
+    is not.
+    """
+
+    adaptive = True
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        snr_db: float = 9.0,
+        min_energy_db: float = -55.0,
+        voice_band: tuple = (300.0, 3400.0),
+        min_band_ratio: float = 0.5,
+        flatness_range: tuple = (0.02, 0.45),
+        max_zcr: float = 0.3,
+        onset_frames: int = 3,
+        hangover_frames: int = 10,
+        floor_rise_db: float = 6.0
+    ):
+        """
+        Initialize spectral VAD.
+
+        Args:
+            sample_rate: Audio sample rate
+            frame_ms: Analysis frame length in milliseconds
+            snr_db: Required frame energy above the noise floor
+            min_energy_db: Frames quieter than this (dBFS) are never speech
+            voice_band: Voice band in Hz for the band energy ratio
+            min_band_ratio: Minimum fraction of frame energy in the voice band
+            flatness_range: Allowed spectral flatness within the voice band
+                (tones are near 0, white noise near 1)
+            max_zcr: Maximum zero crossings per sample
+            onset_frames: Consecutive speech frames needed to start speech
+            hangover_frames: Non-speech frames tolerated before speech ends
+            floor_rise_db: Maximum noise floor rise in dB per second
+        """
+        super().__init__(sample_rate)
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.snr_db = snr_db
+        self.min_energy_db = min_energy_db
+        self.min_band_ratio = min_band_ratio
+        self.flatness_range = flatness_range
+        self.max_zcr = max_zcr
+        self.onset_frames = onset_frames
+        self.hangover_frames = hangover_frames
+        self.floor_rise = floor_rise_db * frame_ms / 1000
+
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.frame_size, 1.0 / sample_rate)
+        self._band = (freqs >= voice_band[0]) & (freqs <= voice_band[1])
+
+        self.noise_floor_db = None
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._run = 0
+        self._hang = 0
+
+    def reset(self):
+        super().reset()
+        self.noise_floor_db = None
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._run = 0
+        self._hang = 0
+
+    def frame_features(self, frames: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Per-frame features for a (n_frames, frame_size) block.
+
+        Returns:
+            Dictionary of energy_db, band_ratio, flatness and zcr arrays
+        """
+        energy = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2
+        band = power[:, self._band] + 1e-12
+        band_ratio = band.sum(axis=1) / (power.sum(axis=1) + 1e-12)
+        flatness = np.exp(np.log(band).mean(axis=1)) / band.mean(axis=1)
+        crossings = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1)
+        return {
+            'energy_db': 10.0 * np.log10(energy + 1e-10),
+            'band_ratio': band_ratio,
+            'flatness': flatness,
+            'zcr': crossings / (frames.shape[1] - 1)
+        }
+
+    def _detect(self, audio: np.ndarray) -> bool:
+        if len(self._remainder):
+            audio = np.concatenate((self._remainder, audio))
+        n_frames = len(audio) // self.frame_size
+        self._remainder = audio[n_frames * self.frame_size:].astype(np.float32)
+        if n_frames == 0:
+            return self._active
+
+        frames = audio[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        features = self.frame_features(frames.astype(np.float32, copy=False))
+        looks_like_voice = (
+            (features['band_ratio'] >= self.min_band_ratio)
+            & (features['flatness'] >= self.flatness_range[0])
+            & (features['flatness'] <= self.flatness_range[1])
+            & (features['zcr'] <= self.max_zcr)
+            & (features['energy_db'] >= self.min_energy_db)
+        )
+
+        active = self._active
+        for energy_db, voice in zip(features['energy_db'], looks_like_voice):
+            if self.noise_floor_db is None:
+                self.noise_floor_db = energy_db
+            speech = bool(voice) and energy_db - self.noise_floor_db >= self.snr_db
+
+            # Minimum tracking: fall at once, rise slowly
+            if energy_db < self.noise_floor_db:
+                self.noise_floor_db = energy_db
+            else:
+                self.noise_floor_db += min(energy_db - self.noise_floor_db, self.floor_rise)
+
+            if speech:
+                self._run += 1
+                if active:
+                    self._hang = self.hangover_frames
+                elif self._run >= self.onset_frames:
+                    active = True
+                    self._hang = self.hangover_frames
+            else:
+                self._run = 0
+                if active:
+                    self._hang -= 1
+                    active = self._hang > 0
+
+            self.metrics.frames += 1
+            self.metrics.speech_frames += int(speech)
+
+        return active
+
+
+def create_vad(engine: str = "spectral", sample_rate: int = 16000, threshold: float = 0.02) -> VADEngine:
+    """
+    Build a VAD engine by name.
+
+    Args:
+        engine: "spectral" or "energy"
+        sample_rate: Audio sample rate
+        threshold: RMS threshold for the energy engine
+
+    Returns:
+        VAD engine instance
+    """
+    if engine == "energy":
+        return EnergyVAD(threshold, sample_rate)
+    if engine != "spectral":
+        logger.warning(f"Unknown VAD engine '{engine}' - using spectral")
+    return SpectralVAD(sample_rate)
@@ -5,15 +5,17 @@ Interfaces with Moondream2 or LLaVA-Phi-3 via llama.cpp for offline vision analy
 Returns structured JSON with ingredient recognition, quantity estimates, spatial info.
 """
 
+import base64
 import json
 import logging
 import subprocess
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 import numpy as np
-from PIL import Image
-import io
-import tempfile
+
+from local_server import ManagedServer, ServerUnavailable
+from frame_hash import FrameResultCache, perceptual_hash
+from image_transport import encode_image, shared_memory_file
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,13 @@ class VisionVLM:
         model_path: str,
         prompt_template: str = "moondream",
         max_tokens: int = 512,
-        temperature: float = 0.2
+        temperature: float = 0.2,
+        backend: str = "subprocess",
+        server_url: Optional[str] = None,
+        server_port: int = 8090,
+        mmproj_path: Optional[str] = None,
+        server_timeout: float = 30.0,
+        result_cache: Optional[FrameResultCache] = None
     ):
         """
         Initialize VLM wrapper.
@@ -39,6 +47,13 @@ class VisionVLM:
             prompt_template: Template type ("moondream" or "llava")
             max_tokens: Maximum tokens for response
             temperature: Sampling temperature (lower = more deterministic)
+            backend: "subprocess" (one llama.cpp process per frame) or
+                "server" (resident llama-server, model loaded once)
+            server_url: URL of an already-running llama-server (skips launching one)
+            server_port: Local port for the launched llama-server
+            mmproj_path: CLIP projector GGUF (auto-detected next to the model if None)
+            server_timeout: Per-request timeout for the server backend in seconds
+            result_cache: Optional cache that reuses analyses of near-identical frames
         """
         self.model_path = Path(model_path)
         if not self.model_path.exists():
@@ -47,10 +62,18 @@ class VisionVLM:
         self.prompt_template = prompt_template
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.result_cache = result_cache
         
         # Check if llama.cpp is available
         self.llama_cpp_path = self._find_llama_cpp()
-        logger.info(f"Initialized VLM with model: {model_path}")
+        
+        # Resident server backend (falls back to the subprocess path on failure)
+        self.server_timeout = server_timeout
+        self.server: Optional[ManagedServer] = None
+        if backend == "server":
+            self.server = self._start_server(server_url, server_port, mmproj_path)
+        
+        logger.info(f"Initialized VLM with model: {model_path} (backend: {backend})")
     
     def _find_llama_cpp(self) -> Optional[Path]:
         """Find llama.cpp executable (llava-cli or main)."""
@@ -71,6 +94,67 @@ class VisionVLM:
         logger.warning("llama.cpp not found - will use mock mode for testing")
         return None
     
+    def _find_llama_server(self) -> Optional[Path]:
+        """Find llama.cpp server executable (llama-server or legacy server)."""
+        possible_paths = [
+            Path("./llama.cpp/llama-server"),
+            Path("./llama.cpp/build/bin/llama-server"),
+            Path("/usr/local/bin/llama-server"),
+            Path("./llama.cpp/server"),
+            Path("./llama.cpp/build/bin/server")
+        ]
+        
+        for path in possible_paths:
+            if path.exists():
+                logger.info(f"Found llama.cpp server at: {path}")
+                return path
+        
+        return None
+    
+    def _find_mmproj(self) -> Optional[Path]:
+        """Find the CLIP projector stored next to the model file."""
+        candidates = sorted(self.model_path.parent.glob("*mmproj*.gguf"))
+        return candidates[0] if candidates else None
+    
+    def _start_server(
+        self,
+        server_url: Optional[str],
+        server_port: int,
+        mmproj_path: Optional[str]
+    ) -> Optional[ManagedServer]:
+        """Launch (or attach to) a resident llama-server with the model loaded."""
+        if server_url:
+            server = ManagedServer("llama-server", server_url)
+        else:
+            server_path = self._find_llama_server()
+            if server_path is None:
+                logger.warning("llama-server not found - using subprocess backend")
+                return None
+            
+            mmproj = Path(mmproj_path) if mmproj_path else self._find_mmproj()
+            cmd = [
+                str(server_path),
+                "-m", str(self.model_path),
+                "--host", "127.0.0.1",
+                "--port", str(server_port),
+                "-ngl", "0"  # CPU only
+            ]
+            if mmproj is not None:
+                cmd.extend(["--mmproj", str(mmproj)])
+            else:
+                logger.warning("No mmproj file found - server may not accept images")
+            
+            server = ManagedServer("llama-server", f"http://127.0.0.1:{server_port}", cmd)
+        
+        if not server.start():
+            logger.warning("VLM server not ready - will retry on first request")
+        return server
+    
+    def close(self):
+        """Stop the resident server backend, if any."""
+        if self.server is not None:
+            self.server.stop()
+    
     def analyze_frame(
         self, 
         image: np.ndarray, 
@@ -89,13 +173,34 @@ class VisionVLM:
         if prompt is None:
             prompt = self._build_default_prompt()
         
-        # Save image temporarily
-        temp_image_path = Path(tempfile.gettempdir()) / "chef_frame.jpg"
-        self._save_image(image, temp_image_path)
+        # Near-identical frame with the same prompt: reuse the earlier analysis
+        frame_hash = None
+        if self.result_cache is not None:
+            frame_hash = perceptual_hash(image)
+            cached = self.result_cache.get(frame_hash, prompt)
+            if cached is not None:
+                return cached
+        
+        structured_result = self._analyze_uncached(image, prompt)
+        
+        if frame_hash is not None and structured_result != self._empty_structure():
+            self.result_cache.put(frame_hash, prompt, structured_result)
         
-        # Run inference
+        return structured_result
+    
+    def _analyze_uncached(self, image: np.ndarray, prompt: str) -> Dict[str, Any]:
+        """Run the VLM on a frame (server backend first, subprocess fallback)."""
+        # Resident server backend: no model reload, image sent in-memory
+        if self.server is not None:
+            result = self._run_server_inference(image, prompt)
+            if result is not None:
+                return self._parse_response(result)
+            logger.warning("VLM server unavailable - falling back to subprocess inference")
+        
+        # Run inference (image passed through a unique shared-memory file)
         if self.llama_cpp_path:
-            result = self._run_inference(temp_image_path, prompt)
+            with shared_memory_file(self._encode_jpeg(image), ".jpg") as image_path:
+                result = self._run_inference(image_path, prompt)
         else:
             # Mock mode for testing without llama.cpp
             result = self._mock_inference(image, prompt)
@@ -120,16 +225,42 @@ class VisionVLM:
 
 Focus on common Indian cooking ingredients. Be specific about spices and quantities."""
     
-    def _save_image(self, image: np.ndarray, path: Path):
-        """Save numpy array as JPEG image."""
-        # Convert BGR to RGB if needed
-        if len(image.shape) == 3 and image.shape[2] == 3:
-            image_rgb = image[:, :, ::-1]  # BGR to RGB
-        else:
-            image_rgb = image
+    def _encode_jpeg(self, image: np.ndarray) -> bytes:
+        """Encode numpy array as JPEG bytes in memory."""
+        return encode_image(image, "JPEG", quality=85)
+    
+    def _run_server_inference(self, image: np.ndarray, prompt: str) -> Optional[str]:
+        """
+        Run inference on the resident llama-server (OpenAI-compatible endpoint).
+        
+        Returns:
+            Raw model response, or None if the server is unavailable
+        """
+        image_b64 = base64.b64encode(self._encode_jpeg(image)).decode("ascii")
+        payload = {
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {"type": "image_url",
+                         "image_url": {"url": f"data:image/jpeg;base64,{image_b64}"}}
+                    ]
+                }
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
         
-        pil_image = Image.fromarray(image_rgb.astype(np.uint8))
-        pil_image.save(path, "JPEG", quality=85)
+        try:
+            response = self.server.post_json("/v1/chat/completions", payload, self.server_timeout)
+            return response["choices"][0]["message"]["content"].strip()
+        except ServerUnavailable as e:
+            logger.error(f"VLM server error: {e}")
+            return None
+        except (KeyError, IndexError, TypeError, AttributeError):
+            logger.error("Unexpected VLM server response format")
+            return None
     
     def _run_inference(self, image_path: Path, prompt: str) -> str:
         """Run inference using llama.cpp."""
@@ -156,14 +287,18 @@ Focus on common Indian cooking ingredients. Be specific about spices and quantit
                 return result.stdout.strip()
             else:
                 logger.error(f"Inference failed: {result.stderr}")
-                return self._mock_response()
+                return self._failure_response()
                 
         except subprocess.TimeoutExpired:
             logger.error("Inference timeout")
-            return self._mock_response()
+            return self._failure_response()
         except Exception as e:
             logger.error(f"Inference error: {e}")
-            return self._mock_response()
+            return self._failure_response()
+    
+    def _failure_response(self) -> str:
+        """Empty result for a failed run (never cached, unlike a made-up detection)."""
+        return json.dumps(self._empty_structure())
     
     def _mock_inference(self, image: np.ndarray, prompt: str) -> str:
         """Mock inference for testing without actual model."""
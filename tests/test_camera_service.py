@@ -0,0 +1,127 @@
+# test_camera_service.py
+"""
+Unit tests for the shared Camera Service
+Tests ring-buffer grabbing, zero-copy views and frame selection with a fake capture device.
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from camera_service import CameraService, get_camera_service
+
+
+class FakeCapture:
+    """Stand-in for cv2.VideoCapture producing numbered frames."""
+
+    def __init__(self, opened=True):
+        self.opened = opened
+        self.counter = 0
+        self.released = False
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        time.sleep(0.002)
+        self.counter += 1
+        return True
+
+    def retrieve(self, image=None):
+        frame = np.full((48, 64, 3), self.counter % 256, dtype=np.uint8)
+        if image is not None:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def camera(monkeypatch):
+    """Camera service driven by a fake capture device."""
+    fake = FakeCapture()
+    monkeypatch.setattr(CameraService, "_open_capture", lambda self: fake)
+    service = CameraService(buffer_size=4)
+    service.start()
+    assert service.wait_until_ready(timeout=2.0)
+    yield service, fake
+    service.stop()
+
+
+class TestCameraService:
+    """Test background grabbing."""
+
+    def test_latest_is_read_only_view(self, camera):
+        """Test frames are zero-copy views that callers cannot modify."""
+        service, _ = camera
+        frame, timestamp = service.latest()
+
+        assert frame.shape == (48, 64, 3)
+        assert timestamp > 0
+        assert not frame.flags.writeable
+        assert not frame.flags.owndata
+
+    def test_copy_is_writable(self, camera):
+        """Test copy=True returns an owned frame."""
+        service, _ = camera
+        frame, _ = service.latest(copy=True)
+
+        assert frame.flags.writeable
+        frame[0, 0, 0] = 1  # must not raise
+
+    def test_wait_for_frame_returns_newer_frame(self, camera):
+        """Test waiting for a frame newer than a timestamp."""
+        service, _ = camera
+        _, first_ts = service.latest()
+
+        newer = service.wait_for_frame(first_ts, timeout=1.0)
+
+        assert newer is not None
+        assert newer[1] > first_ts
+
+    def test_recent_is_newest_first(self, camera):
+        """Test recent frames are ordered newest first."""
+        service, _ = camera
+        time.sleep(0.05)
+        frames = service.recent(3)
+
+        assert len(frames) == 3
+        timestamps = [ts for _, ts in frames]
+        assert timestamps == sorted(timestamps, reverse=True)
+
+    def test_stop_releases_device(self, camera):
+        """Test stopping releases the capture device."""
+        service, fake = camera
+        service.stop()
+
+        assert not service.is_running
+        assert fake.released
+
+
+class TestCameraUnavailable:
+    """Test behaviour when the device cannot be opened."""
+
+    def test_not_ready(self, monkeypatch):
+        """Test an unopened device reports not ready."""
+        monkeypatch.setattr(CameraService, "_open_capture", lambda self: FakeCapture(opened=False))
+        service = CameraService()
+        service.start()
+
+        assert not service.wait_until_ready(timeout=1.0)
+        assert service.read(timeout=0.1) is None
+        assert service.error == "Camera not available"
+
+
+def test_shared_service_per_index():
+    """Test the same service is returned for the same camera index."""
+    assert get_camera_service(7) is get_camera_service(7)
+    assert get_camera_service(7) is not get_camera_service(8)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
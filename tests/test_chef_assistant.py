@@ -0,0 +1,165 @@
+# test_chef_assistant.py
+"""
+Unit tests for the Chef Assistant orchestrator
+Tests the parallel quantity-check path with stages finishing in a forced order,
+and scene-analysis reuse across unchanged frames.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+import numpy as np
+import chef_assistant
+from chef_assistant import ChefAssistant
+from quantity_estimator import QuantityEstimator
+from scene_gate import SceneGate
+
+
+class FakeROI:
+    """ROISelector stand-in returning the whole frame for both crops."""
+
+    def crops(self, frame):
+        return frame, frame
+
+
+class FakeOCR:
+    """TesseractOCR stand-in returning fixed text, optionally after a gate opens."""
+
+    def __init__(self, text, gate=None):
+        self.text = text
+        self.gate = gate
+
+    def read_text(self, image):
+        if self.gate is not None:
+            self.gate.wait(2.0)
+        return self.text
+
+
+def make_assistant(ocr, analyze_scene):
+    """ChefAssistant with only the quantity-check collaborators wired up."""
+    assistant = ChefAssistant.__new__(ChefAssistant)
+    assistant.perception_pool = ThreadPoolExecutor(max_workers=3)
+    assistant.roi = FakeROI()
+    assistant.ocr = ocr
+    assistant.quantity_estimator = QuantityEstimator()
+    assistant._analyze_scene = analyze_scene
+    return assistant
+
+
+@pytest.fixture
+def frame():
+    return np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+class TestParallelQuantityCheck:
+    """Test the fan-out of VLM, OCR and spoon detection."""
+
+    def test_spoon_outranks_earlier_ocr(self, frame, monkeypatch):
+        """Test a conclusive OCR weight does not end the check while spoon stages run."""
+        spoon_done = threading.Event()
+
+        def detect_spoons(image):
+            spoon_done.wait(0.2)
+            return [{"fill_ratio": 0.5}]
+
+        monkeypatch.setattr(chef_assistant, "detect_spoons_opencv", detect_spoons)
+        assistant = make_assistant(FakeOCR("Net Wt 100g"), lambda frame, crop, cancel: {})
+
+        estimate = assistant._estimate_quantity_parallel(frame)
+
+        assert estimate.method == "spoon_fill_ratio"
+        assert (estimate.amount, estimate.unit) == (0.5, "teaspoon")
+
+    def test_ocr_used_once_spoon_stages_finish(self, frame, monkeypatch):
+        """Test OCR wins when neither VLM nor the spoon detector finds a spoon."""
+        monkeypatch.setattr(chef_assistant, "detect_spoons_opencv", lambda image: [])
+        assistant = make_assistant(FakeOCR("Net Wt 100g"), lambda frame, crop, cancel: {})
+
+        estimate = assistant._estimate_quantity_parallel(frame)
+
+        assert estimate.method == "ocr_mark"
+        assert (estimate.amount, estimate.unit) == (100.0, "grams")
+
+    def test_conclusive_spoon_skips_slow_ocr(self, frame, monkeypatch):
+        """Test a conclusive spoon reading returns without waiting for OCR."""
+        ocr_gate = threading.Event()
+        monkeypatch.setattr(chef_assistant, "detect_spoons_opencv", lambda image: [{"fill_ratio": 0.95}])
+        assistant = make_assistant(FakeOCR("Net Wt 100g", ocr_gate), lambda frame, crop, cancel: {})
+
+        start = time.monotonic()
+        estimate = assistant._estimate_quantity_parallel(frame)
+        elapsed = time.monotonic() - start
+        ocr_gate.set()
+
+        assert estimate.method == "spoon_fill_ratio"
+        assert estimate.amount == 1.0
+        assert elapsed < 1.0
+
+
+class FakeVision:
+    """VisionVLM stand-in returning queued results and counting calls."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def analyze_frame(self, image):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+class FakeSceneROI:
+    """ROISelector stand-in for the scene-analysis path."""
+
+    def crop_for_vlm(self, frame):
+        return type("Crop", (), {"image": frame})()
+
+    def update_from_vlm(self, result, crop, frame):
+        pass
+
+
+def make_scene_assistant(results):
+    """ChefAssistant with only the scene-analysis collaborators wired up."""
+    assistant = ChefAssistant.__new__(ChefAssistant)
+    assistant.vision = FakeVision(results)
+    assistant.roi = FakeSceneROI()
+    assistant.scene_gate = SceneGate()
+    assistant.last_analysis = None
+    assistant.analysis_lock = threading.Lock()
+    return assistant
+
+
+TURMERIC = {"recognized_items": [{"name": "turmeric"}], "containers": [], "tools": [],
+            "locations": [], "uncertainties": []}
+FAILED = {"recognized_items": [], "containers": [], "tools": [], "locations": [],
+          "uncertainties": ["Could not analyze image"]}
+
+
+class TestSceneAnalysis:
+    """Test reuse of the last VLM result while the scene is unchanged."""
+
+    def test_unchanged_scene_reuses_result(self, frame):
+        """Test a still scene is answered from the last analysis."""
+        assistant = make_scene_assistant([TURMERIC])
+
+        assert assistant._analyze_scene(frame) == TURMERIC
+        assert assistant._analyze_scene(frame) == TURMERIC
+        assert assistant.vision.calls == 1
+
+    def test_failed_analysis_not_reused(self, frame):
+        """Test an empty result is retried instead of hiding the ingredient."""
+        assistant = make_scene_assistant([FAILED, TURMERIC])
+
+        assert assistant._analyze_scene(frame) == FAILED
+        assert assistant._analyze_scene(frame) == TURMERIC
+        assert assistant.vision.calls == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
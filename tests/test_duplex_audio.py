@@ -0,0 +1,145 @@
+# test_duplex_audio.py
+"""
+Unit tests for the full-duplex audio controller
+Tests echo gating of the capture path and barge-in against a stub TTS.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from duplex_audio import DuplexAudioController
+from stt_whisper import WhisperSTT
+from vad import EnergyVAD
+
+
+class StubTTS:
+    """Records stop/duck calls; is_speaking until stopped, playing once audio starts."""
+
+    def __init__(self):
+        self.speaking = True
+        self.playing = True
+        self.gains = []
+        self.stops = 0
+
+    def is_speaking(self):
+        return self.speaking
+
+    def is_playing(self):
+        return self.speaking and self.playing
+
+    def duck(self, gain):
+        self.gains.append(gain)
+
+    def stop(self):
+        self.stops += 1
+        self.speaking = False
+
+
+def chunks(level, count):
+    chunk = (level * np.sin(np.arange(1600) * 0.2)).astype(np.float32)
+    return [chunk] * count
+
+
+@pytest.fixture
+def stt(tmp_path):
+    model = tmp_path / "ggml-base.en.bin"
+    model.write_bytes(b"ggml")
+    return WhisperSTT(str(model), vad=EnergyVAD(threshold=0.01))
+
+
+class TestDuplexAudio:
+    """Test echo gating and barge-in."""
+
+    def test_echo_gated(self, stt):
+        """Test the assistant's own voice never becomes an utterance."""
+        tts = StubTTS()
+        duplex = DuplexAudioController(tts, stt)
+        for chunk in chunks(0.1, 30) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        assert stt.audio_queue.empty()
+        assert tts.stops == 0
+        assert duplex.stats()['gated_chunks'] == 30
+
+    def test_slow_synthesis_then_echo_gated(self, stt):
+        """Test silence while synthesizing is not learned as the echo level."""
+        tts = StubTTS()
+        tts.playing = False
+        duplex = DuplexAudioController(tts, stt)
+        for chunk in chunks(0.0, 5):
+            stt._handle_chunk(chunk)
+
+        tts.playing = True
+        for chunk in chunks(0.1, 30) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        assert tts.stops == 0
+        assert duplex.barge_ins == 0
+        assert stt.audio_queue.empty()
+
+    def test_louder_echo_not_barge_in(self, stt):
+        """Test echo that grows somewhat louder is learned instead of stopping playback."""
+        tts = StubTTS()
+        duplex = DuplexAudioController(tts, stt)
+        for chunk in chunks(0.1, 10) + chunks(0.21, 20) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        assert tts.stops == 0
+        assert duplex.barge_ins == 0
+
+    def test_barge_in_ducks_then_stops(self, stt):
+        """Test loud speech over playback ducks, stops it and is transcribed."""
+        tts = StubTTS()
+        duplex = DuplexAudioController(tts, stt)
+        for chunk in chunks(0.1, 10) + chunks(0.5, 10) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        assert tts.gains[0] == duplex.duck_gain
+        assert tts.stops == 1
+        assert duplex.barge_ins == 1
+        segment = stt.audio_queue.get_nowait()
+        assert np.abs(segment.audio).max() > 0.4
+
+    def test_short_burst_discarded(self, stt):
+        """Test an unconfirmed burst restores the volume and is not transcribed."""
+        tts = StubTTS()
+        DuplexAudioController(tts, stt)
+        for chunk in chunks(0.1, 10) + chunks(0.5, 1) + chunks(0.1, 10) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        assert tts.stops == 0
+        assert tts.gains[-1] == 1.0
+        assert stt.audio_queue.empty()
+
+    def test_discard_keeps_queued_commands(self, stt):
+        """Test discarding an echo burst does not drop an earlier queued utterance."""
+        tts = StubTTS()
+        tts.speaking = False
+        DuplexAudioController(tts, stt)
+        for chunk in chunks(0.1, 10) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        tts.speaking = True
+        for chunk in chunks(0.1, 10) + chunks(0.5, 1) + chunks(0.1, 10):
+            stt._handle_chunk(chunk)
+
+        segment = stt.audio_queue.get_nowait()
+        assert stt._is_claimed(stt._utterance_id)
+        assert not stt._is_claimed(segment.uid)
+
+    def test_gate_open_when_silent(self, stt):
+        """Test VAD decisions pass through unchanged when nothing is playing."""
+        tts = StubTTS()
+        tts.speaking = False
+        DuplexAudioController(tts, stt)
+        for chunk in chunks(0.1, 10) + chunks(0.0, 20):
+            stt._handle_chunk(chunk)
+
+        assert not stt.audio_queue.empty()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,100 @@
+# test_frame_hash.py
+"""
+Unit tests for perceptual frame hashing and the VLM result cache
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from frame_hash import FrameResultCache, hamming_distance, perceptual_hash
+
+
+def make_scene(seed: int = 0) -> np.ndarray:
+    """Build a textured BGR test frame."""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, size=(6, 8, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((80, 80, 1), dtype=np.uint8))
+
+
+class TestPerceptualHash:
+    """Test hashing behaviour."""
+
+    @pytest.mark.parametrize("method", ["dct", "average"])
+    def test_identical_frames(self, method):
+        """Test identical frames hash identically."""
+        frame = make_scene()
+        assert perceptual_hash(frame, method=method) == perceptual_hash(frame.copy(), method=method)
+
+    @pytest.mark.parametrize("method", ["dct", "average"])
+    def test_noise_is_tolerated(self, method):
+        """Test sensor noise changes only a few bits."""
+        frame = make_scene()
+        rng = np.random.default_rng(1)
+        noisy = np.clip(frame.astype(np.int16) + rng.integers(-6, 7, frame.shape), 0, 255).astype(np.uint8)
+
+        distance = hamming_distance(perceptual_hash(frame, method=method),
+                                    perceptual_hash(noisy, method=method))
+        assert distance <= 6
+
+    def test_different_scenes(self):
+        """Test unrelated scenes are far apart."""
+        distance = hamming_distance(perceptual_hash(make_scene(0)), perceptual_hash(make_scene(5)))
+        assert distance > 12
+
+    def test_grayscale_input(self):
+        """Test single-channel frames are accepted."""
+        gray = make_scene()[:, :, 0]
+        assert isinstance(perceptual_hash(gray), int)
+
+
+class TestFrameResultCache:
+    """Test result reuse."""
+
+    def test_near_match_hits(self):
+        """Test a hash within the threshold reuses the result."""
+        cache = FrameResultCache(max_distance=2)
+        cache.put(0b1111, "prompt", {"recognized_items": ["a"]})
+
+        assert cache.get(0b1110, "prompt") == {"recognized_items": ["a"]}
+        assert cache.get(0b0000, "prompt") is None
+
+    def test_prompt_must_match(self):
+        """Test results are not shared across prompts."""
+        cache = FrameResultCache()
+        cache.put(1, "what is this", {"x": 1})
+
+        assert cache.get(1, "how much") is None
+
+    def test_returns_copies(self):
+        """Test callers cannot mutate cached results."""
+        cache = FrameResultCache()
+        cache.put(1, "p", {"items": []})
+        cache.get(1, "p")["items"].append("mutated")
+
+        assert cache.get(1, "p") == {"items": []}
+
+    def test_ttl_expiry(self):
+        """Test stale results are not reused."""
+        cache = FrameResultCache(ttl=0.01)
+        cache.put(1, "p", {"x": 1})
+        time.sleep(0.02)
+
+        assert cache.get(1, "p") is None
+
+    def test_lru_bound(self):
+        """Test the oldest entry is evicted beyond capacity."""
+        cache = FrameResultCache(max_entries=2, max_distance=0)
+        cache.put(1, "p", {"x": 1})
+        cache.put(2, "p", {"x": 2})
+        cache.put(4, "p", {"x": 4})
+
+        assert cache.get(1, "p") is None
+        assert cache.stats()["entries"] == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
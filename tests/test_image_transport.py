@@ -0,0 +1,78 @@
+# test_image_transport.py
+"""
+Unit tests for in-memory image transport
+"""
+
+import sys
+import io
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from PIL import Image
+from image_transport import encode_image, encode_pnm, shared_memory_file
+
+
+class TestEncoding:
+    """Test frame encoders."""
+
+    def test_jpeg_decodes(self):
+        """Test JPEG bytes decode to the original size."""
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        decoded = Image.open(io.BytesIO(encode_image(frame, "JPEG")))
+
+        assert decoded.format == "JPEG"
+        assert decoded.size == (64, 48)
+
+    def test_pnm_gray(self):
+        """Test grayscale frames become binary PGM."""
+        gray = np.arange(12, dtype=np.uint8).reshape(3, 4)
+        decoded = np.asarray(Image.open(io.BytesIO(encode_pnm(gray))))
+
+        assert np.array_equal(decoded, gray)
+
+    def test_pnm_color_is_rgb(self):
+        """Test BGR frames are written as RGB PPM."""
+        bgr = np.zeros((2, 2, 3), dtype=np.uint8)
+        bgr[:, :, 0] = 255  # blue
+        decoded = np.asarray(Image.open(io.BytesIO(encode_pnm(bgr))))
+
+        assert decoded[0, 0].tolist() == [0, 0, 255]
+
+
+class TestSharedMemoryFile:
+    """Test unique transport files."""
+
+    def test_unique_and_removed(self):
+        """Test concurrent files get distinct names and are cleaned up."""
+        with shared_memory_file(b"a") as first, shared_memory_file(b"b") as second:
+            assert first != second
+            assert first.read_bytes() == b"a"
+            assert second.read_bytes() == b"b"
+
+        assert not first.exists()
+        assert not second.exists()
+
+    def test_parallel_writers(self):
+        """Test threads writing at the same time never see each other's data."""
+        errors = []
+
+        def worker(value: bytes):
+            for _ in range(20):
+                with shared_memory_file(value) as path:
+                    if path.read_bytes() != value:
+                        errors.append(value)
+
+        threads = [threading.Thread(target=worker, args=(bytes([i]) * 64,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,164 @@
+# test_ingredient_matcher.py
+"""
+Unit tests for the ingredient alias matcher
+"""
+
+import sys
+import unicodedata
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from ingredient_matcher import (
+    AliasMatcher, FuzzyIndex, bounded_levenshtein, fold, get_fuzzy_index, get_matcher, load_aliases
+)
+
+
+class TestLoadAliases:
+    """Test loading the knowledge base."""
+
+    def test_canonical_included(self):
+        """Test each canonical key is also an alias."""
+        aliases = load_aliases()
+
+        assert 'haldi' in aliases['turmeric']
+        assert 'turmeric' in aliases['turmeric']
+        assert 'garam masala' in aliases['garam_masala']
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing knowledge base yields no aliases."""
+        assert load_aliases(tmp_path / "missing.yaml") == {}
+
+
+class TestAliasMatcher:
+    """Test single-pass alias matching."""
+
+    def test_transliterated_and_devanagari(self):
+        """Test English, transliterated and Devanagari aliases map to one key."""
+        matches = get_matcher().find("Haldi Powder / हल्दी / TURMERIC")
+
+        assert [m.canonical for m in matches] == ['turmeric'] * 3
+        assert matches[0].start == 0 and matches[0].end == 5
+
+    def test_longest_alias_wins(self):
+        """Test multi-word aliases take precedence and tolerate extra spaces."""
+        matches = get_matcher().find("kali   mirch and lal mirch")
+
+        assert [m.canonical for m in matches] == ['black_pepper', 'chili_powder']
+
+    def test_word_boundaries(self):
+        """Test aliases inside longer words are ignored (Latin and Devanagari)."""
+        matcher = get_matcher()
+
+        assert matcher.find("rain, terrain, hotel") == []
+        assert matcher.find("तेलंगाना") == []
+        assert matcher.canonical_names("तेल") == ['oil']
+
+    def test_short_alias_needs_context(self):
+        """Test short transliterated aliases only count next to an ingredient word."""
+        matcher = get_matcher()
+
+        assert matcher.canonical_names("Best before 12/2025 Tel: 1800 123") == []
+        assert matcher.canonical_names("Rai seeds 100g") == ['mustard_seeds']
+        assert matcher.canonical_names("Tel (pure) 1 L") == ['oil']
+        assert matcher.canonical_names("Cooking oil") == ['oil']
+
+    def test_generic_words_not_aliases(self):
+        """Test other peppers, chillies and mustard products are not read as the spice."""
+        matcher = get_matcher()
+
+        assert matcher.canonical_names("Red pepper, bell pepper") == []
+        assert matcher.canonical_names("Mustard oil 1 L") == ['oil']
+        assert matcher.canonical_names("Green chilli") == []
+        assert matcher.canonical_names("Black pepper, mustard seeds") == ['black_pepper', 'mustard_seeds']
+
+    def test_decomposed_devanagari(self):
+        """Test decomposed nukta forms match composed aliases."""
+        text = unicodedata.normalize("NFD", "कड़ी पत्ता")
+
+        assert get_matcher().canonical_names(text) == ['curry_leaves']
+
+    def test_canonical_names_distinct(self):
+        """Test canonical names are de-duplicated in order of appearance."""
+        names = get_matcher().canonical_names("Jeera, namak, cumin seeds, salt")
+
+        assert names == ['cumin', 'salt']
+
+    def test_empty_matcher(self):
+        """Test a matcher without aliases finds nothing."""
+        assert AliasMatcher({}).find("haldi") == []
+
+
+class TestBoundedLevenshtein:
+    """Test the banded edit distance."""
+
+    @pytest.mark.parametrize("a,b,expected", [
+        ("turmeric", "turmeric", 0),
+        ("turmerlc", "turmeric", 1),
+        ("jeea", "jeera", 1),
+        ("garam rnasala", "garam masala", 2),
+    ])
+    def test_within_bound(self, a, b, expected):
+        """Test distances within the bound are exact."""
+        assert bounded_levenshtein(a, b, 2) == expected
+
+    def test_exceeds_bound(self):
+        """Test distances over the bound return None."""
+        assert bounded_levenshtein("cumin", "coriander", 2) is None
+        assert bounded_levenshtein("abcd", "wxyz", 2) is None
+
+
+class TestFuzzyIndex:
+    """Test approximate alias lookup."""
+
+    def test_ocr_misreads(self):
+        """Test common OCR errors resolve to the right ingredient."""
+        index = get_fuzzy_index()
+
+        assert index.best("turmerlc").canonical == "turmeric"
+        assert index.best("HALDl").canonical == "turmeric"
+        assert index.best("corlander").canonical == "coriander"
+
+    def test_homoglyphs_folded(self):
+        """Test Cyrillic look-alikes fold to Latin letters."""
+        assert fold("jeeгa") == "jeera"
+        assert get_fuzzy_index().best("jeeгa").distance == 0
+
+    def test_short_words_exact(self):
+        """Test short aliases are not matched approximately."""
+        index = get_fuzzy_index()
+
+        assert index.best("rain") is None
+        assert index.best("tel").canonical == "oil"
+
+    def test_ranked_by_distance(self):
+        """Test candidates are ordered closest first."""
+        results = get_fuzzy_index().search("kali mirch")
+
+        assert results[0].canonical == "black_pepper"
+        assert all(a.distance <= b.distance for a, b in zip(results, results[1:]))
+
+    def test_find_in_text(self):
+        """Test multi-word aliases are found in noisy text with spans."""
+        text = "P0WDER garam rnasala 100g"
+        matches = get_fuzzy_index().find_in_text(text)
+
+        assert [m.canonical for m in matches] == ["garam_masala"]
+        assert text[matches[0].start:matches[0].end] == "garam rnasala"
+
+    def test_find_in_text_short_alias_needs_context(self):
+        """Test short aliases and near-misses on them need a confirming neighbour."""
+        index = get_fuzzy_index()
+
+        assert index.find_in_text("Rai Industries Pvt Ltd") == []
+        assert [m.canonical for m in index.find_in_text("rai seeds")] == ["mustard_seeds"]
+        assert index.find_in_text("jeeras 50g") == []
+        assert [m.canonical for m in index.find_in_text("jeeras powder")] == ["cumin"]
+
+    def test_unknown_word(self):
+        """Test unrelated words have no candidates."""
+        assert FuzzyIndex({"salt": ["namak"]}).search("hello") == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,95 @@
+# test_label_parser.py
+"""
+Unit tests for the label text parser
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import label_parser
+from ingredient_matcher import get_matcher
+from ocr_tesseract import extract_label_info
+
+
+LABEL = "Haldi (Turmeric) Powder 100g  Exp: 12/05/2026"
+
+
+class TestParseLabel:
+    """Test single-label parsing."""
+
+    def test_parse_label(self):
+        """Test quantity, ingredients and expiry are extracted."""
+        info = label_parser.parse_label(LABEL)
+
+        assert info['quantity']['amount'] == 100
+        assert info['quantity']['unit'] == 'grams'
+        assert info['ingredient_names'] == ['turmeric']
+        assert info['expiry_date'] == '12/05/2026'
+
+    def test_no_measurement(self):
+        """Test text without measurements."""
+        info = label_parser.parse_label("Garam Masala")
+
+        assert info['quantity'] is None
+        assert info['ingredient_names'] == ['garam_masala']
+        assert info['expiry_date'] is None
+
+    def test_noisy_ingredient_name(self):
+        """Test misread names are recovered by fuzzy matching."""
+        assert label_parser.detect_ingredient_names("TURMERlC POWDER") == ['turmeric']
+
+    @pytest.mark.parametrize("text", [
+        "Packed with care. Net wt 100g",
+        "Store in a cool tool shop",
+        "Keep away from sunlight. Use within 6 months",
+        "Mfd by ABC Foods Pvt Ltd. MRP Rs 45 incl. of all taxes",
+    ])
+    def test_boilerplate_not_matched(self, text):
+        """Test ordinary label words are not fuzzy-matched to short aliases."""
+        assert label_parser.detect_ingredient_names(text) == []
+
+    @pytest.mark.parametrize("text", ["Rai Industries Pvt Ltd", "Batch no 12 rai"])
+    def test_fuzzy_fallback_short_alias_needs_context(self, text):
+        """Test the fuzzy fallback applies the short-alias context rule."""
+        assert get_matcher().canonical_names(text) == []
+        assert label_parser.detect_ingredient_names(text) == []
+
+    def test_short_misread_needs_exact_fold(self):
+        """Test short words still match when only OCR homoglyphs differ."""
+        assert label_parser.detect_ingredient_names("hаldi 100g") == ['turmeric']  # Cyrillic а
+        assert label_parser.detect_ingredient_names("hinq 50g") == []
+
+    def test_extract_label_info_needs_no_engine(self, monkeypatch):
+        """Test the OCR-module entry point parses without probing for Tesseract."""
+        import ocr_tesseract
+        monkeypatch.setattr(ocr_tesseract.TesseractOCR, "__init__",
+                            lambda *a, **k: pytest.fail("engine constructed"))
+
+        assert extract_label_info(LABEL) == label_parser.parse_label(LABEL)
+
+
+class TestParseLabels:
+    """Test the bulk API."""
+
+    def test_results_in_order(self):
+        """Test one result per input, in order."""
+        results = label_parser.parse_labels([LABEL, "Jeera 50g", LABEL])
+
+        assert len(results) == 3
+        assert results[1]['quantity']['amount'] == 50
+        assert results[0] == results[2]
+
+    def test_duplicate_results_independent(self):
+        """Test results for repeated texts can be modified independently."""
+        first, second = label_parser.parse_labels([LABEL, LABEL])
+        first['ingredient_names'].append('salt')
+        first['quantity']['amount'] = 1
+
+        assert 'salt' not in second['ingredient_names']
+        assert second['quantity']['amount'] == 100
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,139 @@
+# test_local_server.py
+"""
+Unit tests for the managed local server supervisor
+Tests the time-windowed restart budget, background restarts and request retries.
+"""
+
+import socket
+import sys
+import threading
+import time
+import urllib.error
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import local_server
+from local_server import ManagedServer, ServerUnavailable
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Supervisor for a server that never comes up; restarts are recorded, not run."""
+    managed = ManagedServer("test", "http://127.0.0.1:9", command=["server"],
+                            max_restarts=2, restart_window=60.0)
+    managed.starts = 0
+
+    def start_locked():
+        managed.starts += 1
+        return False
+
+    monkeypatch.setattr(managed, "is_healthy", lambda timeout=1.0: False)
+    monkeypatch.setattr(managed, "_start_locked", start_locked)
+    return managed
+
+
+def set_clock(monkeypatch, now):
+    monkeypatch.setattr(local_server.time, "time", lambda: now)
+
+
+class TestRestartBudget:
+    """Test automatic restarts are limited per time window."""
+
+    def test_budget_exhausted_within_window(self, server, monkeypatch):
+        """Test restarts stop after max_restarts in quick succession."""
+        for now in (0.0, 1.0, 2.0):
+            set_clock(monkeypatch, now)
+            server.ensure_running()
+
+        assert server.starts == 2
+        assert server.restart_count == 2
+
+    def test_budget_recovers_after_window(self, server, monkeypatch):
+        """Test old restarts age out, so later crashes are still restarted."""
+        for now in (0.0, 1.0, 100.0, 101.0, 102.0):
+            set_clock(monkeypatch, now)
+            server.ensure_running()
+
+        assert server.starts == 4
+        assert server.restart_count == 4
+
+    def test_external_server_never_restarted(self, server):
+        """Test a server without a command is only health-checked."""
+        server.command = None
+
+        assert not server.ensure_running()
+        assert server.starts == 0
+
+
+class TestBackgroundRestart:
+    """Test a crashed server is restarted without blocking the request."""
+
+    def test_request_fails_fast_while_restarting(self, server, monkeypatch):
+        """Test post() raises at once and the slow restart runs in the background."""
+        release = threading.Event()
+
+        def slow_start():
+            server.starts += 1
+            release.wait(5.0)
+            return False
+
+        monkeypatch.setattr(server, "_start_locked", slow_start)
+
+        start = time.monotonic()
+        with pytest.raises(ServerUnavailable):
+            server.post("/inference", b"", "application/octet-stream", timeout=1.0)
+        with pytest.raises(ServerUnavailable):
+            server.post("/inference", b"", "application/octet-stream", timeout=1.0)
+        elapsed = time.monotonic() - start
+
+        restart = server._restart_thread
+        release.set()
+        restart.join(timeout=5.0)
+        assert elapsed < 2.0
+        assert server.starts == 1
+
+    def test_external_server_not_restarted(self, server):
+        """Test no restart thread is started for a server without a command."""
+        server.command = None
+
+        with pytest.raises(ServerUnavailable):
+            server.post("/inference", b"", "application/octet-stream", timeout=1.0)
+        assert server._restart_thread is None
+
+
+class TestRetry:
+    """Test which request failures are retried against a healthy server."""
+
+    def post_failing_with(self, server, monkeypatch, error):
+        calls = []
+
+        def urlopen(request, timeout):
+            calls.append(request)
+            raise error
+
+        monkeypatch.setattr(server, "is_healthy", lambda timeout=1.0: True)
+        monkeypatch.setattr(local_server.urllib.request, "urlopen", urlopen)
+        with pytest.raises(ServerUnavailable):
+            server.post("/inference", b"", "application/octet-stream", timeout=1.0)
+        return len(calls)
+
+    def test_refused_connection_retried(self, server, monkeypatch):
+        """Test a refused connection is retried once."""
+        error = urllib.error.URLError(ConnectionRefusedError())
+
+        assert self.post_failing_with(server, monkeypatch, error) == 2
+
+    def test_connect_timeout_not_retried(self, server, monkeypatch):
+        """Test a timeout while connecting is not retried."""
+        error = urllib.error.URLError(socket.timeout("timed out"))
+
+        assert self.post_failing_with(server, monkeypatch, error) == 1
+
+    def test_read_timeout_not_retried(self, server, monkeypatch):
+        """Test a timeout while reading the response is not retried."""
+        assert self.post_failing_with(server, monkeypatch, socket.timeout("timed out")) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,83 @@
+# test_measurement_parser.py
+"""
+Unit tests for the measurement tokenizer
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+from measurement_parser import normalize_unit, parse_amount, parse_measurements
+
+
+def summary(text):
+    return [(m.amount, m.unit) for m in parse_measurements(text)]
+
+
+class TestTokenizer:
+    """Test single-pass measurement extraction."""
+
+    @pytest.mark.parametrize("text,expected", [
+        ("1/2 tsp", [(0.5, "teaspoon")]),
+        ("½ tbsp", [(0.5, "tablespoon")]),
+        ("1 1/2 tsp", [(1.5, "teaspoon")]),
+        ("1½ cups", [(1.5, "cup")]),
+        ("2.5 kg", [(2.5, "kilograms")]),
+        ("3 tablespoons", [(3.0, "tablespoon")]),
+        ("250ml", [(250.0, "milliliters")]),
+    ])
+    def test_amount_forms(self, text, expected):
+        """Test fractions, mixed numbers, decimals and unit spellings."""
+        assert summary(text) == expected
+
+    def test_no_duplicate_matches(self):
+        """Test each quantity is reported once."""
+        assert summary("Net Wt. 100g (3.5 oz)") == [(100.0, "grams"), (3.5, "ounce")]
+
+    def test_devanagari(self):
+        """Test Devanagari digits and knowledge-base unit names."""
+        measurements = parse_measurements("हल्दी ५० ग्राम, 1 बड़ा चमच")
+
+        assert [(m.amount, m.unit) for m in measurements] == [(50.0, "grams"), (1.0, "tablespoon")]
+        assert measurements[0].raw_text == "५० ग्राम"
+
+    def test_spans(self):
+        """Test spans point at the raw text."""
+        text = "add 1 1/2 tsp haldi"
+        m = parse_measurements(text)[0]
+
+        assert text[m.start:m.end] == m.raw_text == "1 1/2 tsp"
+
+    def test_non_measurements_ignored(self):
+        """Test dates, bare numbers and unit prefixes are not measurements."""
+        assert summary("Exp 12/05/2026, batch 42") == []
+        assert summary("10 large onions") == []
+        assert summary("1/0 tsp") == []
+
+    def test_ambiguous_unit_lower_confidence(self):
+        """Test single-letter units get lower confidence."""
+        cups, single = parse_measurements("2 cups, 1 c")
+
+        assert cups.confidence > single.confidence
+
+
+class TestHelpers:
+    """Test amount and unit helpers."""
+
+    def test_parse_amount(self):
+        """Test amount strings."""
+        assert parse_amount("1 1/2") == 1.5
+        assert parse_amount("¾") == 0.75
+        assert parse_amount("२") == 2.0
+        assert parse_amount("abc") == 1.0
+
+    def test_normalize_unit(self):
+        """Test unit spellings map to canonical names."""
+        assert normalize_unit("Tbsp") == "tablespoon"
+        assert normalize_unit("ग्राम") == "grams"
+        assert normalize_unit("handful") == "handful"
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
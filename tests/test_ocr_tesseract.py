@@ -0,0 +1,225 @@
+# test_ocr_tesseract.py
+"""
+Unit tests for the OCR module
+Tests tiered preprocessing and TSV parsing without a Tesseract binary.
+"""
+
+import sys
+import types
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+import cv2
+from ocr_tesseract import TesseractOCR, TesseractAPIPool, parse_tsv
+
+
+TSV = (
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+    "1\t1\t0\t0\t0\t0\t0\t0\t100\t50\t-1\t\n"
+    "5\t1\t1\t1\t1\t1\t0\t0\t10\t10\t90\tHaldi\n"
+    "5\t1\t1\t1\t1\t2\t0\t0\t10\t10\t80\tPowder\n"
+    "5\t1\t1\t1\t2\t1\t0\t0\t10\t10\t70\t100g\n"
+)
+
+
+@pytest.fixture
+def ocr():
+    """OCR instance that behaves as if Tesseract were installed."""
+    engine = TesseractOCR()
+    engine.tesseract_path = "tesseract"
+    return engine
+
+
+def label_image() -> np.ndarray:
+    """Light frame with a dark text-like bar."""
+    image = np.full((60, 200, 3), 220, dtype=np.uint8)
+    image[20:40, 20:180] = 30
+    return image
+
+
+class TestParseTSV:
+    """Test Tesseract TSV parsing."""
+
+    def test_text_and_confidence(self):
+        """Test words are grouped into lines and confidences averaged."""
+        text, confidence = parse_tsv(TSV)
+
+        assert text == "Haldi Powder\n100g"
+        assert confidence == pytest.approx(0.8)
+
+    def test_empty_output(self):
+        """Test output with no words."""
+        assert parse_tsv("") == ("", 0.0)
+
+
+class TestTieredPreprocessing:
+    """Test escalation through preprocessing tiers."""
+
+    def test_fast_tier_accepted(self, ocr, monkeypatch):
+        """Test a confident fast-tier result skips the expensive tiers."""
+        tiers = []
+        original = ocr._preprocess_image
+        monkeypatch.setattr(ocr, "_preprocess_image", lambda img, tier: tiers.append(tier) or original(img, tier))
+        monkeypatch.setattr(ocr, "_run_tesseract", lambda data, **kwargs: ("Haldi", 0.9))
+
+        text, confidence = ocr.read_text_with_confidence(label_image())
+
+        assert text == "Haldi"
+        assert tiers == ["fast"]
+        assert ocr.last_tier == "fast"
+
+    def test_escalates_on_low_confidence(self, ocr, monkeypatch):
+        """Test low confidence escalates and the best tier wins."""
+        results = iter([("H4ld1", 0.3), ("Haldl", 0.5), ("Haldi", 0.85)])
+        monkeypatch.setattr(ocr, "_run_tesseract", lambda data, **kwargs: next(results))
+
+        text, confidence = ocr.read_text_with_confidence(label_image())
+
+        assert text == "Haldi"
+        assert confidence == pytest.approx(0.85)
+        assert ocr.last_tier == "restore"
+
+    def test_budget_stops_escalation(self, ocr, monkeypatch):
+        """Test tiers expected to exceed the budget are skipped."""
+        monkeypatch.setattr(ocr, "_run_tesseract", lambda data, **kwargs: ("H4ld1", 0.3))
+        ocr.tier_costs = {"adaptive": 5.0, "restore": 5.0}
+
+        text, _ = ocr.read_text_with_confidence(label_image(), budget=1.0)
+
+        assert text == "H4ld1"
+        assert ocr.last_tier == "fast"
+
+    def test_restore_denoises_before_upscaling(self, ocr, monkeypatch):
+        """Test the restore tier denoises the original-size image, not the upscaled one."""
+        image = label_image()
+        shapes = []
+        denoise = cv2.fastNlMeansDenoising
+        monkeypatch.setattr(cv2, "fastNlMeansDenoising",
+                            lambda img, **kwargs: shapes.append(img.shape) or denoise(img, **kwargs))
+
+        processed = ocr._preprocess_image(image, "restore")
+
+        assert shapes == [image.shape[:2]]
+        assert processed.shape[0] == 2 * image.shape[0]
+
+    def test_tiers_produce_binary_images(self, ocr):
+        """Test every tier returns a single-channel binarized image."""
+        for tier in TesseractOCR.TIERS:
+            processed = ocr._preprocess_image(label_image(), tier)
+            assert processed.ndim == 2
+            assert set(np.unique(processed)) <= {0, 255}
+
+
+class FakeAPI:
+    """Stand-in for tesserocr.PyTessBaseAPI recording calls."""
+
+    created = 0
+
+    def __init__(self, lang, oem, path=None):
+        FakeAPI.created += 1
+        self.psm_calls = []
+        self.image_args = None
+
+    def SetPageSegMode(self, psm):
+        self.psm_calls.append(psm)
+
+    def SetImageBytes(self, data, width, height, bpp, bpl):
+        self.image_args = (len(data), width, height, bpp, bpl)
+
+    def GetUTF8Text(self):
+        return "Jeera 50g\n"
+
+    def MeanTextConf(self):
+        return 88
+
+    def Clear(self):
+        pass
+
+    def End(self):
+        self.ended = True
+
+
+@pytest.fixture
+def fake_tesserocr(monkeypatch):
+    """Install a fake tesserocr module."""
+    FakeAPI.created = 0
+    module = types.SimpleNamespace(
+        PyTessBaseAPI=FakeAPI,
+        OEM=types.SimpleNamespace(LSTM_ONLY=1)
+    )
+    monkeypatch.setitem(sys.modules, "tesserocr", module)
+    return module
+
+
+class TestAPIPool:
+    """Test the in-process Tesseract handle pool."""
+
+    def test_handle_reused_across_reads(self, fake_tesserocr):
+        """Test sequential reads reuse one initialized handle."""
+        pool = TesseractAPIPool(size=2)
+        gray = np.zeros((10, 20), dtype=np.uint8)
+
+        for _ in range(3):
+            text, confidence = pool.recognize(gray, psm=7)
+
+        assert text == "Jeera 50g"
+        assert confidence == pytest.approx(0.88)
+        assert FakeAPI.created == 1
+        assert pool._handles[0].psm_calls == [7, 7, 7]
+        assert pool._handles[0].image_args == (200, 20, 10, 1, 20)
+
+    def test_pool_bounded(self, fake_tesserocr):
+        """Test concurrent reads never create more handles than the pool size."""
+        pool = TesseractAPIPool(size=2)
+        image = np.zeros((10, 20, 3), dtype=np.uint8)
+
+        threads = [threading.Thread(target=pool.recognize, args=(image,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert FakeAPI.created <= 2
+
+    def test_closed_pool_refuses_reads(self, fake_tesserocr):
+        """Test reads after close() fail instead of creating new handles."""
+        pool = TesseractAPIPool(size=2)
+        handle = pool._handles[0]
+        pool.close()
+
+        with pytest.raises(RuntimeError):
+            pool.recognize(np.zeros((10, 20), dtype=np.uint8))
+        assert handle.ended
+        assert FakeAPI.created == 1
+
+    def test_close_during_read_frees_handle_after(self, fake_tesserocr):
+        """Test a handle in use when the pool closes is freed once its read ends."""
+        pool = TesseractAPIPool(size=1)
+        api = pool._acquire(timeout=1.0)
+        pool.close()
+
+        assert not getattr(api, "ended", False)
+        pool._release(api)
+        assert api.ended
+        assert pool._handles == []
+
+    def test_ocr_uses_pool(self, fake_tesserocr):
+        """Test TesseractOCR reads through the pool when tesserocr is present."""
+        ocr = TesseractOCR(backend="api")
+
+        assert ocr.api_pool is not None
+        assert ocr.read_text(np.full((30, 60, 3), 255, dtype=np.uint8)) == "Jeera 50g"
+
+    def test_subprocess_backend_skips_pool(self, fake_tesserocr):
+        """Test the subprocess backend never creates API handles."""
+        ocr = TesseractOCR(backend="subprocess")
+
+        assert ocr.api_pool is None
+        assert FakeAPI.created == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
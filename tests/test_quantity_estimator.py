@@ -181,6 +181,22 @@ class TestQuantityEstimator:
         assert result.method == "heuristic"
         assert result.confidence < 0.5
     
+    def test_spoon_detections_fused(self, estimator):
+        """Test detector output is used when the VLM saw no spoon."""
+        detections = [{"bbox": [10, 10, 40, 20], "fill_ratio": 1.0}]
+        
+        result = estimator.estimate_quantity({}, "", spoon_detections=detections)
+        
+        assert result.amount == 1.0
+        assert result.method == "spoon_fill_ratio"
+    
+    def test_is_conclusive(self, estimator):
+        """Test only confident non-heuristic estimates are conclusive."""
+        assert estimator.is_conclusive(QuantityEstimate(0.5, "teaspoon", 0.9, "ocr_mark"))
+        assert not estimator.is_conclusive(QuantityEstimate(0.5, "teaspoon", 0.65, "spoon_fill_ratio"))
+        assert not estimator.is_conclusive(QuantityEstimate(0.25, "teaspoon", 0.9, "heuristic"))
+        assert not estimator.is_conclusive(None)
+    
     def test_calibrated_estimator(self, calibrated_estimator):
         """Test calibrated estimator has calibration data."""
         assert calibrated_estimator.pixels_per_cm == 40.0
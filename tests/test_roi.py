@@ -0,0 +1,105 @@
+# test_roi.py
+"""
+Unit tests for region-of-interest selection
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from roi import ROI, ROICrop, ROISelector
+
+
+def scene_with_jar() -> np.ndarray:
+    """Dark frame with one bright textured rectangle (the 'jar')."""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[200:320, 300:420] = 200
+    frame[240:280, 320:400] = 40  # label text block
+    return frame
+
+
+class TestROI:
+    """Test ROI geometry."""
+
+    def test_crop_is_view(self):
+        """Test cropping does not copy pixels."""
+        frame = scene_with_jar()
+        region = ROI(300, 200, 120, 120, "contour").crop(frame)
+
+        assert region.shape == (120, 120, 3)
+        assert np.shares_memory(region, frame)
+
+
+class TestROISelector:
+    """Test ROI detection, mapping and caching."""
+
+    def test_contour_roi_contains_object(self):
+        """Test the contour pass finds the bright object."""
+        selector = ROISelector()
+        roi = selector.select(scene_with_jar())
+
+        assert roi is not None
+        assert roi.source == "contour"
+        assert roi.x <= 300 and roi.x + roi.width >= 420
+        assert roi.y <= 200 and roi.y + roi.height >= 320
+
+    def test_vlm_crop_resized_to_native_size(self):
+        """Test the VLM crop's longer side is at most the model input size."""
+        selector = ROISelector(vlm_input_size=64)
+        crop = selector.crop_for_vlm(scene_with_jar())
+
+        assert max(crop.image.shape[:2]) == 64
+        assert crop.scale < 1.0
+
+    def test_crops_share_one_selection(self, monkeypatch):
+        """Test the VLM and OCR crops come from the same ROI."""
+        selector = ROISelector(vlm_input_size=64)
+        frame = scene_with_jar()
+        calls = []
+        detect = selector._detect_contour_roi
+        monkeypatch.setattr(selector, "_detect_contour_roi", lambda f: calls.append(1) or detect(f))
+
+        vlm_crop, ocr_crop = selector.crops(frame)
+
+        assert len(calls) == 1
+        assert ocr_crop.shape[:2] == (vlm_crop.roi.height, vlm_crop.roi.width)
+
+    def test_vlm_bbox_mapped_to_frame(self):
+        """Test VLM boxes on the crop are mapped back to frame coordinates."""
+        frame = scene_with_jar()
+        selector = ROISelector(padding=0.0)
+        crop = ROICrop(image=frame[100:400, 200:500], roi=ROI(200, 100, 300, 300, "contour"), scale=0.5)
+
+        selector.update_from_vlm(
+            {"recognized_items": [{"name": "jar", "confidence": 0.9, "bbox": [50, 50, 60, 60]}]},
+            crop, frame
+        )
+        roi = selector.select(frame)
+
+        assert roi.source == "vlm_bbox"
+        assert (roi.x, roi.y, roi.width, roi.height) == (300, 200, 120, 120)
+
+    def test_cached_roi_reused_for_same_scene(self, monkeypatch):
+        """Test detection is skipped for a near-identical frame."""
+        selector = ROISelector()
+        frame = scene_with_jar()
+        first = selector.select(frame)
+
+        monkeypatch.setattr(selector, "_detect_contour_roi", lambda f: pytest.fail("re-detected"))
+        assert selector.select(frame.copy()) is first
+
+    def test_invalid_bbox_ignored(self):
+        """Test malformed VLM boxes do not replace the ROI."""
+        frame = scene_with_jar()
+        selector = ROISelector()
+        crop = ROICrop(frame, None, 1.0)
+
+        selector.update_from_vlm({"recognized_items": [{"bbox": [1, 2]}, {"bbox": "x"}]}, crop, frame)
+
+        assert selector.select(frame).source == "contour"
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
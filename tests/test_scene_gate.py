@@ -0,0 +1,107 @@
+# test_scene_gate.py
+"""
+Unit tests for the scene stability gate
+Tests downscaling, sharpness and motion measures, and change detection.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from scene_gate import SceneGate, downscale_gray, frame_difference, laplacian_variance
+
+
+def checkerboard(size: int = 8) -> np.ndarray:
+    """Sharp high-contrast BGR test frame (480x640)."""
+    tile = np.kron((np.indices((480 // size, 640 // size)).sum(axis=0) % 2),
+                   np.ones((size, size))) * 255
+    return np.repeat(tile[:, :, None], 3, axis=2).astype(np.uint8)
+
+
+class FakeCamera:
+    """Minimal CameraService stand-in serving a fixed frame sequence."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def latest(self):
+        return self.frames[self.index], float(self.index)
+
+    def wait_for_frame(self, after, timeout=1.0):
+        if self.index + 1 >= len(self.frames):
+            return None
+        self.index += 1
+        return self.frames[self.index], float(self.index)
+
+
+class TestMeasures:
+    """Test vectorized image measures."""
+
+    def test_downscale_shape(self):
+        """Test block averaging reduces each axis by the factor."""
+        small = downscale_gray(np.zeros((480, 640, 3), dtype=np.uint8), factor=4)
+        assert small.shape == (120, 160)
+        assert small.dtype == np.float32
+
+    def test_sharp_beats_flat(self):
+        """Test a textured frame scores sharper than a flat one."""
+        sharp = laplacian_variance(downscale_gray(checkerboard(16)))
+        flat = laplacian_variance(downscale_gray(np.full((480, 640, 3), 128, np.uint8)))
+        assert sharp > 100 * (flat + 1)
+
+    def test_frame_difference(self):
+        """Test identical frames have zero difference."""
+        a = downscale_gray(checkerboard())
+        assert frame_difference(a, a.copy()) == 0.0
+        assert frame_difference(a, 255 - a) > 50
+
+
+class TestSceneGate:
+    """Test gating decisions."""
+
+    def test_waits_for_stable_frame(self):
+        """Test moving frames are skipped until the scene settles."""
+        moving = [np.roll(checkerboard(16), 8 * i, axis=1) for i in range(3)]
+        still = [checkerboard(16)] * 3
+        camera = FakeCamera(moving + still)
+        gate = SceneGate(stable_frames=2)
+
+        frame = gate.wait_for_stable(camera, deadline=1.0)
+
+        assert frame is not None
+        assert camera.index >= len(moving) + 1
+
+    def test_deadline_returns_best_frame(self):
+        """Test a frame is still returned when the scene never settles."""
+        frames = [np.roll(checkerboard(16), 8 * i, axis=1) for i in range(4)]
+        gate = SceneGate()
+
+        assert gate.wait_for_stable(FakeCamera(frames), deadline=0.5) is not None
+
+    def test_returns_owned_copy(self):
+        """Test the returned frame is not affected when the camera reuses its slot."""
+        slot = checkerboard(16)
+        gate = SceneGate(stable_frames=2)
+
+        frame = gate.wait_for_stable(FakeCamera([slot] * 4), deadline=1.0)
+        slot[:] = 17
+
+        assert not np.shares_memory(frame, slot)
+        assert frame.min() != 17
+
+    def test_change_detection(self):
+        """Test unchanged scenes are detected after an analysis."""
+        gate = SceneGate()
+        frame = checkerboard()
+        assert gate.has_changed(frame)
+
+        gate.mark_analyzed(frame)
+        assert not gate.has_changed(frame.copy())
+        assert gate.has_changed(255 - frame)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
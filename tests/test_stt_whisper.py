@@ -0,0 +1,582 @@
+# test_stt_whisper.py
+"""
+Unit tests for Whisper STT module
+Tests the resident whisper-server backend and in-memory PCM hand-off.
+"""
+
+import sys
+import io
+import json
+import wave
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import queue
+import time
+
+import pytest
+import numpy as np
+from stt_whisper import (
+    AudioRingBuffer, KeywordSpotter, SpeechSegment, UtteranceQueue, WhisperSTT, audio_to_wav_bytes, build_command_grammar,
+    dtw_distance, mfcc, save_audio_wav, voiced_duration
+)
+from image_transport import _shared_memory_dir
+from vad import EnergyVAD
+
+SAMPLE_RATE = 16000
+
+
+def tone_word(freqs, duration, noise=0.0, seed=0):
+    """Synthetic 'word': a gliding tone through the given frequencies."""
+    n = int(SAMPLE_RATE * duration)
+    f = np.interp(np.linspace(0, 1, n), np.linspace(0, 1, len(freqs)), freqs)
+    phase = 2 * np.pi * np.cumsum(f) / SAMPLE_RATE
+    audio = (0.5 * np.sin(phase) + 0.25 * np.sin(2 * phase)) * np.hanning(n)
+    audio += noise * np.random.default_rng(seed).standard_normal(n)
+    return audio.astype(np.float32)
+
+
+COMMANDS = {
+    "next step": [300, 800, 400],
+    "repeat": [900, 300, 900],
+    "help": [500, 500, 1200],
+    "stop": [1200, 400, 200],
+}
+
+
+@pytest.fixture
+def spotter():
+    """Keyword spotter enrolled with two examples per command."""
+    kws = KeywordSpotter(SAMPLE_RATE)
+    for command, freqs in COMMANDS.items():
+        kws.enroll(command, tone_word(freqs, 0.6, noise=0.02, seed=5))
+        kws.enroll(command, tone_word(freqs, 0.75, noise=0.02, seed=6))
+    return kws
+
+
+class StubWhisperHandler(BaseHTTPRequestHandler):
+    """Minimal whisper-server stand-in: /health and /inference."""
+
+    bodies = []
+
+    def do_GET(self):
+        self._reply(200 if self.path == "/health" else 404, {"status": "ok"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        StubWhisperHandler.bodies.append(self.rfile.read(length))
+        self._reply(200, {"text": " Next step\n"})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Run the stub server on a free local port."""
+    StubWhisperHandler.bodies = []
+    server = HTTPServer(("127.0.0.1", 0), StubWhisperHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+WHISPER_CLI = """#!/usr/bin/env python3
+import sys
+if "--output-txt" in sys.argv:
+    # Like whisper.cpp: the transcript is also written next to the input
+    with open(sys.argv[sys.argv.index("-f") + 1] + ".txt", "w") as f:
+        f.write("Next step.")
+print(" Next step.", flush=True)
+"""
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    """Create a placeholder GGML model file."""
+    path = tmp_path / "ggml-base.en.bin"
+    path.write_bytes(b"ggml")
+    return path
+
+
+class TestWavEncoding:
+    """Test in-memory WAV encoding."""
+
+    def test_float32_round_trip(self):
+        """Test float32 PCM is encoded as 16-bit mono WAV."""
+        audio = np.linspace(-1.0, 1.0, 1600, dtype=np.float32)
+        data = audio_to_wav_bytes(audio, 16000)
+
+        with wave.open(io.BytesIO(data), 'rb') as wav_file:
+            assert wav_file.getnchannels() == 1
+            assert wav_file.getsampwidth() == 2
+            assert wav_file.getframerate() == 16000
+            assert wav_file.getnframes() == 1600
+
+    def test_int16_passthrough(self):
+        """Test int16 PCM is written unchanged."""
+        audio = np.array([0, 1000, -1000], dtype=np.int16)
+        data = audio_to_wav_bytes(audio, 16000)
+
+        assert data.endswith(audio.tobytes())
+
+
+class TestServerBackend:
+    """Test the resident whisper-server backend."""
+
+    def test_transcribe_buffer_via_server(self, stub_server, model_file):
+        """Test PCM buffers are sent to the server without temp files."""
+        stt = WhisperSTT(str(model_file), backend="server", server_url=stub_server)
+        audio = np.zeros(16000, dtype=np.float32)
+
+        text, latency = stt.transcribe_buffer(audio)
+
+        assert text == "Next step"
+        assert latency >= 0.0
+        assert stt.last_latency == latency
+        assert b"RIFF" in StubWhisperHandler.bodies[0]
+
+    def test_fallback_when_server_unreachable(self, model_file):
+        """Test unreachable server falls back to the subprocess/mock path."""
+        stt = WhisperSTT(str(model_file), backend="server",
+                         server_url="http://127.0.0.1:9", server_timeout=1.0)
+        stt.whisper_cpp_path = None  # force mock transcription
+
+        text, _ = stt.transcribe_buffer(np.zeros(1600, dtype=np.float32))
+
+        assert text == "What's in the spoon?"
+
+    def test_subprocess_wav_files_unique(self, model_file, monkeypatch):
+        """Test overlapping subprocess decodes each read their own WAV file."""
+        stt = WhisperSTT(str(model_file))
+        both_open = threading.Barrier(2, timeout=2.0)
+        seen = {}
+
+        def transcribe_audio(path):
+            with wave.open(path) as wav:
+                frames = wav.getnframes()
+            both_open.wait()
+            seen[frames] = path
+            return "ok"
+
+        monkeypatch.setattr(stt, "transcribe_audio", transcribe_audio)
+        workers = [threading.Thread(target=stt.transcribe_buffer, args=(np.zeros(n, dtype=np.float32),))
+                   for n in (1600, 3200)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert set(seen) == {1600, 3200}
+        assert seen[1600] != seen[3200]
+        assert not any(Path(path).exists() for path in seen.values())
+
+    def test_subprocess_leaves_no_files(self, model_file, tmp_path):
+        """Test a subprocess decode leaves no chef_* files in shared memory."""
+        whisper = tmp_path / "whisper-cli"
+        whisper.write_text(WHISPER_CLI)
+        whisper.chmod(0o755)
+        stt = WhisperSTT(str(model_file))
+        stt.whisper_cpp_path = whisper
+        shared = Path(_shared_memory_dir())
+        before = set(shared.glob("chef_*"))
+
+        text, _ = stt.transcribe_buffer(np.zeros(1600, dtype=np.float32))
+
+        assert text == "Next step."
+        assert set(shared.glob("chef_*")) == before
+
+
+class TestKeywordSpotting:
+    """Test the MFCC + DTW keyword spotter."""
+
+    def test_mfcc_shape(self):
+        """Test one feature row per 20 ms hop, c0 dropped."""
+        features = mfcc(np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+
+        assert features.shape == (49, 12)
+
+    def test_dtw_tolerates_tempo(self):
+        """Test DTW distance is smaller for the same word spoken slower."""
+        word = mfcc(tone_word(COMMANDS["repeat"], 0.6))
+        slower = mfcc(tone_word(COMMANDS["repeat"], 0.8))
+        other = mfcc(tone_word(COMMANDS["help"], 0.6))
+
+        assert dtw_distance(word, slower) < dtw_distance(word, other)
+
+    @pytest.mark.parametrize("command", list(COMMANDS))
+    def test_spots_commands(self, spotter, command):
+        """Test noisy, re-timed commands are recognized."""
+        result = spotter.spot(tone_word(COMMANDS[command], 0.7, noise=0.03, seed=1))
+
+        assert result is not None
+        assert result[0] == command
+
+    def test_rejects_unknown_audio(self, spotter):
+        """Test noise and unknown words fall through to Whisper."""
+        noise = 0.1 * np.random.default_rng(2).standard_normal(12000).astype(np.float32)
+
+        assert spotter.spot(noise) is None
+        assert spotter.spot(tone_word([600, 600, 600], 0.8)) is None
+
+    def test_long_utterances_skipped(self, spotter):
+        """Test open-ended speech is not matched."""
+        assert spotter.spot(np.zeros(SAMPLE_RATE * 3, dtype=np.float32)) is None
+
+    def test_load_templates(self, tmp_path):
+        """Test templates load from per-command directories."""
+        for command, freqs in COMMANDS.items():
+            (tmp_path / command).mkdir()
+            save_audio_wav(tone_word(freqs, 0.6), str(tmp_path / command / "1.wav"), SAMPLE_RATE)
+
+        kws = KeywordSpotter(SAMPLE_RATE)
+
+        assert kws.load_templates(str(tmp_path)) == 4
+        assert kws.spot(tone_word(COMMANDS["stop"], 0.65))[0] == "stop"
+
+    def test_recognize_skips_whisper(self, spotter, model_file, monkeypatch):
+        """Test spotted commands never reach Whisper."""
+        stt = WhisperSTT(str(model_file), keyword_spotter=spotter)
+        monkeypatch.setattr(stt, "transcribe_buffer", lambda audio: pytest.fail("whisper called"))
+
+        text, _ = stt.recognize(tone_word(COMMANDS["next step"], 0.6))
+
+        assert text == "next step"
+        assert stt.kws_hits == 1
+
+
+FAKE_WHISPER = """#!/usr/bin/env python3
+import json, os, sys
+with open(sys.argv[0] + ".args", "w") as f:
+    f.write("\\n".join(sys.argv[1:]))
+p = float(os.environ.get("FAKE_WHISPER_P", "0.9"))
+if "-ojf" in sys.argv:
+    tokens = [{"text": "[_BEG_]", "p": 0.1}, {"text": " Next", "p": p}, {"text": " step", "p": p}]
+    with open(sys.argv[sys.argv.index("-of") + 1] + ".json", "w") as f:
+        json.dump({"transcription": [{"text": " Next step.", "tokens": tokens}]}, f)
+sys.stderr.write("whisper_init: " + "x" * 200000 + "\\n")  # More than a pipe buffer
+print(" Next step.", flush=True)
+"""
+
+
+@pytest.fixture
+def fake_whisper(tmp_path):
+    """whisper.cpp stand-in with a full JSON output and a chatty log."""
+    path = tmp_path / "whisper-cli"
+    path.write_text(FAKE_WHISPER)
+    path.chmod(0o755)
+    return path
+
+
+class TestConstrainedDecoding:
+    """Test command-vocabulary constrained transcription."""
+
+    def test_grammar(self):
+        """Test the grammar lists commands and optional terms."""
+        grammar = build_command_grammar(["next step", "how much"], ["turmeric"])
+
+        assert 'command ::= [nN] "ext step" | [hH] "ow much"' in grammar
+        assert 'term ::= [tT] "urmeric"' in grammar
+        assert grammar.startswith("root ::=")
+
+    def test_vocabulary_prompt(self, model_file):
+        """Test ingredients are normalized into the prompt."""
+        stt = WhisperSTT(str(model_file))
+        stt.set_command_vocabulary(["Next step", "repeat"], ["mustard_seeds"])
+
+        assert stt.command_phrases == ["next step", "repeat"]
+        assert "mustard seeds" in stt.command_prompt
+
+    def test_confident_command_accepted(self, model_file, fake_whisper, monkeypatch):
+        """Test grammar output above the confidence threshold is used as is."""
+        stt = WhisperSTT(str(model_file))
+        stt.whisper_cpp_path = fake_whisper
+        stt.set_command_vocabulary(["next step"])
+        monkeypatch.setattr(stt, "transcribe_buffer", lambda audio: pytest.fail("re-decoded"))
+
+        text, latency = stt.recognize(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+        assert text == "Next step."
+        assert latency < 2.0
+        args = (fake_whisper.parent / "whisper-cli.args").read_text().split("\n")
+        assert "--grammar" in args and "--prompt" in args
+        assert not list(Path(_shared_memory_dir()).glob(Path(args[args.index("-of") + 1]).name + "*"))
+
+    def test_unconfident_command_rejected(self, model_file, fake_whisper, monkeypatch):
+        """Test non-command speech forced into a command is dropped, not decoded twice."""
+        monkeypatch.setenv("FAKE_WHISPER_P", "0.2")
+        stt = WhisperSTT(str(model_file))
+        stt.whisper_cpp_path = fake_whisper
+        stt.set_command_vocabulary(["next step"])
+        monkeypatch.setattr(stt, "transcribe_buffer", lambda audio: pytest.fail("re-decoded"))
+
+        assert stt.recognize(np.zeros(SAMPLE_RATE, dtype=np.float32))[0] == ""
+        assert stt.grammar_rejections == 1
+
+    def test_command_length_ignores_silence(self, model_file, monkeypatch):
+        """Test pre-roll and trailing silence do not push a command past the limit."""
+        stt = WhisperSTT(str(model_file))
+        stt.set_command_vocabulary(["next step"])
+        monkeypatch.setattr(stt, "transcribe_command", lambda audio: ("next step", 0.1))
+        monkeypatch.setattr(stt, "transcribe_buffer", lambda audio: pytest.fail("unconstrained"))
+        audio = np.concatenate(speech_chunks(0.3, 0.0) + speech_chunks(2.0) + speech_chunks(1.5, 0.0))
+
+        assert voiced_duration(audio, SAMPLE_RATE) == pytest.approx(2.0, abs=0.05)
+        assert stt.recognize(audio)[0] == "next step"
+
+    def test_long_utterances_unconstrained(self, model_file, monkeypatch):
+        """Test open-ended speech uses free-form transcription."""
+        stt = WhisperSTT(str(model_file))
+        stt.set_command_vocabulary(["next step"])
+        monkeypatch.setattr(stt, "transcribe_command", lambda audio: pytest.fail("constrained"))
+        monkeypatch.setattr(stt, "transcribe_buffer", lambda audio: ("long text", 0.1))
+
+        assert stt.recognize(np.zeros(SAMPLE_RATE * 5, dtype=np.float32))[0] == "long text"
+
+
+def speech_chunks(seconds, level=0.3):
+    """100 ms capture chunks of loud tone (speech) or silence (level 0)."""
+    chunk = (level * np.sin(np.arange(1600) * 0.2)).astype(np.float32)
+    return [chunk] * int(round(seconds * 10))
+
+
+class TestStreaming:
+    """Test partial transcription with early intent dispatch."""
+
+    @pytest.fixture
+    def stt(self, model_file, stub_server):
+        stt = WhisperSTT(str(model_file), backend="server", server_url=stub_server, streaming=True)
+        stt.set_command_vocabulary(["next step", "repeat"], matcher=lambda t: t.startswith("next"))
+        stt.dispatched = []
+        stt.result_callback = stt.dispatched.append
+        return stt
+
+    def test_stable_prefix_dispatches(self, stt, monkeypatch):
+        """Test a command is dispatched once two partials agree on it."""
+        hypotheses = iter(["Next", "Next step", "Next step please"])
+        monkeypatch.setattr(stt, "recognize", lambda audio: (next(hypotheses), 0.1))
+        audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+
+        assert stt.process_partial(1, audio) is None
+        assert stt.process_partial(1, audio) == "next"
+        assert stt.process_partial(1, audio) is None  # utterance already claimed
+        assert stt.dispatched == ["next"]
+
+    def test_requires_server_backend(self, model_file):
+        """Test streaming is refused when every partial would start a subprocess."""
+        assert not WhisperSTT(str(model_file), streaming=True).streaming
+
+    def test_claims_are_per_utterance(self, stt):
+        """Test dispatching a later utterance leaves earlier queued ones alone."""
+        assert stt._claim(4)
+
+        assert stt._is_claimed(4)
+        assert not stt._is_claimed(3)
+        assert stt._claim(3)
+        assert not stt._claim(4)
+
+    def test_unstable_or_unmatched_waits(self, stt, monkeypatch):
+        """Test changing or non-command hypotheses are not dispatched."""
+        hypotheses = iter(["Neck", "Next", "Repeat", "Repeat"])
+        monkeypatch.setattr(stt, "recognize", lambda audio: (next(hypotheses), 0.1))
+        audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+
+        for uid in (1, 1, 2, 2):
+            assert stt.process_partial(uid, audio) is None
+        assert stt.dispatched == []
+
+    def test_partials_submitted_while_speaking(self, stt):
+        """Test the capture path hands growing windows to the partial decoder."""
+        for chunk in speech_chunks(0.5):
+            stt._handle_chunk(chunk)
+
+        uid, window = stt._partial_queue.get_nowait()
+        assert uid == 1
+        assert len(window) == SAMPLE_RATE // 2
+
+    def test_dispatched_utterance_not_queued(self, stt, monkeypatch):
+        """Test the silence fallback skips utterances already dispatched."""
+        monkeypatch.setattr(stt, "recognize", lambda audio: ("next step", 0.1))
+        for chunk in speech_chunks(1.0):
+            stt._handle_chunk(chunk)
+            if not stt._partial_queue.empty():
+                stt.process_partial(*stt._partial_queue.get_nowait())
+        for chunk in speech_chunks(1.5, level=0.0):
+            stt._handle_chunk(chunk)
+
+        assert stt.dispatched == ["next step"]
+        assert stt.audio_queue.empty()
+
+    def test_silence_fallback(self, model_file):
+        """Test non-streaming capture queues the utterance after the silence timeout."""
+        stt = WhisperSTT(str(model_file))
+        for chunk in speech_chunks(1.0) + speech_chunks(1.5, level=0.0):
+            stt._handle_chunk(chunk)
+
+        segment = stt.audio_queue.get_nowait()
+        assert segment.uid == 1
+        assert len(segment.audio) == int(2.5 * SAMPLE_RATE)
+        assert not stt.is_speech_active
+
+
+class TestRingBuffer:
+    """Test the preallocated capture ring buffer."""
+
+    def test_view_across_wrap_is_contiguous(self):
+        """Test spans crossing the end of the ring come back in order, uncopied."""
+        ring = AudioRingBuffer(10)
+        ring.write(np.arange(8, dtype=np.float32))
+        ring.write(np.arange(8, 14, dtype=np.float32))
+
+        view = ring.view(6, 14)
+
+        assert view.tolist() == list(range(6, 14))
+        assert np.shares_memory(view, ring._data)
+        assert not view.flags.writeable
+
+    def test_overwritten_span_rejected(self):
+        """Test samples older than the capacity are reported as gone."""
+        ring = AudioRingBuffer(10)
+        ring.write(np.zeros(25, dtype=np.float32))
+
+        assert ring.oldest == 15
+        assert not ring.is_valid(14)
+        with pytest.raises(ValueError):
+            ring.view(10, 20)
+
+    def test_pre_roll_kept(self, model_file):
+        """Test the audio just before the VAD trigger is part of the utterance."""
+        stt = WhisperSTT(str(model_file), pre_roll=0.3)
+        for chunk in speech_chunks(1.0, level=0.0) + speech_chunks(1.0) + speech_chunks(1.5, level=0.0):
+            stt._handle_chunk(chunk)
+
+        segment = stt.audio_queue.get_nowait()
+        assert len(segment.audio) == int(2.8 * SAMPLE_RATE)
+        assert segment.start == int(0.7 * SAMPLE_RATE)
+        assert np.abs(segment.audio[:int(0.3 * SAMPLE_RATE)]).max() == 0.0
+
+    def test_long_speech_cut_off(self, model_file):
+        """Test utterances are ended at max_speech_duration."""
+        stt = WhisperSTT(str(model_file), max_speech_duration=2.0)
+        for chunk in speech_chunks(3.0):
+            stt._handle_chunk(chunk)
+
+        assert len(stt.audio_queue.get_nowait().audio) == 2 * SAMPLE_RATE
+
+    def test_vad_engine_pluggable(self, model_file):
+        """Test a custom VAD engine drives segmentation and counts passed utterances."""
+        vad = EnergyVAD(threshold=0.5)
+        stt = WhisperSTT(str(model_file), vad=vad)
+        for chunk in speech_chunks(1.0) + speech_chunks(1.5, level=0.0):
+            stt._handle_chunk(chunk)
+
+        assert stt.audio_queue.empty()  # 0.3 level tone is below this threshold
+        vad.threshold = 0.1
+        for chunk in speech_chunks(1.0) + speech_chunks(1.5, level=0.0):
+            stt._handle_chunk(chunk)
+
+        assert not stt.audio_queue.empty()
+        assert vad.metrics.triggers == 1
+        assert vad.metrics.passed == 1
+
+    def test_overrun_segment_dropped(self, model_file):
+        """Test an utterance overwritten before transcription is not delivered."""
+        stt = WhisperSTT(str(model_file), buffer_duration=5.0)
+        for chunk in speech_chunks(1.0) + speech_chunks(6.0, level=0.0):
+            stt._handle_chunk(chunk)
+
+        assert not stt._segment_intact(stt.audio_queue.get_nowait())
+
+
+def segment(uid, seconds, start=None, age=0.0):
+    return SpeechSegment(uid, np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32),
+                         start=start, captured_at=time.monotonic() - age)
+
+
+class TestUtteranceQueue:
+    """Test the bounded, prioritized transcription queue."""
+
+    def test_short_utterances_first(self):
+        """Test likely commands jump ahead of long speech."""
+        q = UtteranceQueue(max_coalesced_duration=5.0)
+        q.put(segment(1, 4.0))
+        q.put(segment(2, 1.0))
+
+        assert q.get_nowait().uid == 2
+        assert q.get_nowait().uid == 1
+
+    def test_drop_oldest_when_full(self):
+        """Test the oldest regular item is dropped to make room."""
+        q = UtteranceQueue(maxsize=2, max_coalesced_duration=5.0)
+        q.put(segment(1, 1.0))
+        q.put(segment(2, 4.0))
+        q.put(segment(3, 4.0))  # Too long to merge with 2
+
+        assert [q.get_nowait().uid for _ in range(2)] == [1, 3]
+        assert q.stats()['dropped_full'] == 1
+
+    def test_stale_items_dropped(self):
+        """Test items past their deadline are never returned."""
+        q = UtteranceQueue(max_age=6.0)
+        q.put(segment(1, 1.0, age=10.0))
+        q.put(segment(2, 1.0))
+
+        assert q.get_nowait().uid == 2
+        assert q.stats()['dropped_stale'] == 1
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.05)
+
+    def test_coalesce_ring_segments(self):
+        """Test adjacent long segments become one zero-copy view."""
+        ring = AudioRingBuffer(20 * SAMPLE_RATE)
+        ring.write(np.arange(12 * SAMPLE_RATE, dtype=np.float32))
+        q = UtteranceQueue(ring=ring)
+        q.put(SpeechSegment(1, ring.view(0, 4 * SAMPLE_RATE), start=0))
+        q.put(SpeechSegment(2, ring.view(4 * SAMPLE_RATE, 10 * SAMPLE_RATE), start=4 * SAMPLE_RATE))
+
+        merged = q.get_nowait()
+        assert merged.uid == 1
+        assert merged.merged_uids == [2]
+        assert len(merged.audio) == 10 * SAMPLE_RATE
+        assert np.shares_memory(merged.audio, ring._data)
+        assert q.stats() == {'depth': 0, 'priority_depth': 0, 'dropped_full': 0,
+                             'dropped_stale': 0, 'coalesced': 1}
+
+    def test_coalesce_skips_audio_between_segments(self):
+        """Test a priority command between two long segments is not merged in."""
+        ring = AudioRingBuffer(20 * SAMPLE_RATE)
+        ring.write(np.arange(12 * SAMPLE_RATE, dtype=np.float32))
+        q = UtteranceQueue(ring=ring)
+        q.put(SpeechSegment(1, ring.view(0, 4 * SAMPLE_RATE), start=0))
+        q.put(SpeechSegment(2, ring.view(5 * SAMPLE_RATE, 6 * SAMPLE_RATE), start=5 * SAMPLE_RATE))
+        q.put(SpeechSegment(3, ring.view(7 * SAMPLE_RATE, 11 * SAMPLE_RATE), start=7 * SAMPLE_RATE))
+
+        assert q.get_nowait().uid == 2
+        merged = q.get_nowait()
+        assert (merged.uid, merged.merged_uids) == (1, [3])
+        assert len(merged.audio) == 8 * SAMPLE_RATE
+        command = np.arange(5 * SAMPLE_RATE, 6 * SAMPLE_RATE, dtype=np.float32)
+        assert not np.isin(command, merged.audio).any()
+
+    def test_get_waits_for_put(self):
+        """Test a blocked consumer wakes up when a segment arrives."""
+        q = UtteranceQueue()
+        threading.Timer(0.05, q.put, args=(segment(1, 1.0),)).start()
+
+        assert q.get(timeout=2.0).uid == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,499 @@
+# test_tts_piper.py
+"""
+Unit tests for Piper TTS module
+Tests the resident streaming Piper process against a stand-in executable.
+"""
+
+import sys
+import stat
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from tts_piper import (
+    PhraseCache, PiperStream, PiperTTS, RawAudioPlayer, SpeechPriority, SpeechScheduler,
+    format_quantity_speech
+)
+
+
+FAKE_PIPER = """#!{python}
+import os, sys, time, wave
+mode = os.environ.get("FAKE_PIPER_MODE", "")
+if "--output_file" in sys.argv:
+    # Per-sentence mode: whole stdin becomes one WAV file
+    text = sys.stdin.read().strip()
+    with wave.open(sys.argv[sys.argv.index("--output_file") + 1], "wb") as f:
+        f.setnchannels(1); f.setsampwidth(2); f.setframerate(16000)
+        f.writeframes(b"\\x00\\x00" * 160 * len(text))
+    sys.exit(0)
+for line in sys.stdin:
+    # 10 ms of 16 kHz silence per character, written in two chunks
+    data = b"\\x00\\x00" * 160 * len(line.strip())
+    half = len(data) // 2
+    sys.stdout.buffer.write(data[:half]); sys.stdout.buffer.flush()
+    if mode == "pause":
+        time.sleep(0.5)  # Pause between sentences
+    sys.stdout.buffer.write(data[half:]); sys.stdout.buffer.flush()
+    if mode != "unfinished":
+        sys.stderr.write("[piper] [info] Real-time factor: 0.1\\n"); sys.stderr.flush()
+"""
+
+
+@pytest.fixture
+def fake_piper(tmp_path):
+    """Create an executable that mimics `piper --output_raw`."""
+    path = tmp_path / "piper"
+    path.write_text(FAKE_PIPER.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return path
+
+
+class TestPiperStream:
+    """Test the resident Piper process."""
+
+    def test_synthesize_streams_chunks(self, fake_piper, tmp_path):
+        """Test audio is delivered to the callback and returned whole."""
+        stream = PiperStream(fake_piper, tmp_path / "voice.onnx")
+        assert stream.start()
+
+        chunks = []
+        pcm = stream.synthesize("Next step", on_chunk=chunks.append)
+        stream.close()
+
+        assert pcm is not None
+        assert len(pcm) == 2 * 160 * len("Next step")
+        assert b"".join(chunks) == pcm
+
+    def test_process_reused_between_utterances(self, fake_piper, tmp_path):
+        """Test several utterances are served by one process."""
+        stream = PiperStream(fake_piper, tmp_path / "voice.onnx")
+        assert stream.start()
+        pid = stream.process.pid
+
+        first = stream.synthesize("Hello")
+        second = stream.synthesize("Hello\nthere")
+        assert stream.process.pid == pid
+        stream.close()
+
+        assert len(first) == 2 * 160 * len("Hello")
+        assert len(second) == 2 * 160 * len("Hello there")
+
+    def test_pause_does_not_truncate(self, fake_piper, tmp_path, monkeypatch):
+        """Test a pause between sentences does not end the utterance early."""
+        monkeypatch.setenv("FAKE_PIPER_MODE", "pause")
+        stream = PiperStream(fake_piper, tmp_path / "voice.onnx")
+        assert stream.start()
+
+        pcm = stream.synthesize("Next step")
+        stream.close()
+
+        assert len(pcm) == 2 * 160 * len("Next step")
+
+    def test_slow_sink_gets_whole_utterance(self, fake_piper, tmp_path):
+        """Test a sink slower than synthesis neither truncates nor loses the tail."""
+        stream = PiperStream(fake_piper, tmp_path / "voice.onnx")
+        assert stream.start()
+
+        chunks = []
+
+        def slow_sink(data):
+            time.sleep(0.1)  # Playback-speed device write
+            chunks.append(data)
+
+        text = "Add the mustard seeds and wait until they splutter. " * 4
+        pcm = stream.synthesize(text, on_chunk=slow_sink)
+        stream.close()
+
+        assert len(pcm) == 2 * 160 * len(text.strip())
+        assert b"".join(chunks) == pcm
+
+    def test_unfinished_utterance_not_returned(self, fake_piper, tmp_path, monkeypatch):
+        """Test audio without a completion line is not returned (or cached)."""
+        monkeypatch.setenv("FAKE_PIPER_MODE", "unfinished")
+        stream = PiperStream(fake_piper, tmp_path / "voice.onnx")
+        assert stream.start()
+
+        chunks = []
+        pcm = stream.synthesize("Next step", on_chunk=chunks.append, timeout=1.0)
+        stream.close()
+
+        assert pcm is None
+        assert chunks
+
+    def test_synthesize_after_close_fails(self, fake_piper, tmp_path):
+        """Test a dead process reports failure instead of hanging."""
+        stream = PiperStream(fake_piper, tmp_path / "voice.onnx")
+        assert stream.start()
+        stream.close()
+
+        assert stream.synthesize("Hello") is None
+
+
+class TestPhraseCache:
+    """Test the synthesized-audio cache."""
+
+    def test_key_depends_on_voice_settings(self):
+        """Test keys differ when any synthesis parameter differs."""
+        base = PhraseCache.make_key("Next step", "amy.onnx", 0, 1.0)
+
+        assert base == PhraseCache.make_key("Next step", "amy.onnx", 0, 1.0)
+        assert base != PhraseCache.make_key("Next step", "amy.onnx", 1, 1.0)
+        assert base != PhraseCache.make_key("Next step", "amy.onnx", 0, 1.2)
+        assert base != PhraseCache.make_key("Next step", "lessac.onnx", 0, 1.0)
+
+    def test_hit_rate(self):
+        """Test hits and misses are counted."""
+        cache = PhraseCache()
+        assert cache.get("a") is None
+        cache.put("a", b"pcm")
+        assert cache.get("a") == b"pcm"
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_memory_lru_eviction(self):
+        """Test least recently used entries are evicted first."""
+        cache = PhraseCache(max_memory_bytes=8)
+        cache.put("a", b"1234")
+        cache.put("b", b"5678")
+        cache.get("a")  # a becomes most recent
+        cache.put("c", b"9999")
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_disk_persistence(self, tmp_path):
+        """Test entries survive a new cache instance."""
+        PhraseCache(cache_dir=str(tmp_path)).put("a", b"pcm-data")
+
+        cache = PhraseCache(cache_dir=str(tmp_path))
+        assert cache.get("a") == b"pcm-data"
+        assert cache.stats()["disk_bytes"] == len(b"pcm-data")
+
+    def test_disk_budget(self, tmp_path):
+        """Test the disk store is trimmed to its budget."""
+        cache = PhraseCache(cache_dir=str(tmp_path), max_disk_bytes=10)
+        cache.put("a", b"123456")
+        cache.put("b", b"123456")
+
+        assert cache.stats()["disk_bytes"] <= 10
+        assert len(list(tmp_path.glob("*.pcm"))) == 1
+
+
+class TestPresynthesis:
+    """Test rendering utterances ahead of time."""
+
+    @pytest.fixture
+    def tts(self, fake_piper, tmp_path):
+        """Create a TTS instance driving the stand-in Piper."""
+        tts = PiperTTS(str(tmp_path / "voice.onnx"),
+                       phrase_cache=PhraseCache(cache_dir=str(tmp_path / "cache")))
+        tts.piper_path = fake_piper
+        return tts
+
+    def test_presynthesize_fills_cache(self, tts):
+        """Test utterances are cached and later speech is a cache hit."""
+        texts = ["Step 1 of 2. Heat oil.", "Caution! Hot oil."]
+
+        assert tts.presynthesize(texts) == 2
+        assert tts.speak("Step 1 of 2. Heat oil.", blocking=False)
+        assert tts.cache_stats()["hits"] == 1
+
+    def test_prefetch_not_counted(self, tts):
+        """Test only playback lookups count toward the hit rate."""
+        assert tts.presynthesize(["Step 1 of 1. Serve hot."]) == 1
+        assert tts.synthesize("Step 1 of 1. Serve hot.") is not None
+        assert tts.synthesize("Heat oil.") is not None
+
+        stats = tts.cache_stats()
+        assert (stats["hits"], stats["misses"]) == (0, 0)
+
+    def test_bundle_skipped_when_complete(self, tts):
+        """Test a cached bundle is not rendered again."""
+        texts = ["Step 1 of 1. Serve hot."]
+
+        assert tts.presynthesize(texts, bundle_id="abc") == 1
+        assert tts.presynthesize(texts, bundle_id="abc") == 0
+
+    def test_presynthesis_yields_to_live_speech(self, tts):
+        """Test presynthesis waits while other speech is queued or playing."""
+        busy = threading.Event()
+        busy.set()
+        thread = tts.presynthesize_async(["Step 1 of 1. Serve hot."], busy=busy.is_set)
+
+        time.sleep(0.3)
+        assert thread.is_alive()
+        assert tts.cache_stats()["memory_entries"] == 0
+
+        busy.clear()
+        thread.join(timeout=5.0)
+        assert not thread.is_alive()
+        assert tts.speak("Step 1 of 1. Serve hot.", blocking=False)
+        assert tts.cache_stats()["hits"] == 1
+
+    def test_format_step(self):
+        """Test step intro wording."""
+        assert PiperTTS.format_step("Serve.", 2, 5) == "Step 2 of 5. Serve."
+
+
+class FakeOutputStream:
+    """PyAudio output stream stand-in that records writes without blocking."""
+
+    def __init__(self):
+        self.written = []
+        self.aborted = 0
+
+    def write(self, data):
+        self.written.append(data)
+
+    def abort_stream(self):
+        self.aborted += 1
+
+    def start_stream(self):
+        pass
+
+
+@pytest.fixture
+def player():
+    player = RawAudioPlayer(16000)
+    player._stream = FakeOutputStream()
+    return player
+
+
+class TestCancellablePlayback:
+    """Test ducking and barge-in stops."""
+
+    def test_gain_and_odd_chunks(self, player):
+        """Test ducked audio is scaled and odd-sized chunks keep sample alignment."""
+        pcm = np.full(800, 1000, dtype=np.int16).tobytes()
+        player.gain = 0.5
+        player.write(pcm[:801])
+        player.write(pcm[801:])
+
+        samples = np.frombuffer(b"".join(player._stream.written), dtype=np.int16)
+        assert len(samples) == 800
+        assert (samples == 500).all()
+
+    def test_stop_discards_until_resume(self, player):
+        """Test audio written after stop() is dropped and drain() returns at once."""
+        player.write(b"\x00\x00" * 16000)
+        player.stop()
+        player.write(b"\x00\x00" * 800)
+
+        start = time.time()
+        player.drain()
+        assert time.time() - start < 0.1
+        assert not player.is_playing()
+        assert player._stream.aborted == 1
+
+        player.resume()
+        player.write(b"\x00\x00" * 800)
+        assert player.is_playing()
+
+    def test_speak_interrupted(self, fake_piper, tmp_path, player):
+        """Test stop() cuts off a blocking speak() from another thread."""
+        tts = PiperTTS(str(tmp_path / "voice.onnx"))
+        tts.piper_path = fake_piper
+        tts.player = player
+        text = tts._prepare_text("A long help message.")
+        tts.cache.put(tts.cache.make_key(text, str(tts.model_path), 0, 1.0), b"\x00\x00" * 32000)
+
+        threading.Timer(0.1, tts.stop).start()
+        start = time.time()
+
+        assert tts.speak("A long help message.") is False
+        assert time.time() - start < 1.0
+        assert tts.interruptions == 1
+        assert not tts.is_speaking()
+
+
+class TimedTTS:
+    """PiperTTS stand-in whose speak() takes `duration` seconds unless stopped."""
+
+    def __init__(self, duration=0.2, start_delay=0.0):
+        self.duration = duration
+        self.start_delay = start_delay  # Time between begin() and playback
+        self.spoken = []
+        self.synthesized = []
+        self.interruptions = 0
+        self._stopped = threading.Event()
+        self._speaking = False
+
+    def begin(self):
+        self._stopped.clear()
+        self._speaking = True
+
+    def speak(self, text):
+        time.sleep(self.start_delay)
+        self.spoken.append(text)
+        interrupted = self._stopped.wait(self.duration)
+        self._speaking = False
+        return not interrupted
+
+    def stop(self):
+        if self._speaking:
+            self.interruptions += 1
+            self._stopped.set()
+
+    def synthesize(self, text):
+        # Records whether an utterance was playing (begun) at the time
+        self.synthesized.append((text, self._speaking))
+
+    def is_speaking(self):
+        return self._speaking
+
+
+def wait_until_playing(tts, count=1):
+    deadline = time.time() + 2.0
+    while len(tts.spoken) < count and time.time() < deadline:
+        time.sleep(0.005)
+
+
+class TestSpeechScheduler:
+    """Test the non-blocking prioritized speech queue."""
+
+    def test_say_returns_immediately_in_priority_order(self):
+        """Test items queued behind a playing one are spoken most urgent first."""
+        tts = TimedTTS()
+        speech = SpeechScheduler(tts, preempt=False)
+
+        start = time.time()
+        speech.say("chatter 1")
+        wait_until_playing(tts)
+        speech.say("step", SpeechPriority.STEP)
+        speech.say("chatter 2")
+        speech.say("safety", SpeechPriority.SAFETY)
+        assert time.time() - start < 0.1
+
+        assert speech.wait_idle(timeout=3.0)
+        assert tts.spoken == ["chatter 1", "safety", "step", "chatter 2"]
+        speech.close()
+
+    def test_safety_preempts_and_step_resumes(self):
+        """Test a safety warning interrupts a step, which is then repeated."""
+        tts = TimedTTS(duration=0.5)
+        speech = SpeechScheduler(tts)
+
+        step = speech.say("Step 2 of 5. Add the oil.", SpeechPriority.STEP)
+        wait_until_playing(tts)
+        speech.say("Caution! Hot oil.", SpeechPriority.SAFETY)
+
+        assert step.wait(timeout=3.0) and step.spoken
+        assert tts.spoken == ["Step 2 of 5. Add the oil.", "Caution! Hot oil.", "Step 2 of 5. Add the oil."]
+        assert speech.stats()['preemptions'] == 1
+        speech.close()
+
+    def test_preempted_step_superseded_by_next_step(self):
+        """Test an interrupted step is not repeated once the next step is queued."""
+        tts = TimedTTS(duration=0.5)
+        speech = SpeechScheduler(tts)
+
+        step = speech.say("Step 2 of 5. Add the oil.", SpeechPriority.STEP)
+        wait_until_playing(tts)
+        speech.say("Caution! Hot oil.", SpeechPriority.SAFETY)
+        speech.say("Step 3 of 5. Add the mustard seeds.", SpeechPriority.STEP)
+
+        assert speech.wait_idle(timeout=3.0)
+        assert step.spoken is False
+        assert tts.spoken == ["Step 2 of 5. Add the oil.", "Caution! Hot oil.",
+                              "Step 3 of 5. Add the mustard seeds."]
+        speech.close()
+
+    def test_requeued_step_dropped_by_next_step(self):
+        """Test a step waiting to be repeated is dropped when a newer step arrives."""
+        tts = TimedTTS(duration=0.5)
+        speech = SpeechScheduler(tts)
+
+        step = speech.say("Step 2 of 5. Add the oil.", SpeechPriority.STEP)
+        wait_until_playing(tts)
+        speech.say("Caution! Hot oil.", SpeechPriority.SAFETY)
+        wait_until_playing(tts, 2)
+        speech.say("Step 3 of 5. Add the mustard seeds.", SpeechPriority.STEP)
+
+        assert speech.wait_idle(timeout=3.0)
+        assert step.spoken is False
+        assert tts.spoken == ["Step 2 of 5. Add the oil.", "Caution! Hot oil.",
+                              "Step 3 of 5. Add the mustard seeds."]
+        speech.close()
+
+    def test_safety_preempts_item_about_to_start(self):
+        """Test a safety warning arriving just as an item starts still cuts it off."""
+        tts = TimedTTS(duration=1.0, start_delay=0.2)
+        speech = SpeechScheduler(tts)
+
+        step = speech.say("Step 2 of 5. Add the oil.", SpeechPriority.STEP)
+        deadline = time.time() + 2.0
+        while not tts._speaking and time.time() < deadline:
+            time.sleep(0.005)
+        speech.say("Caution! Hot oil.", SpeechPriority.SAFETY)
+
+        assert step.wait(timeout=5.0)
+        assert tts.interruptions == 1
+        assert tts.spoken == ["Step 2 of 5. Add the oil.", "Caution! Hot oil.", "Step 2 of 5. Add the oil."]
+        speech.close()
+
+    def test_preempted_chatter_dropped(self):
+        """Test chatter cut off by a more urgent item is not repeated."""
+        tts = TimedTTS(duration=0.5)
+        speech = SpeechScheduler(tts)
+
+        chatter = speech.say("Analyzing...")
+        wait_until_playing(tts)
+        speech.say("This looks like turmeric.", SpeechPriority.STEP)
+
+        assert speech.wait_idle(timeout=3.0)
+        assert chatter.spoken is False
+        assert tts.spoken == ["Analyzing...", "This looks like turmeric."]
+        speech.close()
+
+    def test_next_item_synthesized_during_playback(self):
+        """Test lookahead synthesis of item N+1 while item N plays."""
+        tts = TimedTTS()
+        speech = SpeechScheduler(tts)
+
+        speech.say("first", SpeechPriority.STEP)
+        speech.say("second", SpeechPriority.STEP)
+
+        assert speech.wait_idle(timeout=3.0)
+        assert ("second", True) in tts.synthesized
+        speech.close()
+
+    def test_barge_in_drops_rest_of_response(self):
+        """Test an outside stop() drops queued speech except safety warnings."""
+        tts = TimedTTS(duration=0.5)
+        speech = SpeechScheduler(tts)
+
+        speech.say("Here is a long help message.", SpeechPriority.STEP)
+        rest = speech.say("And some more help.", SpeechPriority.STEP)
+        warning = speech.say("Caution! Hot oil.", SpeechPriority.SAFETY)
+        wait_until_playing(tts, 2)  # safety first, then the help message
+        tts.stop()
+
+        assert speech.wait_idle(timeout=3.0)
+        assert rest.spoken is False
+        assert warning.spoken is True
+        assert "And some more help." not in tts.spoken
+        speech.close()
+
+
+class TestFormatQuantitySpeech:
+    """Test natural quantity phrasing."""
+
+    def test_fractions(self):
+        """Test common fractions are spoken naturally."""
+        assert format_quantity_speech(0.5, "teaspoon") == "half a teaspoon"
+        assert format_quantity_speech(0.25, "cup") == "a quarter cup"
+
+    def test_plural(self):
+        """Test amounts above one pluralize the unit."""
+        assert format_quantity_speech(2.0, "cup") == "2.0 cups"
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,136 @@
+# test_vad.py
+"""
+Unit tests for the VAD engines
+Tests spectral speech detection against kitchen noises, noise floor tracking
+and trigger metrics.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from vad import EnergyVAD, SpectralVAD, create_vad
+
+SAMPLE_RATE = 16000
+CHUNK = 1600  # 100 ms capture chunks
+
+
+def voiced(seconds, f0=140.0, level=0.1):
+    """Synthetic vowel-like speech: harmonics shaped by two formants, syllable rate AM."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f = f0 * (1 + 0.03 * np.sin(2 * np.pi * 3 * t))
+    phase = 2 * np.pi * np.cumsum(f) / SAMPLE_RATE
+    audio = np.zeros_like(t)
+    for k in range(1, 25):
+        h = k * f0
+        gain = np.exp(-((h - 600) / 250) ** 2) + 0.6 * np.exp(-((h - 1700) / 400) ** 2) + 0.05
+        audio += gain * np.sin(k * phase)
+    audio *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    return (level * audio / np.abs(audio).max()).astype(np.float32)
+
+
+def noise(seconds, kind, level=0.1, seed=0):
+    """Kitchen noises: white hiss, sizzle (high-passed), fan (low-passed), whistle (tone)."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    if kind == "whistle":
+        audio = np.sin(2 * np.pi * 3000 * np.arange(n) / SAMPLE_RATE) + 0.05 * rng.standard_normal(n)
+    elif kind == "sizzle":
+        audio = np.diff(rng.standard_normal(n + 1))
+    elif kind == "fan":
+        audio = np.convolve(rng.standard_normal(n), np.ones(20) / 20, "same")
+    else:
+        audio = rng.standard_normal(n)
+    return (level * audio / np.abs(audio).max()).astype(np.float32)
+
+
+def run(vad, audio):
+    """Feed audio in capture chunks; return per-chunk decisions."""
+    return [vad.is_speech(audio[i:i + CHUNK]) for i in range(0, len(audio) - CHUNK + 1, CHUNK)]
+
+
+def quiet(seconds):
+    return noise(seconds, "white", level=0.002, seed=9)
+
+
+class TestSpectralVAD:
+    """Test the spectral detector."""
+
+    def test_detects_speech(self):
+        """Test speech after room tone is detected."""
+        vad = SpectralVAD()
+        decisions = run(vad, np.concatenate([quiet(1.0), voiced(1.0)]))
+
+        assert not any(decisions[:10])
+        assert sum(decisions[10:]) >= 9
+
+    @pytest.mark.parametrize("kind", ["white", "sizzle", "whistle"])
+    def test_ignores_kitchen_noise(self, kind):
+        """Test loud non-speech sounds do not trigger."""
+        vad = SpectralVAD()
+        decisions = run(vad, np.concatenate([quiet(1.0), noise(2.0, kind, level=0.3)]))
+
+        assert not any(decisions)
+        assert vad.metrics.triggers == 0
+
+    def test_adapts_to_stationary_fan(self):
+        """Test a fan switched on is absorbed by the noise floor, speech over it is not."""
+        vad = SpectralVAD()
+        fan = noise(6.0, "fan", level=0.05, seed=3)
+        decisions = run(vad, np.concatenate([quiet(1.0), fan]))
+
+        assert not any(decisions[-30:])
+
+        speech = run(vad, fan[:SAMPLE_RATE] + voiced(1.0, level=0.3))
+        assert sum(speech) >= 8
+
+    def test_hangover_bridges_short_pauses(self):
+        """Test a 100 ms gap inside an utterance does not end it."""
+        vad = SpectralVAD()
+        audio = np.concatenate([quiet(1.0), voiced(0.5), quiet(0.1), voiced(0.5)])
+        decisions = run(vad, audio)
+
+        assert all(decisions[12:20])
+        assert vad.metrics.triggers == 1
+
+    def test_metrics(self):
+        """Test triggers per minute and pass rate."""
+        vad = SpectralVAD()
+        run(vad, np.concatenate([quiet(1.0), voiced(0.5), quiet(1.0), voiced(0.5), quiet(0.5)] * 5))
+        vad.metrics.passed = 5
+
+        summary = vad.metrics.summary()
+        assert summary['triggers'] == 10
+        assert summary['triggers_per_minute'] == pytest.approx(10 / (17.5 / 60), rel=0.01)
+        assert summary['pass_rate'] == 0.5
+
+    def test_odd_chunk_sizes(self):
+        """Test samples left over between chunks are carried to the next frame."""
+        vad = SpectralVAD()
+        audio = np.concatenate([quiet(1.0), voiced(1.0)])
+        decisions = [vad.is_speech(audio[i:i + 1000]) for i in range(0, len(audio), 1000)]
+
+        assert decisions[-1]
+        assert vad.metrics.frames == len(audio) // vad.frame_size
+
+
+class TestEnergyVAD:
+    """Test the RMS threshold engine."""
+
+    def test_threshold(self):
+        vad = EnergyVAD(threshold=0.02)
+
+        assert vad.is_speech(np.full(CHUNK, 0.05, dtype=np.float32))
+        assert not vad.is_speech(np.full(CHUNK, 0.01, dtype=np.float32))
+        assert not vad.is_speech(np.zeros(0, dtype=np.float32))
+
+    def test_create_vad(self):
+        assert isinstance(create_vad("energy"), EnergyVAD)
+        assert isinstance(create_vad("spectral"), SpectralVAD)
+        assert isinstance(create_vad("bogus"), SpectralVAD)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,161 @@
+# test_vision_vlm.py
+"""
+Unit tests for Vision VLM module
+Tests the resident server backend against a local stub server and the subprocess fallback.
+"""
+
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import pytest
+import numpy as np
+from vision_vlm import VisionVLM
+from frame_hash import FrameResultCache
+
+
+STUB_RESULT = {
+    "recognized_items": [{"name": "cumin", "confidence": 0.9}],
+    "tools": [{"name": "teaspoon", "fill_ratio": 0.5}]
+}
+
+
+class StubLlamaHandler(BaseHTTPRequestHandler):
+    """Minimal llama-server stand-in: /health and /v1/chat/completions."""
+
+    requests = []
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        StubLlamaHandler.requests.append(payload)
+        self._reply(200, {
+            "choices": [{"message": {"content": json.dumps(STUB_RESULT)}}]
+        })
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    """Run the stub server on a free local port."""
+    StubLlamaHandler.requests = []
+    server = HTTPServer(("127.0.0.1", 0), StubLlamaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    """Create a placeholder GGUF file."""
+    path = tmp_path / "model.gguf"
+    path.write_bytes(b"GGUF")
+    return path
+
+
+class TestServerBackend:
+    """Test the resident llama-server backend."""
+
+    def test_analyze_frame_via_server(self, stub_server, model_file):
+        """Test frames are sent to the resident server and parsed."""
+        vlm = VisionVLM(str(model_file), backend="server", server_url=stub_server)
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+        result = vlm.analyze_frame(frame, prompt="What is this?")
+
+        assert result["recognized_items"][0]["name"] == "cumin"
+        assert result["containers"] == []  # filled in by validation
+
+        request = StubLlamaHandler.requests[0]
+        content = request["messages"][0]["content"]
+        assert content[0]["text"] == "What is this?"
+        assert content[1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+
+    def test_server_reused_across_frames(self, stub_server, model_file):
+        """Test multiple frames reuse the same server."""
+        vlm = VisionVLM(str(model_file), backend="server", server_url=stub_server)
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+        for _ in range(3):
+            vlm.analyze_frame(frame)
+
+        assert len(StubLlamaHandler.requests) == 3
+
+    def test_fallback_when_server_unreachable(self, model_file):
+        """Test unreachable server falls back to the subprocess/mock path."""
+        vlm = VisionVLM(str(model_file), backend="server",
+                        server_url="http://127.0.0.1:9", server_timeout=1.0)
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+        result = vlm.analyze_frame(frame)
+
+        # No llama.cpp binary in the test environment -> mock response
+        assert "recognized_items" in result
+        assert result["recognized_items"][0]["name"] == "turmeric"
+
+    def test_result_cache_skips_repeat_inference(self, stub_server, model_file):
+        """Test a repeated frame is answered from the result cache."""
+        vlm = VisionVLM(str(model_file), backend="server", server_url=stub_server,
+                        result_cache=FrameResultCache())
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+        first = vlm.analyze_frame(frame)
+        second = vlm.analyze_frame(frame)
+
+        assert first == second
+        assert len(StubLlamaHandler.requests) == 1
+
+    def test_inference_timeout_not_cached(self, model_file, tmp_path, monkeypatch):
+        """Test a timed-out run returns an empty result that is not cached."""
+        import subprocess
+        import vision_vlm
+
+        calls = []
+
+        def timeout(cmd, **kwargs):
+            calls.append(cmd)
+            raise subprocess.TimeoutExpired(cmd, 10)
+
+        monkeypatch.setattr(vision_vlm.subprocess, "run", timeout)
+        vlm = VisionVLM(str(model_file), result_cache=FrameResultCache())
+        vlm.llama_cpp_path = tmp_path / "llama-mtmd-cli"
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+
+        first = vlm.analyze_frame(frame)
+        second = vlm.analyze_frame(frame)
+
+        assert first["recognized_items"] == []
+        assert first["tools"] == []
+        assert second == first
+        assert len(calls) == 2
+
+    def test_subprocess_backend_has_no_server(self, model_file):
+        """Test default backend does not start a server."""
+        vlm = VisionVLM(str(model_file))
+
+        assert vlm.server is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])